@@ -2,6 +2,18 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import time
+from datetime import date
+
+from costing_engine import (
+    calculate_total_weight, calculate_box_and_profiles, search_box_dimensions, size_crate_pallet, DERIVED_SKU_COLUMNS
+)
+from box_search import BoxSearchLimits
+from load_planner import LoadSizingLimits
+from costing_cache import cached_packing_costs, cached_crate_pallet_costs
+from reference_pricing import compile_reference_pricing
+from excel_report import submit_excel_report
+from arrow_export import export_results
+from price_store import get_price_store
 
 # Set page configuration FIRST
 st.set_page_config(
@@ -10,6 +22,38 @@ st.set_page_config(
     layout="wide"
 )
 
+# Reference cost tables saved from the Apply buttons (primary material costs as they are
+# edited), latest version in effect today. The box cost tables follow the ply selector
+# and are not stored.
+PRICE_STORE_APP = "app"
+REFERENCE_TABLES = [
+    "primary_material_costs", "secondary_material_costs", "polybag_costs", "stretchwrap_costs", "crate_costs",
+    "pallet_costs", "strapping_clip_costs", "pp_strapping_costs", "cardboard_covering_costs"
+]
+price_store = get_price_store()
+
+# Sessions share one copy of the tables and reload on their next run after any session saves or the date changes
+try:
+    prices_version = (price_store.version(), date.today())
+    if st.session_state.get("reference_prices_version") != prices_version:
+        for table_name, df in price_store.load_tables(PRICE_STORE_APP).items():
+            if table_name in REFERENCE_TABLES:
+                st.session_state[table_name] = df
+        st.session_state.reference_prices_version = prices_version
+except Exception as e:
+    st.warning(f"Saved reference prices could not be loaded: {str(e)}")
+
+
+def save_reference_prices():
+    """Store the current reference cost tables as a new price version"""
+    try:
+        price_store.save_tables(
+            PRICE_STORE_APP, {table_name: st.session_state[table_name] for table_name in REFERENCE_TABLES}
+        )
+    except Exception as e:
+        st.error(f"Reference prices could not be saved: {str(e)}")
+
+
 # Initialize all session states for persistence
 if 'primary_sku_data' not in st.session_state:
     st.session_state.primary_sku_data = pd.DataFrame(columns=[
@@ -18,6 +62,7 @@ if 'primary_sku_data' not in st.session_state:
         "Box Height/mm", "Box Length/mm", "W/mm", "H/mm",
         "Comment on fabrication",
         "total weight per profile (kg)","Number of profiles per box",
+        "Box layout",
     ])
 
 if 'primary_material_costs' not in st.session_state:
@@ -39,7 +84,7 @@ if 'secondary_sku_data' not in st.session_state:
         "SKU No", "Unit weight(kg/m)", "total weight per profile (kg)", 
         "Width/mm", "Height/mm", "Length/mm", "Box Width/mm",
         "Box Height/mm", "Box Length/mm", "W/mm", "H/mm",
-        "Number of profiles per box", "Comment on fabrication"
+        "Number of profiles per box", "Box layout", "Comment on fabrication"
     ])
 
 if 'secondary_material_costs' not in st.session_state:
@@ -130,517 +175,53 @@ def reset_calculation_flags():
     st.session_state.calculate_primary = False
     st.session_state.calculate_secondary = False
 
-# App title
-st.title("📦 Packing Costing Calculator")
+# Function to find the rows a data_editor changed
+def changed_editor_rows(editor_state, source_df, edited_df):
+    """Return index labels of rows edited or added in a data_editor, given its session state deltas"""
+    labels = [source_df.index[int(pos)] for pos in editor_state.get("edited_rows", {}) if int(pos) < len(source_df)]
+    # Added rows are the labels that were not in the table passed to the editor
+    labels += edited_df.index.difference(source_df.index).tolist()
+    return [label for label in dict.fromkeys(labels) if label in edited_df.index]
 
-# Create download button
-def create_excel_report():
-    """Create Excel report with primary and secondary calculations"""
-    from io import BytesIO
-    from openpyxl import Workbook
-    from openpyxl.styles import Border, Side, Alignment, Font, PatternFill
-    from openpyxl.utils.dataframe import dataframe_to_rows
-    
-    # Create an Excel writer
-    output = BytesIO()
-    
-    # Create border style
-    thin_border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
-    
-    # Create heading style
-    heading_font = Font(name='Calibri', size=12, bold=True, color='FFFFFF')
-    heading_fill = PatternFill(start_color='4B0082', end_color='4B0082', fill_type='solid')  # Dark purple
-    
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        workbook = writer.book
-        
-        # Sheet 1: Primary Calculations
-        if 'primary_calculations' in st.session_state and not st.session_state.primary_calculations.empty:
-            # Get primary selections from session state
-            finish_primary = st.session_state.get("finish_primary", "Mill Finish")
-            interleaving_primary = st.session_state.get("interleaving_primary", "No")
-            eco_friendly_primary = st.session_state.get("eco_friendly_primary", "Mac foam")
-            protective_tape_primary = st.session_state.get("protective_tape_primary", "No")
-            
-            # Create a summary dataframe for primary calculations
-            primary_summary = pd.DataFrame({
-                'Primary Calculations Summary': ['Primary Packing Costing Report']
-            })
-            primary_summary.to_excel(writer, sheet_name='Primary Calculations', index=False, startrow=0)
-            
-            # Format the primary summary
-            ws = writer.sheets['Primary Calculations']
-            ws['A1'].font = heading_font
-            ws['A1'].fill = heading_fill
-            ws['A1'].alignment = Alignment(horizontal='center')
-            ws.column_dimensions['A'].width = 35
-            
-            # Add SKU Table
-            start_row = 4
-            ws.cell(row=start_row, column=1, value="SKU Table with dimensions").font = heading_font
-            ws.cell(row=start_row, column=1).fill = heading_fill
-            st.session_state.primary_sku_data.to_excel(writer, sheet_name='Primary Calculations', index=False, startrow=start_row + 1)
-            
-            # Apply borders to SKU table
-            sku_data_rows = len(st.session_state.primary_sku_data)
-            sku_data_cols = len(st.session_state.primary_sku_data.columns)
-            for row in range(start_row + 2, start_row + sku_data_rows + 3):
-                for col in range(1, sku_data_cols + 1):
-                    cell = ws.cell(row=row, column=col)
-                    cell.border = thin_border
-            
-            # Add Common Packing Selections heading
-            common_start_row = start_row + sku_data_rows + 5
-            ws.cell(row=common_start_row, column=1, value="Common Packing Selections").font = heading_font
-            ws.cell(row=common_start_row, column=1).fill = heading_fill
-            
-            # Add Common Packing Selections details
-            ws.cell(row=common_start_row + 1, column=1, value=f'Finish: {finish_primary}')
-            ws.cell(row=common_start_row + 2, column=1, value=f'Interleaving Required: {interleaving_primary}')
-            ws.cell(row=common_start_row + 3, column=1, value=f'Eco-Friendly Material: {eco_friendly_primary}')
-            ws.cell(row=common_start_row + 4, column=1, value=f'Protective Tape: {protective_tape_primary}')
-            ws.cell(row=common_start_row + 5, column=1, value=f'Box Ply: {st.session_state.get("box_ply", "3 ply")}')
-            
-            # Apply borders to common selections
-            for row in range(common_start_row + 1, common_start_row + 6):
-                cell = ws.cell(row=row, column=1)
-                cell.border = thin_border
-            
-            # Add Material Costs heading
-            material_start_row = common_start_row + 6
-            ws.cell(row=material_start_row, column=1, value="Table 1: Primary Packing Material Costs").font = heading_font
-            ws.cell(row=material_start_row, column=1).fill = heading_fill
-            
-            # Add Material Costs
-            st.session_state.primary_material_costs.to_excel(writer, sheet_name='Primary Calculations', index=False, 
-                                   startrow=material_start_row + 1)
-            
-            # Apply borders to material costs table
-            material_rows = len(st.session_state.primary_material_costs)
-            material_cols = len(st.session_state.primary_material_costs.columns)
-            for row in range(material_start_row + 2, material_start_row + material_rows + 3):
-                for col in range(1, material_cols + 1):
-                    cell = ws.cell(row=row, column=col)
-                    cell.border = thin_border
-            
-            # Add Cardboard Box Cost heading
-            box_start_row = material_start_row + material_rows + 4
-            ws.cell(row=box_start_row, column=1, value="Table 2: Cardboard Box Cost").font = heading_font
-            ws.cell(row=box_start_row, column=1).fill = heading_fill
-            
-            # Add Cardboard Box Costs
-            st.session_state.primary_box_costs.to_excel(writer, sheet_name='Primary Calculations', index=False,
-                              startrow=box_start_row + 1)
-            
-            # Apply borders to box costs table
-            box_rows = len(st.session_state.primary_box_costs)
-            box_cols = len(st.session_state.primary_box_costs.columns)
-            for row in range(box_start_row + 2, box_start_row + box_rows + 3):
-                for col in range(1, box_cols + 1):
-                    cell = ws.cell(row=row, column=col)
-                    cell.border = thin_border
-            
-            # Add Primary Packing Total Cost heading
-            calc_start_row = box_start_row + box_rows + 4
-            ws.cell(row=calc_start_row, column=1, value="Table 3: Primary Packing Total Cost").font = heading_font
-            ws.cell(row=calc_start_row, column=1).fill = heading_fill
-            
-            # Add Primary Packing Total Cost
-            st.session_state.primary_calculations.to_excel(writer, sheet_name='Primary Calculations', index=False,
-                                                            startrow=calc_start_row + 1)
-            
-            # Apply borders to calculations table
-            calc_rows = len(st.session_state.primary_calculations)
-            calc_cols = len(st.session_state.primary_calculations.columns)
-            for row in range(calc_start_row + 2, calc_start_row + calc_rows + 3):
-                for col in range(1, calc_cols + 1):
-                    cell = ws.cell(row=row, column=col)
-                    cell.border = thin_border
-            
-            # Add Special Comments Section (AFTER the table)
-            comments_start_row = calc_start_row + calc_rows + 5
-            ws.cell(row=comments_start_row, column=1, value="Special Comments Section").font = heading_font
-            ws.cell(row=comments_start_row, column=1).fill = heading_fill
-            
-            # Get the comments from session state
-            eco_friendly_primary = st.session_state.get("eco_friendly_primary", "Mac foam")
-            comments_text = f"""Costing is done according to primary packing. Therefore, this cost does not include any crate or palletizing charges. Please note that secondary packaging will incur an additional charge.
-            
-            The interleaving material is "{eco_friendly_primary}".
-            
-            Protective tape required to avoid rejects
-            
-            Costing is only inclusive of interleaving required & Cardboard Box/Polybag."""
-            
-            # Add comments text
-            current_row = comments_start_row + 2
-            for line in comments_text.split('\n'):
-                ws.cell(row=current_row, column=1, value=line.strip())
-                current_row += 1
 
-    
-        # Sheet 2: Secondary Calculations
-        if 'secondary_calculations' in st.session_state and not st.session_state.secondary_calculations.empty:
-            # Initialize sec_calc_rows
-            sec_calc_rows = 0
-            
-            # Get secondary selections from session state
-            finish_secondary = st.session_state.get("finish_secondary", "Mill Finish")
-            interleaving_secondary = st.session_state.get("interleaving_secondary", "No")
-            eco_friendly_secondary = st.session_state.get("eco_friendly_secondary", "Mac foam")
-            protective_tape_secondary = st.session_state.get("protective_tape_secondary", "No")
-            
-            # Create a summary dataframe for secondary calculations
-            secondary_summary = pd.DataFrame({
-                'Secondary Calculations Summary': ['Secondary Packing Costing Report']
-            })
-            secondary_summary.to_excel(writer, sheet_name='Secondary Calculations', index=False, startrow=0)
-            
-            # Format the secondary summary
-            ws2 = writer.sheets['Secondary Calculations']
-            ws2['A1'].font = heading_font
-            ws2['A1'].fill = heading_fill
-            ws2['A1'].alignment = Alignment(horizontal='center')
-            ws2.column_dimensions['A'].width = 35
-            
-            # Add SKU Table heading
-            start_row_sec = 4
-            ws2.cell(row=start_row_sec, column=1, value="SKU Table with dimensions").font = heading_font
-            ws2.cell(row=start_row_sec, column=1).fill = heading_fill
-            
-            # Add SKU Table
-            st.session_state.secondary_sku_data.to_excel(writer, sheet_name='Secondary Calculations', index=False, startrow=start_row_sec + 1)
-            
-            # Apply borders to SKU table
-            sku_data_rows_sec = len(st.session_state.secondary_sku_data)
-            sku_data_cols_sec = len(st.session_state.secondary_sku_data.columns)
-            for row in range(start_row_sec + 2, start_row_sec + sku_data_rows_sec + 3):
-                for col in range(1, sku_data_cols_sec + 1):
-                    cell = ws2.cell(row=row, column=col)
-                    cell.border = thin_border
-            
-            # Add Common Packing Selections heading
-            common_start_row_sec = start_row_sec + sku_data_rows_sec + 5
-            ws2.cell(row=common_start_row_sec, column=1, value="Common Packing Selections").font = heading_font
-            ws2.cell(row=common_start_row_sec, column=1).fill = heading_fill
-            
-            # Add Common Packing Selections details
-            ws2.cell(row=common_start_row_sec + 1, column=1, value=f'Finish: {finish_secondary}')
-            ws2.cell(row=common_start_row_sec + 2, column=1, value=f'Interleaving Required: {interleaving_secondary}')
-            ws2.cell(row=common_start_row_sec + 3, column=1, value=f'Eco-Friendly Material: {eco_friendly_secondary}')
-            ws2.cell(row=common_start_row_sec + 4, column=1, value=f'Protective Tape: {protective_tape_secondary}')
-            
-            # Apply borders to common selections
-            for row in range(common_start_row_sec + 1, common_start_row_sec + 5):
-                cell = ws2.cell(row=row, column=1)
-                cell.border = thin_border
-            
-            # Add Bundling Data if available
-            current_row = common_start_row_sec + 6
-            if 'bundling_data' in st.session_state and not st.session_state.bundling_data.empty:
-                ws2.cell(row=current_row, column=1, value="Section 1 - Number of layers (Method 1)").font = heading_font
-                ws2.cell(row=current_row, column=1).fill = heading_fill
-                
-                st.session_state.bundling_data.to_excel(writer, sheet_name='Secondary Calculations', index=False,
-                                                       startrow=current_row + 1, 
-                                                       header=True)
-                
-                # Apply borders to bundling data
-                bundling_rows = len(st.session_state.bundling_data)
-                bundling_cols = len(st.session_state.bundling_data.columns)
-                for row in range(current_row + 2, current_row + bundling_rows + 3):
-                    for col in range(1, bundling_cols + 1):
-                        cell = ws2.cell(row=row, column=col)
-                        cell.border = thin_border
-                
-                current_row += bundling_rows + 5
-            
-            # Add Bundle Size Data if available
-            if 'bundle_size_data' in st.session_state and not st.session_state.bundle_size_data.empty:
-                ws2.cell(row=current_row, column=1, value="Section 2 - Size of bundle (Method 2)").font = heading_font
-                ws2.cell(row=current_row, column=1).fill = heading_fill
-                
-                st.session_state.bundle_size_data.to_excel(writer, sheet_name='Secondary Calculations', index=False,
-                                                          startrow=current_row + 1,
-                                                          header=True)
-                
-                # Apply borders to bundle size data
-                bundle_size_rows = len(st.session_state.bundle_size_data)
-                bundle_size_cols = len(st.session_state.bundle_size_data.columns)
-                for row in range(current_row + 2, current_row + bundle_size_rows + 3):
-                    for col in range(1, bundle_size_cols + 1):
-                        cell = ws2.cell(row=row, column=col)
-                        cell.border = thin_border
-                
-                current_row += bundle_size_rows + 5
-            
-            # Add Cost Tables heading
-            current_row += 2
-            ws2.cell(row=current_row, column=1, value="Secondary Packing Cost Tables").font = heading_font
-            ws2.cell(row=current_row, column=1).fill = heading_fill
-            current_row += 2
-            
-            # Add Material Costs
-            if 'secondary_material_costs' in st.session_state and not st.session_state.secondary_material_costs.empty:
-                ws2.cell(row=current_row, column=1, value="Table 1: Primary Packing Material Costs").font = heading_font
-                ws2.cell(row=current_row, column=1).fill = heading_fill
-                
-                st.session_state.secondary_material_costs.to_excel(writer, sheet_name='Secondary Calculations', index=False,
-                                                       startrow=current_row + 1)
-                
-                # Apply borders
-                mat_rows = len(st.session_state.secondary_material_costs)
-                mat_cols = len(st.session_state.secondary_material_costs.columns)
-                for row in range(current_row + 2, current_row + mat_rows + 3):
-                    for col in range(1, mat_cols + 1):
-                        cell = ws2.cell(row=row, column=col)
-                        cell.border = thin_border
-                
-                current_row += mat_rows + 5
-            
-            # Add Box Costs
-            if 'secondary_box_costs' in st.session_state and not st.session_state.secondary_box_costs.empty:
-                ws2.cell(row=current_row, column=1, value="Table 2: Cardboard Box Cost").font = heading_font
-                ws2.cell(row=current_row, column=1).fill = heading_fill
-                
-                st.session_state.secondary_box_costs.to_excel(writer, sheet_name='Secondary Calculations', index=False,
-                                                       startrow=current_row + 1)
-                
-                # Apply borders
-                box_rows_sec = len(st.session_state.secondary_box_costs)
-                box_cols_sec = len(st.session_state.secondary_box_costs.columns)
-                for row in range(current_row + 2, current_row + box_rows_sec + 3):
-                    for col in range(1, box_cols_sec + 1):
-                        cell = ws2.cell(row=row, column=col)
-                        cell.border = thin_border
-                
-                current_row += box_rows_sec + 5
-            
-            # Add Polybag Costs
-            if 'polybag_costs' in st.session_state and not st.session_state.polybag_costs.empty:
-                ws2.cell(row=current_row, column=1, value="Table 3: Polybag Cost").font = heading_font
-                ws2.cell(row=current_row, column=1).fill = heading_fill
-                
-                st.session_state.polybag_costs.to_excel(writer, sheet_name='Secondary Calculations', index=False,
-                                                       startrow=current_row + 1)
-                
-                # Apply borders
-                polybag_rows = len(st.session_state.polybag_costs)
-                polybag_cols = len(st.session_state.polybag_costs.columns)
-                for row in range(current_row + 2, current_row + polybag_rows + 3):
-                    for col in range(1, polybag_cols + 1):
-                        cell = ws2.cell(row=row, column=col)
-                        cell.border = thin_border
-                
-                current_row += polybag_rows + 5
-            
-            # Add Stretchwrap Costs
-            if 'stretchwrap_costs' in st.session_state and not st.session_state.stretchwrap_costs.empty:
-                ws2.cell(row=current_row, column=1, value="Table 4: Stretch wrap cost").font = heading_font
-                ws2.cell(row=current_row, column=1).fill = heading_fill
-                
-                st.session_state.stretchwrap_costs.to_excel(writer, sheet_name='Secondary Calculations', index=False,
-                                                       startrow=current_row + 1)
-                
-                # Apply borders
-                stretch_rows = len(st.session_state.stretchwrap_costs)
-                stretch_cols = len(st.session_state.stretchwrap_costs.columns)
-                for row in range(current_row + 2, current_row + stretch_rows + 3):
-                    for col in range(1, stretch_cols + 1):
-                        cell = ws2.cell(row=row, column=col)
-                        cell.border = thin_border
-                
-                current_row += stretch_rows + 5
-            
-            # Add Crate/Pallet Cost Tables
-            current_row += 2
-            ws2.cell(row=current_row, column=1, value="Crate/Pallet Cost Tables").font = heading_font
-            ws2.cell(row=current_row, column=1).fill = heading_fill
-            current_row += 2
-            
-            # Add Crate Costs
-            if 'crate_costs' in st.session_state and not st.session_state.crate_costs.empty:
-                ws2.cell(row=current_row, column=1, value="Table 1: Crate Cost").font = heading_font
-                ws2.cell(row=current_row, column=1).fill = heading_fill
-                
-                st.session_state.crate_costs.to_excel(writer, sheet_name='Secondary Calculations', index=False,
-                                                     startrow=current_row + 1)
-                
-                # Apply borders
-                crate_rows = len(st.session_state.crate_costs)
-                crate_cols = len(st.session_state.crate_costs.columns)
-                for row in range(current_row + 2, current_row + crate_rows + 3):
-                    for col in range(1, crate_cols + 1):
-                        cell = ws2.cell(row=row, column=col)
-                        cell.border = thin_border
-                
-                current_row += crate_rows + 5
-            
-            # Add Pallet Costs
-            if 'pallet_costs' in st.session_state and not st.session_state.pallet_costs.empty:
-                ws2.cell(row=current_row, column=1, value="Table 2: Pallet Cost").font = heading_font
-                ws2.cell(row=current_row, column=1).fill = heading_fill
-                
-                st.session_state.pallet_costs.to_excel(writer, sheet_name='Secondary Calculations', index=False,
-                                                     startrow=current_row + 1)
-                
-                # Apply borders
-                pallet_rows = len(st.session_state.pallet_costs)
-                pallet_cols = len(st.session_state.pallet_costs.columns)
-                for row in range(current_row + 2, current_row + pallet_rows + 3):
-                    for col in range(1, pallet_cols + 1):
-                        cell = ws2.cell(row=row, column=col)
-                        cell.border = thin_border
-                
-                current_row += pallet_rows + 5
-            
-            # Add Strapping Clip Costs
-            if 'strapping_clip_costs' in st.session_state and not st.session_state.strapping_clip_costs.empty:
-                ws2.cell(row=current_row, column=1, value="Table 3: Strapping Clip Cost").font = heading_font
-                ws2.cell(row=current_row, column=1).fill = heading_fill
-                
-                st.session_state.strapping_clip_costs.to_excel(writer, sheet_name='Secondary Calculations', index=False,
-                                                             startrow=current_row + 1)
-                
-                # Apply borders
-                clip_rows = len(st.session_state.strapping_clip_costs)
-                clip_cols = len(st.session_state.strapping_clip_costs.columns)
-                for row in range(current_row + 2, current_row + clip_rows + 3):
-                    for col in range(1, clip_cols + 1):
-                        cell = ws2.cell(row=row, column=col)
-                        cell.border = thin_border
-                
-                current_row += clip_rows + 5
-            
-            # Add PP Strapping Costs
-            if 'pp_strapping_costs' in st.session_state and not st.session_state.pp_strapping_costs.empty:
-                ws2.cell(row=current_row, column=1, value="Table 4: PP Strapping Cost").font = heading_font
-                ws2.cell(row=current_row, column=1).fill = heading_fill
-                
-                st.session_state.pp_strapping_costs.to_excel(writer, sheet_name='Secondary Calculations', index=False,
-                                                           startrow=current_row + 1)
-                
-                # Apply borders
-                pp_rows = len(st.session_state.pp_strapping_costs)
-                pp_cols = len(st.session_state.pp_strapping_costs.columns)
-                for row in range(current_row + 2, current_row + pp_rows + 3):
-                    for col in range(1, pp_cols + 1):
-                        cell = ws2.cell(row=row, column=col)
-                        cell.border = thin_border
-                
-                current_row += pp_rows + 5
-                
-            
-    
-            # Add Secondary Packing Cost Per Profile heading
-            current_row += 2
-            ws2.cell(row=current_row, column=1, value="Secondary Packing Cost Per Profile").font = heading_font
-            ws2.cell(row=current_row, column=1).fill = heading_fill
-            
-            # Add Secondary Packing Cost Per Profile
-            st.session_state.secondary_calculations.to_excel(writer, sheet_name='Secondary Calculations', index=False,
-                                                  startrow=current_row + 2)
-            
-            # Apply borders to calculations table
-            sec_calc_rows = len(st.session_state.secondary_calculations)
-            sec_calc_cols = len(st.session_state.secondary_calculations.columns)
-            for row in range(current_row + 3, current_row + sec_calc_rows + 4):
-                for col in range(1, sec_calc_cols + 1):
-                    cell = ws2.cell(row=row, column=col)
-                    cell.border = thin_border
-            
-            # Add Crate/Pallet Dimensions if available
-            current_row += sec_calc_rows + 6
-            if 'crate_pallet_data' in st.session_state and not st.session_state.crate_pallet_data.empty:
-                ws2.cell(row=current_row, column=1, value="Crate/Pallet Dimensions").font = heading_font
-                ws2.cell(row=current_row, column=1).fill = heading_fill
-                
-                st.session_state.crate_pallet_data.to_excel(writer, sheet_name='Secondary Calculations', index=False,
-                                                           startrow=current_row + 2)
-                
-                # Apply borders
-                cp_dim_rows = len(st.session_state.crate_pallet_data)
-                cp_dim_cols = len(st.session_state.crate_pallet_data.columns)
-                for row in range(current_row + 3, current_row + cp_dim_rows + 4):
-                    for col in range(1, cp_dim_cols + 1):
-                        cell = ws2.cell(row=row, column=col)
-                        cell.border = thin_border
-                
-                current_row += cp_dim_rows + 6
-            
-            # Add Crate/Pallet Cost Calculations if available
-            if 'crate_pallet_calculations' in st.session_state and not st.session_state.crate_pallet_calculations.empty:
-                ws2.cell(row=current_row, column=1, value="Crate/Pallet Cost Calculations").font = heading_font
-                ws2.cell(row=current_row, column=1).fill = heading_fill
-                
-                st.session_state.crate_pallet_calculations.to_excel(writer, sheet_name='Secondary Calculations', index=False,
-                                                     startrow=current_row + 2)
-                
-                # Apply borders
-                cp_calc_rows = len(st.session_state.crate_pallet_calculations)
-                cp_calc_cols = len(st.session_state.crate_pallet_calculations.columns)
-                for row in range(current_row + 3, current_row + cp_calc_rows + 4):
-                    for col in range(1, cp_calc_cols + 1):
-                        cell = ws2.cell(row=row, column=col)
-                        cell.border = thin_border
+def update_derived_columns(edited_df, labels, changed_rows):
+    """Write the derived SKU columns of recalculated rows back into the edited table.
 
-            # Add Special Comments Section for Secondary
-            comments_start_row_sec = current_row + sec_calc_rows + 5
-            ws2.cell(row=comments_start_row_sec, column=1, value="Special Comments under Secondary Packing").font = heading_font
-            ws2.cell(row=comments_start_row_sec, column=1).fill = heading_fill
-            
-            # Get secondary comments from session state
-            finish_secondary = st.session_state.get("finish_secondary", "Mill Finish")
-            eco_friendly_secondary = st.session_state.get("eco_friendly_secondary", "Mac foam")
-            
-            # Determine protective tape comment
-            if finish_secondary in ["PC", "WF", "Anodised"]:
-                protective_tape_comment = "Protective tape required to avoid rejects"
-            else:
-                protective_tape_comment = "Protective tape is not mandatory"
-            
-            comments_text_sec = f"""**Packing Method Note:**
-            
-            1. Costing is done according to Secondary packing.
-            
-            2. The interleaving material is **"{eco_friendly_secondary}"**.
-            
-            3. {protective_tape_comment}
-            
-            4. Costing is inclusive of secondary packing - pallet or crate, however it is not inclusive of any labels or artwork. These will incur an additional charge."""
-            
-            # Add comments text
-            current_row_sec = comments_start_row_sec + 2
-            for line in comments_text_sec.split('\n'):
-                ws2.cell(row=current_row_sec, column=1, value=line)
-                current_row_sec += 1
+    Derived text columns (arrangement selectboxes, box layout) may come back
+    from the editor as numeric when they were empty; they are widened to
+    object first, since pandas refuses strings in a numeric column.
+    """
+    for column in DERIVED_SKU_COLUMNS:
+        if pd.api.types.is_numeric_dtype(edited_df[column]) and not pd.api.types.is_numeric_dtype(changed_rows[column]):
+            edited_df[column] = edited_df[column].astype(object)
+    edited_df.loc[labels, DERIVED_SKU_COLUMNS] = changed_rows[DERIVED_SKU_COLUMNS]
 
-    
-    
-    # Get the Excel data
-    output.seek(0)
-    return output.getvalue()
+# App title
+st.title("📦 Packing Costing Calculator")
 
-# Add download button at the top
+# Session tables and selections written to the Excel report
+REPORT_TABLES = [
+    "primary_sku_data", "primary_material_costs", "primary_box_costs", "primary_calculations",
+    "secondary_sku_data", "bundling_data", "bundle_size_data", "secondary_material_costs",
+    "secondary_box_costs", "polybag_costs", "stretchwrap_costs", "crate_costs", "pallet_costs",
+    "strapping_clip_costs", "pp_strapping_costs", "secondary_calculations", "crate_pallet_data",
+    "crate_pallet_calculations"
+]
+REPORT_SELECTIONS = [
+    "finish_primary", "interleaving_primary", "eco_friendly_primary", "protective_tape_primary", "box_ply",
+    "finish_secondary", "interleaving_secondary", "eco_friendly_secondary", "protective_tape_secondary"
+]
+
+def report_inputs():
+    """Session tables and selections the Excel report is built from"""
+    tables = {name: st.session_state[name] for name in REPORT_TABLES if name in st.session_state}
+    selections = {name: st.session_state[name] for name in REPORT_SELECTIONS if name in st.session_state}
+    return tables, selections
+
+# Add download button at the top, filled in once this run's calculations are done
 col1, col2, col3 = st.columns([1, 2, 1])
 with col2:
-    if st.button("📥 Download Complete Report (Excel)", type="primary", use_container_width=True):
-        try:
-            excel_data = create_excel_report()
-            st.download_button(
-                label="⬇️ Click to Download Excel File",
-                data=excel_data,
-                file_name="packing_costing_report.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                use_container_width=True
-            )
-        except Exception as e:
-            st.error(f"Error generating report: {str(e)}")
+    report_slot = st.empty()
 
 # Create tabs
 tab1, tab2 = st.tabs(["Primary Calculations", "Secondary Calculations"])
@@ -652,140 +233,24 @@ with tab1:
     def auto_calculate_sku_table():
         """Auto-calculate all fields in SKU table - preserve user inputs"""
         if not st.session_state.primary_sku_data.empty:
-            df_copy = st.session_state.primary_sku_data.copy()
-            
-            for idx, row in df_copy.iterrows():
-                try:
-                    # Calculate total weight per profile
-                    unit_weight = float(row["Unit weight(kg/m)"])
-                    length_mm = float(row["Length/mm"])
-                    total_weight = unit_weight * (length_mm / 1000)
-                    df_copy.at[idx, "total weight per profile (kg)"] = round(total_weight, 4)
-                    
-                    # Get profile dimensions
-                    width = float(row["Width/mm"])
-                    height = float(row["Height/mm"])
-                    length = float(row["Length/mm"])
-                    
-                    # Calculate box dimensions (round UP to nearest 100)
-                    def round_up_to_nearest_100(num):
-                        return ((int(num) + 99) // 100) * 100
-                    
-                    # ONLY auto-calculate if box dimensions are not manually set
-                    # Check current values
-                    current_box_width = float(row["Box Width/mm"]) if not pd.isna(row["Box Width/mm"]) else 0
-                    current_box_height = float(row["Box Height/mm"]) if not pd.isna(row["Box Height/mm"]) else 0
-                    current_box_length = float(row["Box Length/mm"]) if not pd.isna(row["Box Length/mm"]) else 0
-                    
-                    # Only calculate if current value is 0 or matches auto-calculated value
-                    expected_box_width = round_up_to_nearest_100(width)
-                    if current_box_width == 0 or current_box_width == expected_box_width:
-                        df_copy.at[idx, "Box Width/mm"] = expected_box_width
-                    
-                    expected_box_height = round_up_to_nearest_100(height)
-                    if current_box_height == 0 or current_box_height == expected_box_height:
-                        df_copy.at[idx, "Box Height/mm"] = expected_box_height
-                    
-                    expected_box_length = round_up_to_nearest_100(length)
-                    if current_box_length == 0 or current_box_length == expected_box_length:
-                        df_copy.at[idx, "Box Length/mm"] = expected_box_length
-                    
-                    # Get box dimensions (either auto-calculated or manually entered)
-                    box_width = float(df_copy.at[idx, "Box Width/mm"])
-                    box_height = float(df_copy.at[idx, "Box Height/mm"])
-                    box_length = float(df_copy.at[idx, "Box Length/mm"])
-                    
-                    # Set default W/mm and H/mm if not set
-                    if pd.isna(row["W/mm"]) or row["W/mm"] == "":
-                        df_copy.at[idx, "W/mm"] = "Profiles are arranged in W direction"
-                        df_copy.at[idx, "H/mm"] = "Profiles are arranged in height direction"
-                    
-                    # Get the arrangement direction
-                    w_direction = df_copy.at[idx, "W/mm"]
-                    h_direction = df_copy.at[idx, "H/mm"]
-                    
-                    # Calculate Number of profiles per box based on arrangement
-                    profiles_per_box = 0
-                    
-                    # Determine which direction is primary
-                    if w_direction == "Profiles are arranged in height direction":
-                        # When W/mm says "height direction", it means profiles are arranged by height in the width direction
-                        # So: (Box Width / profile Height) * (Box Height / profile Width)
-                        if width > 0 and height > 0:
-                            profiles_per_box = (box_width / height) * (box_height / width)
-                        # Update H/mm to show the complementary direction
-                        df_copy.at[idx, "H/mm"] = "Profiles are arranged in W direction"
-                    
-                    else:  # "Profiles are arranged in W direction"
-                        # When W/mm says "W direction", it means profiles are arranged by width in the width direction
-                        # So: (Box Width / profile Width) * (Box Height / profile Height)
-                        if width > 0 and height > 0:
-                            profiles_per_box = (box_width / width) * (box_height / height)
-                        # Update H/mm to show the complementary direction
-                        df_copy.at[idx, "H/mm"] = "Profiles are arranged in height direction"
-                    
-                    # Use INTEGER value (floor) for number of profiles per box
-                    df_copy.at[idx, "Number of profiles per box"] = int(profiles_per_box) if profiles_per_box > 0 else 0
-                    
-                    # Update H/mm based on W/mm selection
-                    if w_direction == "Profiles are arranged in W direction":
-                        df_copy.at[idx, "H/mm"] = "Profiles are arranged in height direction"
-                    elif w_direction == "Profiles are arranged in height direction":
-                        df_copy.at[idx, "H/mm"] = "Profiles are arranged in W direction"
-                        
-                except (ValueError, TypeError, ZeroDivisionError):
-                    # Only reset if values are 0 or empty
-                    if pd.isna(row["Box Width/mm"]) or float(row["Box Width/mm"]) == 0:
-                        df_copy.at[idx, "Box Width/mm"] = 0
-                    if pd.isna(row["Box Height/mm"]) or float(row["Box Height/mm"]) == 0:
-                        df_copy.at[idx, "Box Height/mm"] = 0
-                    if pd.isna(row["Box Length/mm"]) or float(row["Box Length/mm"]) == 0:
-                        df_copy.at[idx, "Box Length/mm"] = 0
-                    df_copy.at[idx, "Number of profiles per box"] = 0
-            
-            # Update session state
-            st.session_state.primary_sku_data = df_copy
+            # Manually set box dimensions are kept, profiles per box use the best layout
+            st.session_state.primary_sku_data = calculate_box_and_profiles(
+                calculate_total_weight(st.session_state.primary_sku_data)
+            )
             st.success("Auto-calculation completed!")
-            
     
-    # Function to auto-calculate box dimensions for ALL rows (including new ones)
-    def auto_calculate_all_box_dimensions(df):
-        """Auto-calculate box dimensions for all rows in dataframe - only for empty/zero values"""
-        df_copy = df.copy()
-        for idx, row in df_copy.iterrows():
-            try:
-                # Get profile dimensions
-                width = float(row["Width/mm"])
-                height = float(row["Height/mm"])
-                length = float(row["Length/mm"])
-                
-                # Calculate box dimensions (round UP to nearest 100)
-                def round_up_to_nearest_100(num):
-                    return ((int(num) + 99) // 100) * 100
-                
-                # ONLY calculate if box dimensions are 0, empty, or not set
-                # Check if Box Width/mm is NaN, empty string, or 0
-                if pd.isna(row["Box Width/mm"]) or str(row["Box Width/mm"]).strip() == "" or float(row["Box Width/mm"]) == 0:
-                    df_copy.at[idx, "Box Width/mm"] = round_up_to_nearest_100(width)
-                
-                # Check if Box Height/mm is NaN, empty string, or 0
-                if pd.isna(row["Box Height/mm"]) or str(row["Box Height/mm"]).strip() == "" or float(row["Box Height/mm"]) == 0:
-                    df_copy.at[idx, "Box Height/mm"] = round_up_to_nearest_100(height)
-                
-                # Check if Box Length/mm is NaN, empty string, or 0
-                if pd.isna(row["Box Length/mm"]) or str(row["Box Length/mm"]).strip() == "" or float(row["Box Length/mm"]) == 0:
-                    df_copy.at[idx, "Box Length/mm"] = round_up_to_nearest_100(length)
-                    
-            except (ValueError, TypeError, ZeroDivisionError):
-                # Only set defaults if values are empty/zero
-                if pd.isna(row["Box Width/mm"]) or str(row["Box Width/mm"]).strip() == "" or float(row["Box Width/mm"]) == 0:
-                    df_copy.at[idx, "Box Width/mm"] = 0
-                if pd.isna(row["Box Height/mm"]) or str(row["Box Height/mm"]).strip() == "" or float(row["Box Height/mm"]) == 0:
-                    df_copy.at[idx, "Box Height/mm"] = 0
-                if pd.isna(row["Box Length/mm"]) or str(row["Box Length/mm"]).strip() == "" or float(row["Box Length/mm"]) == 0:
-                    df_copy.at[idx, "Box Length/mm"] = 0
-        
-        return df_copy
+    # Function to search the cheapest box sizes for all rows
+    def search_sku_box_sizes(limits):
+        """Replace box dimensions with the cheapest box per profile within the limits"""
+        if not st.session_state.primary_sku_data.empty:
+            pricing = compile_reference_pricing(
+                st.session_state.primary_material_costs, st.session_state.primary_box_costs
+            )
+            st.session_state.primary_sku_data = search_box_dimensions(
+                calculate_total_weight(st.session_state.primary_sku_data), pricing, limits
+            )
+            st.success("Box sizes updated!")
+            
     
     # Sub topic 1 - SKU Table with dimensions with auto-calc button
     col1, col2 = st.columns([3, 1])
@@ -801,6 +266,21 @@ with tab1:
                     help="Click to auto-calculate total weight, box dimensions, and profiles per box",
                     use_container_width=True):
             auto_calculate_sku_table()
+    
+    with st.expander("🔍 Find cheapest box sizes"):
+        st.caption("Searches box sizes within the limits below for the lowest packing cost per profile, "
+                   "priced with Table 2 like Table 3. Overwrites the box dimensions of every SKU a box is found for.")
+        limit_cols = st.columns(4)
+        with limit_cols[0]:
+            max_box_width = st.number_input("Max box width (mm)", min_value=50.0, value=600.0, step=50.0, key="search_max_width")
+        with limit_cols[1]:
+            max_box_height = st.number_input("Max box height (mm)", min_value=50.0, value=600.0, step=50.0, key="search_max_height")
+        with limit_cols[2]:
+            max_box_length = st.number_input("Max box length (mm)", min_value=50.0, value=6500.0, step=100.0, key="search_max_length")
+        with limit_cols[3]:
+            box_size_step = st.number_input("Size step (mm)", min_value=10.0, value=50.0, step=10.0, key="search_step")
+        if st.button("🔍 Find Cheapest Box Sizes", use_container_width=True):
+            search_sku_box_sizes(BoxSearchLimits(max_box_width, max_box_height, max_box_length, box_size_step))
         
     
     # Initialize session state for primary SKU data with new columns
@@ -818,88 +298,20 @@ with tab1:
             "W/mm",
             "H/mm",
             "Number of profiles per box",
+            "Box layout",
             "Comment on fabrication"
         ])
     
-    # Function to calculate box dimensions and number of profiles per box
-    def calculate_box_and_profiles(df):
-        """Calculate box dimensions and number of profiles per box"""
-        df_copy = df.copy()
-        for idx, row in df_copy.iterrows():
-            try:
-                # Get profile dimensions
-                width = float(row["Width/mm"])
-                height = float(row["Height/mm"])
-                length = float(row["Length/mm"])
-                
-                # Calculate box dimensions (round UP to nearest 100)
-                def round_up_to_nearest_100(num):
-                    """Round UP to nearest 100"""
-                    return ((int(num) + 99) // 100) * 100
-                
-                # Only auto-calculate if box dimensions are 0 or not set
-                if pd.isna(row["Box Width/mm"]) or float(row["Box Width/mm"]) == 0:
-                    df_copy.at[idx, "Box Width/mm"] = round_up_to_nearest_100(width)
-                else:
-                    # Keep existing value
-                    df_copy.at[idx, "Box Width/mm"] = row["Box Width/mm"]
-                    
-                if pd.isna(row["Box Height/mm"]) or float(row["Box Height/mm"]) == 0:
-                    df_copy.at[idx, "Box Height/mm"] = round_up_to_nearest_100(height)
-                else:
-                    # Keep existing value
-                    df_copy.at[idx, "Box Height/mm"] = row["Box Height/mm"]
-                    
-                if pd.isna(row["Box Length/mm"]) or float(row["Box Length/mm"]) == 0:
-                    df_copy.at[idx, "Box Length/mm"] = round_up_to_nearest_100(length)
-                else:
-                    # Keep existing value
-                    df_copy.at[idx, "Box Length/mm"] = row["Box Length/mm"]
-                
-                # Get box dimensions
-                box_width = float(df_copy.at[idx, "Box Width/mm"])
-                box_height = float(df_copy.at[idx, "Box Height/mm"])
-                box_length = float(df_copy.at[idx, "Box Length/mm"])
-                
-                # Set default W/mm and H/mm if not set
-                if pd.isna(row["W/mm"]) or row["W/mm"] == "":
-                    df_copy.at[idx, "W/mm"] = "Profiles are arranged in W direction"
-                    df_copy.at[idx, "H/mm"] = "Profiles are arranged in height direction"
-                
-                # Calculate Number of profiles per box based on W/mm selection
-                w_direction = df_copy.at[idx, "W/mm"]
-                profiles_per_box = 0
-                
-                if w_direction == "Profiles are arranged in height direction":
-                    # (Box Height/profile width)*(Box Width/profile Height)
-                    if width > 0 and height > 0:
-                        profiles_per_box = (box_height / width) * (box_width / height)
-                else:  # "Profiles are arranged in W direction"
-                    # (Box Width/profile width)*(Box Height/profile Height)
-                    if width > 0 and height > 0:
-                        profiles_per_box = (box_width / width) * (box_height / height)
-                
-                # Use INTEGER value (floor) for number of profiles per box
-                df_copy.at[idx, "Number of profiles per box"] = int(profiles_per_box) if profiles_per_box > 0 else 0
-                
-                # Update H/mm based on W/mm selection
-                if w_direction == "Profiles are arranged in W direction":
-                    df_copy.at[idx, "H/mm"] = "Profiles are arranged in height direction"
-                elif w_direction == "Profiles are arranged in height direction":
-                    df_copy.at[idx, "H/mm"] = "Profiles are arranged in W direction"
-                    
-            except (ValueError, TypeError, ZeroDivisionError):
-                # Set default values on error
-                df_copy.at[idx, "Box Width/mm"] = 0
-                df_copy.at[idx, "Box Height/mm"] = 0
-                df_copy.at[idx, "Box Length/mm"] = 0
-                df_copy.at[idx, "Number of profiles per box"] = 0
-        
-        return df_copy
-    
-    # Calculate initial values
-    if not st.session_state.primary_sku_data.empty:
-        st.session_state.primary_sku_data = calculate_box_and_profiles(st.session_state.primary_sku_data)
+    # Calculate the whole table once (first load, or after auto-calculation was switched off);
+    # afterwards only the rows touched in the editor are recalculated
+    if 'primary_sku_needs_recalc' not in st.session_state:
+        st.session_state.primary_sku_needs_recalc = True
+    if (st.session_state.primary_sku_needs_recalc and st.session_state.get("auto_calc_enabled", True)
+            and not st.session_state.primary_sku_data.empty):
+        st.session_state.primary_sku_data = calculate_box_and_profiles(
+            calculate_total_weight(st.session_state.primary_sku_data)
+        )
+        st.session_state.primary_sku_needs_recalc = False
     
     # Create editable dataframe for SKU input
     edited_sku_df = st.data_editor(
@@ -922,7 +334,8 @@ with tab1:
                     "Profiles are arranged in W direction", 
                     "Profiles are arranged in height direction"
                 ],
-                required=True
+                required=True,
+                disabled=True  # Set to the arrangement of the best box layout
             ),
             "H/mm": st.column_config.TextColumn(
                 "H/mm",
@@ -936,6 +349,11 @@ with tab1:
                 format="%d",  # Changed from "%.2f" to "%d" for integer display
                 disabled=True
             ),
+            "Box layout": st.column_config.TextColumn(
+                "Box layout",
+                help="Profiles across box width × height (profile dimensions), | side by side, / stacked",
+                disabled=True
+            ),
             "Comment on fabrication": st.column_config.SelectboxColumn(
                 "Comment on fabrication",
                 options=["Fabricated", "Just Cutting"],
@@ -945,33 +363,19 @@ with tab1:
         key="sku_editor_primary"
     )
     
-    # Callback function to auto-calculate total weight
-    def calculate_total_weight(df):
-        """Calculate total weight per profile based on unit weight and length"""
-        df_copy = df.copy()
-        for idx, row in df_copy.iterrows():
-            try:
-                unit_weight = float(row["Unit weight(kg/m)"])
-                length_mm = float(row["Length/mm"])
-                # Calculate: Unit weight(kg/m) * (Length(mm) / 1000)
-                total_weight = unit_weight * (length_mm / 1000)
-                df_copy.at[idx, "total weight per profile (kg)"] = round(total_weight, 4)
-            except (ValueError, TypeError):
-                df_copy.at[idx, "total weight per profile (kg)"] = 0
-        return df_copy
-    
     # Update the session state with calculated weights and box dimensions
-    if not edited_sku_df.equals(st.session_state.primary_sku_data):
-        # Only recalculate if enabled and data has actually changed
+    editor_state = st.session_state.get("sku_editor_primary", {})
+    if editor_state.get("edited_rows") or editor_state.get("added_rows") or editor_state.get("deleted_rows"):
         if st.session_state.get("auto_calc_enabled", True):
-            # First calculate total weights
-            edited_sku_df_with_weights = calculate_total_weight(edited_sku_df)
-            # Then calculate box dimensions and profiles
-            edited_sku_df_with_all = calculate_box_and_profiles(edited_sku_df_with_weights)
-            st.session_state.primary_sku_data = edited_sku_df_with_all
+            # Recalculate only the rows edited or added in the data editor
+            changed_labels = changed_editor_rows(editor_state, st.session_state.primary_sku_data, edited_sku_df)
+            if changed_labels:
+                changed_rows = calculate_box_and_profiles(calculate_total_weight(edited_sku_df.loc[changed_labels]))
+                update_derived_columns(edited_sku_df, changed_labels, changed_rows)
         else:
             # Just update the data without calculations
-            st.session_state.primary_sku_data = edited_sku_df
+            st.session_state.primary_sku_needs_recalc = True
+        st.session_state.primary_sku_data = edited_sku_df
     
     st.divider()
     
@@ -1044,8 +448,10 @@ with tab1:
         key="material_editor_primary"
     )
     
-    # Update session state
-    st.session_state.primary_material_costs = edited_material_df
+    # Update session state, storing edited rates as a new price version
+    if not edited_material_df.equals(st.session_state.primary_material_costs):
+        st.session_state.primary_material_costs = edited_material_df
+        save_reference_prices()
 
     # Table 2: Cardboard Box Cost
     st.markdown("**Table 2: Cardboard Box Cost**")
@@ -1109,117 +515,28 @@ with tab1:
         st.markdown("**Table 3: Primary Packing Total Cost**")
         
         if not st.session_state.primary_sku_data.empty:
-            # Prepare calculations
-            calculations_data = []
-            
-            # Get material costs as dictionary
-            material_cost_dict = dict(zip(
-                st.session_state.primary_material_costs["Material"],
-                st.session_state.primary_material_costs["Cost/ m²"]
-            ))
+            # Cost every SKU in one vectorized pass
+            # Compiled rates are cached until Table 1 or Table 2 is edited
+            primary_pricing = compile_reference_pricing(
+                st.session_state.primary_material_costs,
+                st.session_state.primary_box_costs
+            )
+            calculations, valid_mask = cached_packing_costs(
+                st.session_state.primary_sku_data,
+                primary_pricing,
+                interleaving_required,
+                eco_friendly,
+                protective_tape
+            )
             
-            # Get reference box dimensions and cost
-            ref_box = st.session_state.primary_box_costs.iloc[0]
+            # Report rows that could not be costed instead of silently skipping them
+            if not valid_mask.all():
+                invalid_skus = st.session_state.primary_sku_data.loc[~valid_mask, "SKU No"].astype(str).tolist()
+                st.warning(f"Skipped {len(invalid_skus)} SKU(s) with missing or invalid values: {', '.join(invalid_skus)}")
             
-            for _, sku in st.session_state.primary_sku_data.iterrows():
-                try:
-                    # Get SKU dimensions
-                    width = float(sku["Width/mm"])
-                    height = float(sku["Height/mm"])
-                    length = float(sku["Length/mm"])
-                    unit_weight = float(sku["Unit weight(kg/m)"])
-                    total_weight = float(sku["total weight per profile (kg)"])
-                    
-                    # Get box dimensions from SKU table
-                    box_width = float(sku["Box Width/mm"])
-                    box_height = float(sku["Box Height/mm"])
-                    box_length = float(sku["Box Length/mm"])
-                    profiles_per_box = float(sku["Number of profiles per box"])
-                    
-                    # Calculate Surface Area in m² (using profile dimensions)
-                    sa_m2 = (2 * ((width * height) + (width * length) + (height * length))) / (1000 * 1000)
-                    
-                    # Calculate Interleaving Cost
-                    interleaving_cost = 0
-                    if interleaving_required == "Yes":
-                        material_map = {
-                            "Mac foam": "McFoam",
-                            "Stretch wrap": "Stretchwrap",
-                            "Craft Paper": "Craft Paper"
-                        }
-                        selected_material = material_map.get(eco_friendly, "McFoam")
-                        cost_per_m2 = material_cost_dict.get(selected_material, 0)
-                        interleaving_cost = (cost_per_m2 * sa_m2)/profiles_per_box
-                    
-                    # Calculate Protective Tape Cost
-                    protective_tape_cost = 0
-                    if protective_tape == "Yes":
-                        cost_per_m2 = material_cost_dict.get("Protective Tape", 0)
-                        protective_tape_cost = (cost_per_m2 * sa_m2)/profiles_per_box
-                    
-                    # Calculate Packing Cost - UPDATED FORMULA
-                    # Using box dimensions from SKU table divided by number of profiles per box
-                    packing_cost = 0
-                    # In the primary calculations section where packing_cost is calculated:
-                    if ref_box["Length(mm)"] > 0 and ref_box["Width (mm)"] > 0 and ref_box["Height (mm)"] > 0:
-                        if profiles_per_box > 0:
-                            # Calculate cost per box volume
-                            box_volume_cost = (ref_box["Cost (LKR)"] / (ref_box["Width (mm)"] * ref_box["Height (mm)"] * ref_box["Length(mm)"]))
-                            # Calculate actual box volume from SKU table
-                            actual_box_volume = box_width * box_height * box_length
-                            # Total box cost = cost per volume * actual box volume
-                            total_box_cost = box_volume_cost * actual_box_volume
-                            # Packing cost per profile = total box cost / number of profiles per box
-                            packing_cost = total_box_cost / profiles_per_box  # This now uses integer value
-                        else:
-                            # Fallback to original calculation if profiles_per_box is 0
-                            packing_cost = (ref_box["Cost (LKR)"] / (ref_box["Width (mm)"] * ref_box["Height (mm)"] * ref_box["Length(mm)"])) * (width * height * length)
-                            
-                    # Calculate Total Cost
-                    total_cost = interleaving_cost + protective_tape_cost + packing_cost
-
-                    # Calculate Cost/kg (LKR)
-                    cost_per_kg = total_cost / total_weight if total_weight > 0 else 0
-                    
-                    # Calculate Cost/m (LKR) = Total Cost per profile/LKR / (Length/mm ÷ 1000)
-                    length_m = length / 1000  # Convert mm to meters
-                    cost_per_m = total_cost / length_m if length_m > 0 else 0
-
-                    calculations_data.append({
-                        "SKU": sku["SKU No"],
-                        "Interleaving cost": round(interleaving_cost, 2),
-                        "Protective tape cost": round(protective_tape_cost, 2),
-                        "Packing type": "Cardboard box",
-                        "Profiles per box": int(profiles_per_box),
-                        "Packing Cost (LKR)": round(packing_cost, 2),
-                        "Total Cost per profile/LKR": round(total_cost, 2),
-                        "Cost/kg (LKR)": round(cost_per_kg, 2),
-                        "Cost/m (LKR)": round(cost_per_m, 2)
-                    })
-                    
-                except (ValueError, TypeError, ZeroDivisionError):
-                    continue
-            
-            if calculations_data:
+            if not calculations.empty:
                 # Store calculations in session state
-                st.session_state.primary_calculations = pd.DataFrame(calculations_data)
-
-                # Reorder columns if needed (optional)
-                column_order = [
-                    "SKU",
-                    "Interleaving cost", 
-                    "Protective tape cost",
-                    "Packing type",
-                    "Profiles per box",
-                    "Packing Cost (LKR)",
-                    "Total Cost per profile/LKR",
-                    "Cost/kg (LKR)",
-                    "Cost/m (LKR)"
-                ]
-                
-                # Reorder the columns
-                st.session_state.primary_calculations = st.session_state.primary_calculations[column_order]
-
+                st.session_state.primary_calculations = calculations
                 
                 # Display the calculated results table (read-only)
                 st.dataframe(
@@ -1264,99 +581,10 @@ with tab2:
     def auto_calculate_sku_table_secondary():
         """Auto-calculate all fields in SKU table - preserve user inputs for secondary"""
         if not st.session_state.secondary_sku_data.empty:
-            df_copy = st.session_state.secondary_sku_data.copy()
-            
-            for idx, row in df_copy.iterrows():
-                try:
-                    # Calculate total weight per profile
-                    unit_weight = float(row["Unit weight(kg/m)"])
-                    length_mm = float(row["Length/mm"])
-                    total_weight = unit_weight * (length_mm / 1000)
-                    df_copy.at[idx, "total weight per profile (kg)"] = round(total_weight, 4)
-                    
-                    # Get profile dimensions
-                    width = float(row["Width/mm"])
-                    height = float(row["Height/mm"])
-                    length = float(row["Length/mm"])
-                    
-                    # Calculate box dimensions (round UP to nearest 100)
-                    def round_up_to_nearest_100(num):
-                        return ((int(num) + 99) // 100) * 100
-                    
-                    # ONLY auto-calculate if box dimensions are not manually set
-                    # Check current values
-                    current_box_width = float(row["Box Width/mm"]) if not pd.isna(row["Box Width/mm"]) else 0
-                    current_box_height = float(row["Box Height/mm"]) if not pd.isna(row["Box Height/mm"]) else 0
-                    current_box_length = float(row["Box Length/mm"]) if not pd.isna(row["Box Length/mm"]) else 0
-                    
-                    # Only calculate if current value is 0 or matches auto-calculated value
-                    expected_box_width = round_up_to_nearest_100(width)
-                    if current_box_width == 0 or current_box_width == expected_box_width:
-                        df_copy.at[idx, "Box Width/mm"] = expected_box_width
-                    
-                    expected_box_height = round_up_to_nearest_100(height)
-                    if current_box_height == 0 or current_box_height == expected_box_height:
-                        df_copy.at[idx, "Box Height/mm"] = expected_box_height
-                    
-                    expected_box_length = round_up_to_nearest_100(length)
-                    if current_box_length == 0 or current_box_length == expected_box_length:
-                        df_copy.at[idx, "Box Length/mm"] = expected_box_length
-                    
-                    # Get box dimensions (either auto-calculated or manually entered)
-                    box_width = float(df_copy.at[idx, "Box Width/mm"])
-                    box_height = float(df_copy.at[idx, "Box Height/mm"])
-                    box_length = float(df_copy.at[idx, "Box Length/mm"])
-                    
-                    # Set default W/mm and H/mm if not set
-                    if pd.isna(row["W/mm"]) or row["W/mm"] == "":
-                        df_copy.at[idx, "W/mm"] = "Profiles are arranged in W direction"
-                        df_copy.at[idx, "H/mm"] = "Profiles are arranged in height direction"
-                    
-                    # Get the arrangement direction
-                    w_direction = df_copy.at[idx, "W/mm"]
-                    h_direction = df_copy.at[idx, "H/mm"]
-                    
-                    # Calculate Number of profiles per box based on arrangement
-                    profiles_per_box = 0
-                    
-                    # Determine which direction is primary
-                    if w_direction == "Profiles are arranged in height direction":
-                        # When W/mm says "height direction", it means profiles are arranged by height in the width direction
-                        # So: (Box Width / profile Height) * (Box Height / profile Width)
-                        if width > 0 and height > 0:
-                            profiles_per_box = (box_width / height) * (box_height / width)
-                        # Update H/mm to show the complementary direction
-                        df_copy.at[idx, "H/mm"] = "Profiles are arranged in W direction"
-                    
-                    else:  # "Profiles are arranged in W direction"
-                        # When W/mm says "W direction", it means profiles are arranged by width in the width direction
-                        # So: (Box Width / profile Width) * (Box Height / profile Height)
-                        if width > 0 and height > 0:
-                            profiles_per_box = (box_width / width) * (box_height / height)
-                        # Update H/mm to show the complementary direction
-                        df_copy.at[idx, "H/mm"] = "Profiles are arranged in height direction"
-                    
-                    # Use INTEGER value (floor) for number of profiles per box
-                    df_copy.at[idx, "Number of profiles per box"] = int(profiles_per_box) if profiles_per_box > 0 else 0
-                    
-                    # Update H/mm based on W/mm selection
-                    if w_direction == "Profiles are arranged in W direction":
-                        df_copy.at[idx, "H/mm"] = "Profiles are arranged in height direction"
-                    elif w_direction == "Profiles are arranged in height direction":
-                        df_copy.at[idx, "H/mm"] = "Profiles are arranged in W direction"
-                        
-                except (ValueError, TypeError, ZeroDivisionError):
-                    # Only reset if values are 0 or empty
-                    if pd.isna(row["Box Width/mm"]) or float(row["Box Width/mm"]) == 0:
-                        df_copy.at[idx, "Box Width/mm"] = 0
-                    if pd.isna(row["Box Height/mm"]) or float(row["Box Height/mm"]) == 0:
-                        df_copy.at[idx, "Box Height/mm"] = 0
-                    if pd.isna(row["Box Length/mm"]) or float(row["Box Length/mm"]) == 0:
-                        df_copy.at[idx, "Box Length/mm"] = 0
-                    df_copy.at[idx, "Number of profiles per box"] = 0
-            
-            # Update session state
-            st.session_state.secondary_sku_data = df_copy
+            # Manually set box dimensions are kept, profiles per box use the best layout
+            st.session_state.secondary_sku_data = calculate_box_and_profiles(
+                calculate_total_weight(st.session_state.secondary_sku_data)
+            )
             st.success("Auto-calculation completed!")
     
     with col2:
@@ -1371,85 +599,16 @@ with tab2:
                     key="auto_calc_btn_secondary"):
             auto_calculate_sku_table_secondary()
     
-    # Function to calculate box dimensions and number of profiles per box for secondary
-    def calculate_box_and_profiles_secondary(df):
-        """Calculate box dimensions and number of profiles per box for secondary"""
-        df_copy = df.copy()
-        for idx, row in df_copy.iterrows():
-            try:
-                # Get profile dimensions
-                width = float(row["Width/mm"])
-                height = float(row["Height/mm"])
-                length = float(row["Length/mm"])
-                
-                # Calculate box dimensions (round UP to nearest 100)
-                def round_up_to_nearest_100(num):
-                    """Round UP to nearest 100"""
-                    return ((int(num) + 99) // 100) * 100
-                
-                # Only auto-calculate if box dimensions are 0 or not set
-                if pd.isna(row["Box Width/mm"]) or float(row["Box Width/mm"]) == 0:
-                    df_copy.at[idx, "Box Width/mm"] = round_up_to_nearest_100(width)
-                else:
-                    # Keep existing value
-                    df_copy.at[idx, "Box Width/mm"] = row["Box Width/mm"]
-                    
-                if pd.isna(row["Box Height/mm"]) or float(row["Box Height/mm"]) == 0:
-                    df_copy.at[idx, "Box Height/mm"] = round_up_to_nearest_100(height)
-                else:
-                    # Keep existing value
-                    df_copy.at[idx, "Box Height/mm"] = row["Box Height/mm"]
-                    
-                if pd.isna(row["Box Length/mm"]) or float(row["Box Length/mm"]) == 0:
-                    df_copy.at[idx, "Box Length/mm"] = round_up_to_nearest_100(length)
-                else:
-                    # Keep existing value
-                    df_copy.at[idx, "Box Length/mm"] = row["Box Length/mm"]
-                
-                # Get box dimensions
-                box_width = float(df_copy.at[idx, "Box Width/mm"])
-                box_height = float(df_copy.at[idx, "Box Height/mm"])
-                box_length = float(df_copy.at[idx, "Box Length/mm"])
-                
-                # Set default W/mm and H/mm if not set
-                if pd.isna(row["W/mm"]) or row["W/mm"] == "":
-                    df_copy.at[idx, "W/mm"] = "Profiles are arranged in W direction"
-                    df_copy.at[idx, "H/mm"] = "Profiles are arranged in height direction"
-                
-                # Calculate Number of profiles per box based on W/mm selection
-                w_direction = df_copy.at[idx, "W/mm"]
-                profiles_per_box = 0
-                
-                if w_direction == "Profiles are arranged in height direction":
-                    # (Box Height/profile width)*(Box Width/profile Height)
-                    if width > 0 and height > 0:
-                        profiles_per_box = (box_height / width) * (box_width / height)
-                else:  # "Profiles are arranged in W direction"
-                    # (Box Width/profile width)*(Box Height/profile Height)
-                    if width > 0 and height > 0:
-                        profiles_per_box = (box_width / width) * (box_height / height)
-                
-                # Use INTEGER value (floor) for number of profiles per box
-                df_copy.at[idx, "Number of profiles per box"] = int(profiles_per_box) if profiles_per_box > 0 else 0
-                
-                # Update H/mm based on W/mm selection
-                if w_direction == "Profiles are arranged in W direction":
-                    df_copy.at[idx, "H/mm"] = "Profiles are arranged in height direction"
-                elif w_direction == "Profiles are arranged in height direction":
-                    df_copy.at[idx, "H/mm"] = "Profiles are arranged in W direction"
-                    
-            except (ValueError, TypeError, ZeroDivisionError):
-                # Set default values on error
-                df_copy.at[idx, "Box Width/mm"] = 0
-                df_copy.at[idx, "Box Height/mm"] = 0
-                df_copy.at[idx, "Box Length/mm"] = 0
-                df_copy.at[idx, "Number of profiles per box"] = 0
-        
-        return df_copy
-    
-    # Calculate initial values - ONLY if data exists
-    if not st.session_state.secondary_sku_data.empty:
-        st.session_state.secondary_sku_data = calculate_box_and_profiles_secondary(st.session_state.secondary_sku_data)
+    # Calculate the whole table once (first load, or after auto-calculation was switched off);
+    # afterwards only the rows touched in the editor are recalculated
+    if 'secondary_sku_needs_recalc' not in st.session_state:
+        st.session_state.secondary_sku_needs_recalc = True
+    if (st.session_state.secondary_sku_needs_recalc and st.session_state.get("auto_calc_enabled_secondary", True)
+            and not st.session_state.secondary_sku_data.empty):
+        st.session_state.secondary_sku_data = calculate_box_and_profiles(
+            calculate_total_weight(st.session_state.secondary_sku_data)
+        )
+        st.session_state.secondary_sku_needs_recalc = False
     
     # Create editable dataframe for SKU input
     edited_sku_df_secondary = st.data_editor(
@@ -1472,7 +631,8 @@ with tab2:
                     "Profiles are arranged in W direction", 
                     "Profiles are arranged in height direction"
                 ],
-                required=True
+                required=True,
+                disabled=True  # Set to the arrangement of the best box layout
             ),
             "H/mm": st.column_config.TextColumn(
                 "H/mm",
@@ -1486,6 +646,11 @@ with tab2:
                 format="%d",  # Changed from "%.2f" to "%d" for integer display
                 disabled=True
             ),
+            "Box layout": st.column_config.TextColumn(
+                "Box layout",
+                help="Profiles across box width × height (profile dimensions), | side by side, / stacked",
+                disabled=True
+            ),
             "Comment on fabrication": st.column_config.SelectboxColumn(
                 "Comment on fabrication",
                 options=["Fabricated", "Just Cutting"],
@@ -1495,33 +660,21 @@ with tab2:
         key="sku_editor_secondary"
     )
     
-    # Callback function to auto-calculate total weight for secondary
-    def calculate_total_weight_secondary(df):
-        """Calculate total weight per profile based on unit weight and length for secondary"""
-        df_copy = df.copy()
-        for idx, row in df_copy.iterrows():
-            try:
-                unit_weight = float(row["Unit weight(kg/m)"])
-                length_mm = float(row["Length/mm"])
-                # Calculate: Unit weight(kg/m) * (Length(mm) / 1000)
-                total_weight = unit_weight * (length_mm / 1000)
-                df_copy.at[idx, "total weight per profile (kg)"] = round(total_weight, 4)
-            except (ValueError, TypeError):
-                df_copy.at[idx, "total weight per profile (kg)"] = 0
-        return df_copy
-    
     # Update the session state with calculated weights and box dimensions
-    if not edited_sku_df_secondary.equals(st.session_state.secondary_sku_data):
-        # Only recalculate if enabled and data has actually changed
+    editor_state = st.session_state.get("sku_editor_secondary", {})
+    if editor_state.get("edited_rows") or editor_state.get("added_rows") or editor_state.get("deleted_rows"):
         if st.session_state.get("auto_calc_enabled_secondary", True):
-            # First calculate total weights
-            edited_sku_df_with_weights = calculate_total_weight_secondary(edited_sku_df_secondary)
-            # Then calculate box dimensions and profiles
-            edited_sku_df_with_all = calculate_box_and_profiles_secondary(edited_sku_df_with_weights)
-            st.session_state.secondary_sku_data = edited_sku_df_with_all
+            # Recalculate only the rows edited or added in the data editor
+            changed_labels = changed_editor_rows(editor_state, st.session_state.secondary_sku_data, edited_sku_df_secondary)
+            if changed_labels:
+                changed_rows = calculate_box_and_profiles(
+                    calculate_total_weight(edited_sku_df_secondary.loc[changed_labels])
+                )
+                update_derived_columns(edited_sku_df_secondary, changed_labels, changed_rows)
         else:
             # Just update the data without calculations
-            st.session_state.secondary_sku_data = edited_sku_df_secondary
+            st.session_state.secondary_sku_needs_recalc = True
+        st.session_state.secondary_sku_data = edited_sku_df_secondary
         
     st.divider()
     
@@ -1658,6 +811,7 @@ with tab2:
     
     if apply_material_costs:
         st.session_state.secondary_material_costs = edited_secondary_material_df
+        save_reference_prices()
         st.success("Material costs updated!")
     
     # Table 2: Cardboard Box Cost
@@ -1735,6 +889,7 @@ with tab2:
     
     if apply_polybag_costs:
         st.session_state.polybag_costs = edited_polybag_df
+        save_reference_prices()
         st.success("Polybag costs updated!")
     
     # Table 4: Stretch wrap cost
@@ -1768,6 +923,7 @@ with tab2:
     
     if apply_stretchwrap_costs:
         st.session_state.stretchwrap_costs = edited_stretchwrap_df
+        save_reference_prices()
         st.success("Stretchwrap costs updated!")
     
     # Add packing type selection
@@ -1780,31 +936,74 @@ with tab2:
     # New Section: Crate/Pallet dimensions table
     st.subheader("Crate/Pallet Dimensions Table")
     
-    # Create dataframe with SKUs from the SKU input table
-    if not st.session_state.secondary_sku_data.empty:
-        # Get unique SKUs from the SKU table
+    # Function to propose crate/pallet rows for SKUs of the secondary SKU table
+    def propose_crate_pallet(skus, limits):
+        """Sized crate/pallet rows with the cheaper method for the given SKUs"""
+        sku_data = st.session_state.secondary_sku_data
+        return size_crate_pallet(
+            sku_data[sku_data["SKU No"].isin(skus)],
+            compile_reference_pricing(
+                st.session_state.secondary_material_costs,
+                st.session_state.secondary_box_costs,
+                st.session_state.crate_costs,
+                st.session_state.pallet_costs,
+                st.session_state.strapping_clip_costs,
+                st.session_state.pp_strapping_costs,
+                st.session_state.cardboard_covering_costs
+            ),
+            limits
+        )
+    
+    def add_crate_pallet_proposals(crate_pallet_df):
+        """Add proposed crate/pallet rows for SKUs of the SKU table without a sized row.
+
+        SKUs missing from ``crate_pallet_df`` or with only zero-dimension rows
+        get a proposal once their own dimensions allow one; until then they
+        are left as they are and proposed again on a later run.
+        """
         sku_list = st.session_state.secondary_sku_data["SKU No"].unique().tolist()
+        dimension_columns = ["Width/mm", "Height/mm", "Length/mm"]
+        dimensions = crate_pallet_df[dimension_columns].apply(pd.to_numeric, errors="coerce").fillna(0)
+        unsized = (dimensions <= 0).all(axis=1)
+        sized_skus = set(crate_pallet_df.loc[~unsized, "SKU"])
+        pending = [sku for sku in sku_list if sku not in sized_skus]
+        if not pending:
+            return crate_pallet_df
         
-        # Check if crate_pallet_data needs to be updated with new SKUs
-        existing_skus = st.session_state.crate_pallet_data["SKU"].unique().tolist() if not st.session_state.crate_pallet_data.empty else []
-        
-        # Add new SKUs that aren't already in the crate/pallet table
-        new_skus = [sku for sku in sku_list if sku not in existing_skus]
-        
-        if new_skus:
-            new_rows = []
-            for sku in new_skus:
-                new_rows.append({
-                    "SKU": sku,
-                    "packing method": "pallet",  # default value
-                    "Width/mm": 0,
-                    "Height/mm": 0,
-                    "Length/mm": 0
-                })
-            
-            if new_rows:
-                new_df = pd.DataFrame(new_rows)
-                st.session_state.crate_pallet_data = pd.concat([st.session_state.crate_pallet_data, new_df], ignore_index=True)
+        proposals = propose_crate_pallet(pending, st.session_state.get("load_sizing_limits", LoadSizingLimits()))
+        # SKUs that cannot be sized yet come back with zero dimensions
+        proposals = proposals[(proposals[dimension_columns] > 0).any(axis=1)]
+        if proposals.empty:
+            return crate_pallet_df
+        replaced = unsized & crate_pallet_df["SKU"].isin(proposals["SKU"])
+        return pd.concat([crate_pallet_df[~replaced], proposals], ignore_index=True)
+    
+    # New SKUs of the SKU input table start with a proposed crate/pallet instead of zero dimensions
+    if not st.session_state.secondary_sku_data.empty:
+        st.session_state.crate_pallet_data = add_crate_pallet_proposals(st.session_state.crate_pallet_data)
+    
+    with st.expander("📐 Auto-size crates/pallets"):
+        st.caption("Proposes the smallest crate or pallet holding the target number of profiles (fewer if they "
+                   "exceed the weight limit) and picks the method with the lower cost per profile. "
+                   "Overwrites the dimensions and method of every SKU.")
+        sizing_cols = st.columns(4)
+        with sizing_cols[0]:
+            target_profiles = st.number_input("Target profiles", min_value=1, value=100, step=10, key="sizing_target_profiles")
+        with sizing_cols[1]:
+            max_load_weight = st.number_input("Max weight (kg)", min_value=1.0, value=1000.0, step=50.0, key="sizing_max_weight")
+        with sizing_cols[2]:
+            max_load_width = st.number_input("Max width (mm)", min_value=50.0, value=1200.0, step=50.0, key="sizing_max_width")
+        with sizing_cols[3]:
+            max_load_height = st.number_input("Max height (mm)", min_value=50.0, value=1000.0, step=50.0, key="sizing_max_height")
+        if st.button("📐 Auto-Size All Crates/Pallets", use_container_width=True):
+            st.session_state.load_sizing_limits = LoadSizingLimits(
+                int(target_profiles), max_load_weight, max_load_width, max_load_height
+            )
+            if not st.session_state.secondary_sku_data.empty:
+                st.session_state.crate_pallet_data = propose_crate_pallet(
+                    st.session_state.secondary_sku_data["SKU No"].unique().tolist(), st.session_state.load_sizing_limits
+                )
+                st.success("Crate/pallet sizes proposed!")
     
     # Create editable crate/pallet dimensions table
     edited_crate_pallet_df = st.data_editor(
@@ -1831,29 +1030,7 @@ with tab2:
     if apply_crate_pallet:
         # Sync SKUs before applying
         if not st.session_state.secondary_sku_data.empty:
-            # Get unique SKUs from the SKU table
-            sku_list = st.session_state.secondary_sku_data["SKU No"].unique().tolist()
-            
-            # Check if crate_pallet_data needs to be updated with new SKUs
-            existing_skus = edited_crate_pallet_df["SKU"].unique().tolist() if not edited_crate_pallet_df.empty else []
-            
-            # Add new SKUs that aren't already in the crate/pallet table
-            new_skus = [sku for sku in sku_list if sku not in existing_skus]
-            
-            if new_skus:
-                new_rows = []
-                for sku in new_skus:
-                    new_rows.append({
-                        "SKU": sku,
-                        "packing method": "pallet",
-                        "Width/mm": 0,
-                        "Height/mm": 0,
-                        "Length/mm": 0
-                    })
-                
-                if new_rows:
-                    new_df = pd.DataFrame(new_rows)
-                    edited_crate_pallet_df = pd.concat([edited_crate_pallet_df, new_df], ignore_index=True)
+            edited_crate_pallet_df = add_crate_pallet_proposals(edited_crate_pallet_df)
         
         st.session_state.crate_pallet_data = edited_crate_pallet_df
         st.success("Crate/Pallet data updated!")
@@ -1883,6 +1060,7 @@ with tab2:
     
     if apply_crate_costs:
         st.session_state.crate_costs = edited_crate_costs_df
+        save_reference_prices()
         st.success("Crate costs updated!")
     
     # Table 2: Pallet Cost
@@ -1906,6 +1084,7 @@ with tab2:
     
     if apply_pallet_costs:
         st.session_state.pallet_costs = edited_pallet_costs_df
+        save_reference_prices()
         st.success("Pallet costs updated!")
     
     # Table 3: Strapping clip cost
@@ -1928,6 +1107,7 @@ with tab2:
     
     if apply_strapping_clip:
         st.session_state.strapping_clip_costs = edited_strapping_clip_df
+        save_reference_prices()
         st.success("Strapping clip costs updated!")
     
     # Table 4: PP strapping cost
@@ -1976,8 +1156,11 @@ with tab2:
         st.session_state.polybag_costs = edited_polybag_df
         # Apply stretchwrap costs
         st.session_state.stretchwrap_costs = edited_stretchwrap_df
+        # Apply PP strapping costs
+        st.session_state.pp_strapping_costs = edited_pp_strapping_df
         # Apply cardboard covering costs
         st.session_state.cardboard_covering_costs = edited_cardboard_covering_df
+        save_reference_prices()
         
         st.success("All secondary cost changes applied successfully!")
     
@@ -1996,114 +1179,33 @@ with tab2:
         st.subheader("Table 3: Secondary Packing Total Cost")
         
         if not st.session_state.secondary_sku_data.empty:
-            # Prepare calculations - SAME AS PRIMARY
-            calculations_data = []
-            
-            # Get material costs as dictionary
-            material_cost_dict = dict(zip(
-                st.session_state.secondary_material_costs["Material"],
-                st.session_state.secondary_material_costs["Cost/ m²"]
-            ))
-            
-            # Get reference box dimensions and cost
-            ref_box = st.session_state.secondary_box_costs.iloc[0]
+            # Same costing kernel as primary, with the secondary tables
+            # Compiled rates are cached until a secondary cost table is edited
+            secondary_pricing = compile_reference_pricing(
+                st.session_state.secondary_material_costs,
+                st.session_state.secondary_box_costs,
+                st.session_state.crate_costs,
+                st.session_state.pallet_costs,
+                st.session_state.strapping_clip_costs,
+                st.session_state.pp_strapping_costs,
+                st.session_state.cardboard_covering_costs
+            )
+            calculations, valid_mask = cached_packing_costs(
+                st.session_state.secondary_sku_data,
+                secondary_pricing,
+                interleaving_required_tab2,
+                eco_friendly_tab2,
+                protective_tape_tab2
+            )
             
-            for _, sku in st.session_state.secondary_sku_data.iterrows():
-                try:
-                    # Get SKU dimensions
-                    width = float(sku["Width/mm"])
-                    height = float(sku["Height/mm"])
-                    length = float(sku["Length/mm"])
-                    unit_weight = float(sku["Unit weight(kg/m)"])
-                    total_weight = float(sku["total weight per profile (kg)"])
-                    
-                    # Get box dimensions from SKU table
-                    box_width = float(sku["Box Width/mm"])
-                    box_height = float(sku["Box Height/mm"])
-                    box_length = float(sku["Box Length/mm"])
-                    profiles_per_box = float(sku["Number of profiles per box"])
-                    
-                    # Calculate Surface Area in m² (using profile dimensions)
-                    sa_m2 = (2 * ((width * height) + (width * length) + (height * length))) / (1000 * 1000)
-                    
-                    # Calculate Interleaving Cost
-                    interleaving_cost = 0
-                    if interleaving_required_tab2 == "Yes":
-                        material_map = {
-                            "Mac foam": "McFoam",
-                            "Stretch wrap": "Stretchwrap",
-                            "Craft Paper": "Craft Paper"
-                        }
-                        selected_material = material_map.get(eco_friendly_tab2, "McFoam")
-                        cost_per_m2 = material_cost_dict.get(selected_material, 0)
-                        interleaving_cost = (cost_per_m2 * sa_m2)/profiles_per_box if profiles_per_box > 0 else 0
-                    
-                    # Calculate Protective Tape Cost
-                    protective_tape_cost = 0
-                    if protective_tape_tab2 == "Yes":
-                        cost_per_m2 = material_cost_dict.get("Protective Tape", 0)
-                        protective_tape_cost = (cost_per_m2 * sa_m2)/profiles_per_box if profiles_per_box > 0 else 0
-                    
-                    # Calculate Packing Cost - SAME FORMULA AS PRIMARY
-                    packing_cost = 0
-                    if ref_box["Length(mm)"] > 0 and ref_box["Width (mm)"] > 0 and ref_box["Height (mm)"] > 0:
-                        if profiles_per_box > 0:
-                            # Calculate cost per box volume
-                            box_volume_cost = (ref_box["Cost (LKR)"] / (ref_box["Width (mm)"] * ref_box["Height (mm)"] * ref_box["Length(mm)"]))
-                            # Calculate actual box volume from SKU table
-                            actual_box_volume = box_width * box_height * box_length
-                            # Total box cost = cost per volume * actual box volume
-                            total_box_cost = box_volume_cost * actual_box_volume
-                            # Packing cost per profile = total box cost / number of profiles per box
-                            packing_cost = total_box_cost / profiles_per_box
-                        else:
-                            # Fallback to original calculation if profiles_per_box is 0
-                            packing_cost = (ref_box["Cost (LKR)"] / (ref_box["Width (mm)"] * ref_box["Height (mm)"] * ref_box["Length(mm)"])) * (width * height * length)
-                            
-                    # Calculate Total Cost
-                    total_cost = interleaving_cost + protective_tape_cost + packing_cost
-
-                    # Calculate Cost/kg (LKR)
-                    cost_per_kg = total_cost / total_weight if total_weight > 0 else 0
-                    
-                    # Calculate Cost/m (LKR) = Total Cost per profile/LKR / (Length/mm ÷ 1000)
-                    length_m = length / 1000  # Convert mm to meters
-                    cost_per_m = total_cost / length_m if length_m > 0 else 0
-
-                    calculations_data.append({
-                        "SKU": sku["SKU No"],
-                        "Interleaving cost": round(interleaving_cost, 2),
-                        "Protective tape cost": round(protective_tape_cost, 2),
-                        "Packing type": "Cardboard box",
-                        "Profiles per box": int(profiles_per_box),
-                        "Packing Cost (LKR)": round(packing_cost, 2),
-                        "Total Cost per profile/LKR": round(total_cost, 2),
-                        "Cost/kg (LKR)": round(cost_per_kg, 2),
-                        "Cost/m (LKR)": round(cost_per_m, 2)
-                    })
-                    
-                except (ValueError, TypeError, ZeroDivisionError):
-                    continue
+            # Report rows that could not be costed instead of silently skipping them
+            if not valid_mask.all():
+                invalid_skus = st.session_state.secondary_sku_data.loc[~valid_mask, "SKU No"].astype(str).tolist()
+                st.warning(f"Skipped {len(invalid_skus)} SKU(s) with missing or invalid values: {', '.join(invalid_skus)}")
             
-            if calculations_data:
+            if not calculations.empty:
                 # Store calculations in session state
-                st.session_state.secondary_calculations = pd.DataFrame(calculations_data)
-
-                # Reorder columns if needed
-                column_order = [
-                    "SKU",
-                    "Interleaving cost", 
-                    "Protective tape cost",
-                    "Packing type",
-                    "Profiles per box",
-                    "Packing Cost (LKR)",
-                    "Total Cost per profile/LKR",
-                    "Cost/kg (LKR)",
-                    "Cost/m (LKR)"
-                ]
-                
-                # Reorder the columns
-                st.session_state.secondary_calculations = st.session_state.secondary_calculations[column_order]
+                st.session_state.secondary_calculations = calculations
                 
                 # Display the calculated results table (read-only)
                 st.dataframe(
@@ -2121,135 +1223,29 @@ with tab2:
         st.markdown("**Total Crate/Pallet Cost Calculation**")
         
         if not st.session_state.secondary_sku_data.empty and not st.session_state.crate_pallet_data.empty:
-            # Get data for calculations
-            crate_data = st.session_state.crate_costs.iloc[0]
-            pallet_data = st.session_state.pallet_costs.iloc[0]
-            strapping_clip_data = st.session_state.strapping_clip_costs.iloc[0]
-            pp_strapping_data = st.session_state.pp_strapping_costs.iloc[0]
-            
-            # Prepare calculations data
-            crate_pallet_calculations_data = []
-            
-            # Create a dictionary to map SKU to its dimensions from SKU table
-            sku_dimensions = {}
-            for _, sku in st.session_state.secondary_sku_data.iterrows():
-                try:
-                    sku_dimensions[sku["SKU No"]] = {
-                        "width": float(sku["Width/mm"]),
-                        "height": float(sku["Height/mm"]),
-                        "length": float(sku["Length/mm"])
-                    }
-                except (ValueError, TypeError):
-                    continue
+            # Join crate/pallet rows to the SKU table and cost them in one pass
+            crate_pallet_calculations, valid_mask, unmatched_skus = cached_crate_pallet_costs(
+                st.session_state.crate_pallet_data,
+                st.session_state.secondary_sku_data,
+                compile_reference_pricing(
+                    st.session_state.secondary_material_costs,
+                    st.session_state.secondary_box_costs,
+                    st.session_state.crate_costs,
+                    st.session_state.pallet_costs,
+                    st.session_state.strapping_clip_costs,
+                    st.session_state.pp_strapping_costs,
+                    st.session_state.cardboard_covering_costs
+                )
+            )
             
-            # Process each entry in crate/pallet data
-            for _, crate_pallet_row in st.session_state.crate_pallet_data.iterrows():
-                try:
-                    sku_no = crate_pallet_row["SKU"]
-                    packing_method = crate_pallet_row["packing method"]
-                    crate_pallet_width = float(crate_pallet_row["Width/mm"])
-                    crate_pallet_height = float(crate_pallet_row["Height/mm"])
-                    crate_pallet_length = float(crate_pallet_row["Length/mm"])
-                    
-                    # Get SKU dimensions
-                    if sku_no not in sku_dimensions:
-                        continue
-                        
-                    profile_width = sku_dimensions[sku_no]["width"]
-                    profile_height = sku_dimensions[sku_no]["height"]
-                    profile_length = sku_dimensions[sku_no]["length"]
-                    
-                    # Calculate profiles per pallet/crate
-                    profiles_per_crate_pallet = 0
-                    if profile_width > 0 and profile_height > 0:
-                        profiles_per_crate_pallet = (crate_pallet_width / profile_width) * (crate_pallet_height / profile_height)
-                    
-                    # Calculate crate/pallet cost(LKR)
-                    crate_pallet_cost = 0
-                    if packing_method == "pallet":
-                        # (((Crate/Pallet Dimensions Table width*height*length) / (Table 2: Pallet Cost width*height*length)) * Table 2: Pallet Cost cost)
-                        crate_pallet_volume = crate_pallet_width * crate_pallet_height * crate_pallet_length
-                        pallet_ref_volume = pallet_data["Pallet width/mm"] * pallet_data["Pallet Height/mm"] * crate_pallet_length
-                        
-                        if pallet_ref_volume > 0:
-                            crate_pallet_cost = (crate_pallet_volume / pallet_ref_volume) * pallet_data["Cost (LKR)"]
-                    
-                    elif packing_method == "crate":
-                        # (((Crate/Pallet Dimensions Table width*height*length) / (Table 1: Crate Cost width*height*length)) * Table 1: Crate Cost cost)
-                        crate_pallet_volume = crate_pallet_width * crate_pallet_height * crate_pallet_length
-                        crate_ref_volume = crate_data["Crate width/mm"] * crate_data["Crate Height/mm"] * crate_data["Crate Length/mm"]
-                        
-                        if crate_ref_volume > 0:
-                            crate_pallet_cost = (crate_pallet_volume / crate_ref_volume) * crate_data["Cost (LKR)"]
-                    
-                    # Calculate packing cost per profile(LKR/prof)
-                    packing_cost_per_profile = 0
-                    if profiles_per_crate_pallet > 0:
-                        packing_cost_per_profile = crate_pallet_cost / profiles_per_crate_pallet
-                    
-                    # Calculate Number of strapping clips
-                    number_of_strapping_clips = 0
-                    if crate_pallet_length > 0:
-                        number_of_strapping_clips = np.ceil(crate_pallet_length / 500)
-                    
-                    # Calculate strapping clip cost per profile
-                    strapping_clip_cost_per_profile = 0
-                    if profiles_per_crate_pallet > 0:
-                        total_clip_cost = number_of_strapping_clips * strapping_clip_data["Cost"]
-                        strapping_clip_cost_per_profile = total_clip_cost / profiles_per_crate_pallet
-                    
-                    # Calculate PP strapping cost per profile
-                    pp_strapping_cost_per_profile = 0
-                    if profiles_per_crate_pallet > 0 and pp_strapping_data["Strapping Length/m"] > 0:
-                        pp_strapping_cost_per_profile = (
-                            (((crate_pallet_width + crate_pallet_height)/1000) / pp_strapping_data["Strapping Length/m"]) / 
-                            profiles_per_crate_pallet
-                        ) * (number_of_strapping_clips * 2) * pp_strapping_data["Cost (LKR/m)"]
-                    
-                    # Calculate PP strapping cost (total, not per profile - for display purposes)
-                    pp_strapping_cost = pp_strapping_cost_per_profile * profiles_per_crate_pallet if profiles_per_crate_pallet > 0 else 0
-
-                    # Get cardboard covering data
-                    cardboard_covering_data = st.session_state.cardboard_covering_costs.iloc[0]
-                    
-                    # Calculate cardboard covering cost per profile
-                    cardboard_covering_cost_per_profile = 0
-                    if profiles_per_crate_pallet > 0 and cardboard_covering_data["Area of the pallet (m²)"] > 0:
-                        # Calculate total surface area of crate/pallet in m²
-                        # ((width*height)*2 + (width*length)*2 + (height*length)*2) / 1,000,000
-                        total_surface_area_m2 = ((crate_pallet_width * crate_pallet_height) * 2 + 
-                                               (crate_pallet_width * crate_pallet_length) * 2 + 
-                                               (crate_pallet_height * crate_pallet_length) * 2) / 1000000
-                        
-                        # Calculate total cardboard covering cost
-                        total_cardboard_covering_cost = (total_surface_area_m2 / cardboard_covering_data["Area of the pallet (m²)"]) * cardboard_covering_data["Price (LKR)"]
-                        
-                        # Calculate cost per profile
-                        cardboard_covering_cost_per_profile = total_cardboard_covering_cost / profiles_per_crate_pallet
-                    
-                    # Calculate Total cost
-                    total_cost = packing_cost_per_profile + strapping_clip_cost_per_profile + pp_strapping_cost_per_profile + cardboard_covering_cost_per_profile + crate_pallet_cost
-                    
-                    # Add to calculations data
-                    crate_pallet_calculations_data.append({
-                        "SKU": sku_no,
-                        "Packing method": packing_method,
-                        "profiles per pallet/crate": round(profiles_per_crate_pallet, 2),
-                        "crate/pallet cost(LKR)": round(crate_pallet_cost, 2),
-                        "packing cost per profile(LKR/prof)": round(packing_cost_per_profile, 4),
-                        "Number of strapping clips": int(number_of_strapping_clips),
-                        "strapping clip cost per profile": round(strapping_clip_cost_per_profile, 4),
-                        "PP strapping cost": round(pp_strapping_cost, 4),
-                        "PP strapping cost per profile": round(pp_strapping_cost_per_profile, 4),
-                        "Cardboard covering cost(LKR/profile)": round(cardboard_covering_cost_per_profile, 4),
-                        "Total cost": round(total_cost, 4)
-                    })
-                    
-                except (ValueError, TypeError, ZeroDivisionError) as e:
-                    continue
+            # Report crate/pallet rows that could not be matched or costed
+            if unmatched_skus:
+                st.warning(f"No SKU table entry for {len(unmatched_skus)} crate/pallet row(s): {', '.join(map(str, unmatched_skus))}")
+            if (~valid_mask).sum() > len(unmatched_skus):
+                st.warning("Some crate/pallet rows have missing or invalid dimensions and were skipped.")
             
-            if crate_pallet_calculations_data:
-                st.session_state.crate_pallet_calculations = pd.DataFrame(crate_pallet_calculations_data)
+            if not crate_pallet_calculations.empty:
+                st.session_state.crate_pallet_calculations = crate_pallet_calculations
                 st.dataframe(st.session_state.crate_pallet_calculations, use_container_width=True)
             else:
                 st.warning("Unable to calculate crate/pallet costs. Please check all input data is valid.")
@@ -2285,3 +1281,41 @@ with tab2:
     """
     
     st.info(comments_box)
+
+# Start building the report in the background now that the calculations are done
+report_future = submit_excel_report(*report_inputs())
+with report_slot.container():
+    if report_future.done() and report_future.exception() is None:
+        st.download_button(
+            label="📥 Download Complete Report (Excel)",
+            data=report_future.result(),
+            file_name="packing_costing_report.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            type="primary",
+            use_container_width=True
+        )
+    elif st.button("📥 Download Complete Report (Excel)", type="primary", use_container_width=True):
+        try:
+            excel_data = report_future.result()
+            st.download_button(
+                label="⬇️ Click to Download Excel File",
+                data=excel_data,
+                file_name="packing_costing_report.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                use_container_width=True
+            )
+        except Exception as e:
+            st.error(f"Error generating report: {str(e)}")
+
+    # Columnar export of the result tables for analytics
+    if st.button("🗂️ Export Results (Parquet)", use_container_width=True):
+        try:
+            st.download_button(
+                label="⬇️ Click to Download Parquet Files (ZIP)",
+                data=export_results(*report_inputs()),
+                file_name="packing_costing_results_parquet.zip",
+                mime="application/zip",
+                use_container_width=True
+            )
+        except Exception as e:
+            st.error(f"Error exporting results: {str(e)}")
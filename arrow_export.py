@@ -0,0 +1,97 @@
+"""Columnar export of costing results for downstream analytics.
+
+The result tables (Table 3 for primary and secondary packing and the
+crate/pallet cost calculation) are written as Parquet or Arrow IPC files with
+an explicit schema, so they load with stable dtypes regardless of what pandas
+inferred in the session. The packing selections of the run are stored as
+JSON in the schema metadata.
+
+pyarrow is imported lazily; only the export needs it.
+"""
+import io
+import json
+import zipfile
+from pathlib import Path
+
+from costing_engine import PACKING_COST_COLUMNS, CRATE_PALLET_COST_COLUMNS
+
+# Result tables and their column order
+RESULT_TABLES = {
+    "primary_calculations": PACKING_COST_COLUMNS,
+    "secondary_calculations": PACKING_COST_COLUMNS,
+    "crate_pallet_calculations": CRATE_PALLET_COST_COLUMNS
+}
+
+STRING_COLUMNS = {"SKU", "Packing type", "Box SAP Item Code", "Packing method", "Load unit", "Load layout"}
+INTEGER_COLUMNS = {"Profiles per box", "Number of strapping clips", "units per pallet/crate", "profiles per pallet/crate"}
+
+FILE_FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+
+def result_schema(table_name, selections=None):
+    """Arrow schema of a result table with the table name and selections as metadata"""
+    import pyarrow as pa
+
+    fields = []
+    for column in RESULT_TABLES[table_name]:
+        if column in STRING_COLUMNS:
+            fields.append(pa.field(column, pa.string()))
+        elif column in INTEGER_COLUMNS:
+            fields.append(pa.field(column, pa.int64()))
+        else:
+            fields.append(pa.field(column, pa.float64()))
+    metadata = {
+        "costing.table": table_name,
+        "costing.selections": json.dumps(selections or {}, sort_keys=True, default=str)
+    }
+    return pa.schema(fields, metadata=metadata)
+
+
+def to_arrow_table(df, table_name, selections=None):
+    """Convert a result DataFrame to an Arrow table with the explicit result schema"""
+    import pyarrow as pa
+
+    schema = result_schema(table_name, selections)
+    missing = [column for column in schema.names if column not in df.columns]
+    if missing:
+        raise ValueError(f"{table_name} is missing columns: {', '.join(missing)}")
+
+    arrays = []
+    for schema_field in schema:
+        values = df[schema_field.name]
+        if pa.types.is_string(schema_field.type):
+            values = values.astype("string")
+        arrays.append(pa.array(values, type=schema_field.type, from_pandas=True))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def write_result_file(df, table_name, destination, selections=None, file_format="parquet"):
+    """Write one result table to a path or binary buffer as Parquet or Arrow IPC"""
+    table = to_arrow_table(df, table_name, selections)
+    sink = str(destination) if isinstance(destination, Path) else destination
+    if file_format == "parquet":
+        import pyarrow.parquet as pq
+
+        pq.write_table(table, sink)
+    elif file_format == "arrow":
+        import pyarrow as pa
+
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        raise ValueError(f"Unknown file format: {file_format}")
+
+
+def export_results(tables, selections=None, file_format="parquet"):
+    """Zip every non-empty result table in ``tables`` as ``<table name>.<format>`` and return the bytes"""
+    output = io.BytesIO()
+    # The files are already compressed columnar data, store them as they are
+    with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_STORED) as archive:
+        for table_name in RESULT_TABLES:
+            df = tables.get(table_name)
+            if df is None or df.empty:
+                continue
+            buffer = io.BytesIO()
+            write_result_file(df, table_name, buffer, selections, file_format)
+            archive.writestr(table_name + FILE_FORMATS[file_format], buffer.getvalue())
+    return output.getvalue()
@@ -0,0 +1,443 @@
+"""Headless batch costing of SKU files.
+
+Prices a CSV/Excel file of SKUs with the same formulas as the Streamlit app
+(Table 3 packing cost and, optionally, the crate/pallet cost table) without
+importing Streamlit, so it can run from cron for catalogue repricing.
+
+Example:
+    python batch_costing.py skus.csv -o packing_costs.csv \\
+        --crate-pallet crate_pallet.csv --crate-pallet-output crate_pallet_costs.csv
+
+With ``--chunksize N`` the SKU file is read, costed and written N rows at a
+time, so peak memory depends on the chunk size rather than the file size.
+``--workers N`` costs the chunks on N processes; results keep the input order.
+"""
+import argparse
+import math
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+from costing_engine import (
+    calculate_packing_costs, calculate_crate_pallet_costs,
+    calculate_total_weight, calculate_box_and_profiles,
+    PACKING_COST_COLUMNS
+)
+from reference_pricing import compile_reference_pricing
+from arrow_export import write_result_file
+
+# Number of invalid/unmatched SKUs kept as examples in a streaming summary
+MAX_REPORTED_SKUS = 20
+
+# SKU rows per task when a whole table is split across worker processes: about
+# TASKS_PER_WORKER tasks per worker, but no fewer rows than the minimum (process
+# overhead) and no more than the maximum (memory per task)
+TASKS_PER_WORKER = 4
+MIN_PARALLEL_CHUNK_ROWS = 1000
+PARALLEL_CHUNK_ROWS = 50000
+
+# Default reference tables, same values the app starts with
+DEFAULT_REFERENCE_TABLES = {
+    "material_costs": {
+        "Material": ["McFoam", "Craft Paper", "Protective Tape", "Stretchwrap"],
+        "Cost/ m²": [35.00, 34.65, 100.65, 14.38]
+    },
+    "box_costs": {
+        "SAP Item Code": [345],
+        "Length(mm)": [330], "Width (mm)": [210],
+        "Height (mm)": [135], "Cost (LKR)": [205.00]
+    },
+    "crate_costs": {
+        "Crate width/mm": [480], "Crate Height/mm": [590],
+        "Crate Length/mm": [2000], "Cost (LKR)": [5000.00]
+    },
+    "pallet_costs": {
+        "Pallet width/mm": [2000], "Pallet Height/mm": [600],
+        "Cost (LKR)": [3000.00]
+    },
+    "strapping_clip_costs": {
+        "number of clips": [1], "Cost": [12.00]
+    },
+    "pp_strapping_costs": {
+        "Strapping Length/m": [1], "Cost (LKR/m)": [15.00]
+    },
+    "cardboard_covering_costs": {
+        "Area of the pallet (m²)": [1], "Price (LKR)": [512.54]
+    }
+}
+
+
+def read_table(path):
+    """Read a CSV or Excel file into a DataFrame"""
+    path = Path(path)
+    if path.suffix.lower() in (".xlsx", ".xls"):
+        return pd.read_excel(path)
+    return pd.read_csv(path)
+
+
+def write_table(df, path, table_name=None, selections=None):
+    """Write a DataFrame to CSV, Excel, Parquet or Arrow depending on the file extension.
+
+    Parquet and Arrow files use the explicit schema of result table
+    ``table_name`` and carry ``selections`` as metadata.
+    """
+    path = Path(path)
+    if path.suffix.lower() in (".xlsx", ".xls"):
+        df.to_excel(path, index=False)
+    elif path.suffix.lower() in (".parquet", ".arrow"):
+        write_result_file(df, table_name, path, selections, file_format=path.suffix.lower()[1:])
+    else:
+        df.to_csv(path, index=False)
+
+
+def iter_table_chunks(path, chunksize):
+    """Yield a CSV or Excel file as DataFrames of at most ``chunksize`` rows"""
+    path = Path(path)
+    if path.suffix.lower() in (".xlsx", ".xls"):
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) == chunksize:
+                    yield pd.DataFrame(batch, columns=header)
+                    batch = []
+            if batch:
+                yield pd.DataFrame(batch, columns=header)
+        finally:
+            workbook.close()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize)
+
+
+def load_reference_tables(paths=None):
+    """Return the reference tables, reading any table given in ``paths`` from file"""
+    paths = paths or {}
+    return {
+        name: read_table(paths[name]) if paths.get(name) else pd.DataFrame(default)
+        for name, default in DEFAULT_REFERENCE_TABLES.items()
+    }
+
+
+def prepare_sku_table(sku_df):
+    """Fill total weight, box dimensions and profiles per box like the app's auto-calculation"""
+    return calculate_box_and_profiles(calculate_total_weight(sku_df))
+
+
+def compile_batch_pricing(reference_tables):
+    """Compile a dict of reference tables (keys as in ``DEFAULT_REFERENCE_TABLES``)"""
+    return compile_reference_pricing(
+        reference_tables["material_costs"],
+        reference_tables["box_costs"],
+        reference_tables["crate_costs"],
+        reference_tables["pallet_costs"],
+        reference_tables["strapping_clip_costs"],
+        reference_tables["pp_strapping_costs"],
+        reference_tables["cardboard_covering_costs"]
+    )
+
+
+def run_batch(sku_df, reference_tables, interleaving_required="No", eco_friendly="Mac foam",
+              protective_tape="No", crate_pallet_data=None):
+    """Cost a SKU table and, when given, its crate/pallet rows.
+
+    Returns a dict with ``packing_costs`` and ``invalid_skus`` and, if
+    ``crate_pallet_data`` is given, ``crate_pallet_costs`` (indexed by the
+    labels of the costed crate/pallet rows) and ``unmatched_skus``.
+    """
+    return cost_sku_table(sku_df, compile_batch_pricing(reference_tables), interleaving_required,
+                          eco_friendly, protective_tape, crate_pallet_data)
+
+
+def cost_sku_table(sku_df, pricing, interleaving_required="No", eco_friendly="Mac foam",
+                   protective_tape="No", crate_pallet_data=None):
+    """``run_batch`` with already compiled reference pricing"""
+    sku_df = prepare_sku_table(sku_df)
+
+    packing_costs, valid_mask = calculate_packing_costs(
+        sku_df, pricing, interleaving_required, eco_friendly, protective_tape
+    )
+    results = {
+        "packing_costs": packing_costs,
+        "invalid_skus": sku_df.loc[~valid_mask, "SKU No"].tolist()
+    }
+
+    if crate_pallet_data is not None:
+        crate_pallet_costs, valid_mask, unmatched_skus = calculate_crate_pallet_costs(crate_pallet_data, sku_df, pricing)
+        # Labelled like the crate/pallet rows they cost
+        crate_pallet_costs.index = crate_pallet_data.index[valid_mask.to_numpy()]
+        results["crate_pallet_costs"] = crate_pallet_costs
+        results["unmatched_skus"] = unmatched_skus
+
+    return results
+
+
+# Compiled pricing of the worker process, keyed by fingerprint; set once per worker
+_worker_pricing = {}
+
+
+def _init_worker(pricings):
+    _worker_pricing.update(pricings)
+
+
+def _cost_task(fingerprint, sku_df, selections, crate_pallet_data):
+    return cost_sku_table(sku_df, _worker_pricing[fingerprint], *selections, crate_pallet_data=crate_pallet_data)
+
+
+def iter_costed_chunks(tasks, pricings, workers=1):
+    """Cost ``(fingerprint, sku_df, selections, crate_pallet_data)`` tasks, yielding results in task order.
+
+    ``pricings`` maps fingerprints to compiled ``ReferencePricing`` and is sent
+    to each worker process once, when it starts. At most ``2 * workers`` tasks
+    are in flight, so a lazy ``tasks`` iterable is never read far ahead.
+    """
+    if workers <= 1:
+        for fingerprint, sku_df, selections, crate_pallet_data in tasks:
+            yield cost_sku_table(sku_df, pricings[fingerprint], *selections, crate_pallet_data=crate_pallet_data)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(pricings,)) as executor:
+        pending = deque()
+        for task in tasks:
+            pending.append(executor.submit(_cost_task, *task))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def parallel_chunk_rows(row_count, workers):
+    """SKU rows per task for splitting ``row_count`` rows across ``workers`` processes"""
+    rows = math.ceil(row_count / (max(workers, 1) * TASKS_PER_WORKER))
+    return min(max(rows, MIN_PARALLEL_CHUNK_ROWS), PARALLEL_CHUNK_ROWS)
+
+
+def _split_job(job, fingerprint, chunk_rows):
+    """Split a job's SKU table into tasks, each crate/pallet row going with its SKU's last row.
+
+    Crate/pallet rows are labelled by their position in the job's table, so
+    the costed rows of all tasks can be put back in input order.
+    """
+    sku_df = job["sku_df"]
+    crate_pallet_data = job.get("crate_pallet_data")
+    if crate_pallet_data is not None:
+        crate_pallet_data = crate_pallet_data.reset_index(drop=True)
+    selections = (job.get("interleaving_required", "No"), job.get("eco_friendly", "Mac foam"),
+                  job.get("protective_tape", "No"))
+
+    crate_chunk = None
+    if crate_pallet_data is not None:
+        positions = pd.Series(range(len(sku_df)), index=sku_df["SKU No"].to_numpy())
+        last_position = positions[~positions.index.duplicated(keep="last")]
+        crate_chunk = crate_pallet_data["SKU"].map(last_position // chunk_rows)
+
+    for number, start in enumerate(range(0, max(len(sku_df), 1), chunk_rows)):
+        chunk_crate_pallet = None
+        if crate_pallet_data is not None:
+            chunk_crate_pallet = crate_pallet_data[crate_chunk == number]
+        yield fingerprint, sku_df.iloc[start:start + chunk_rows], selections, chunk_crate_pallet
+
+
+def run_batch_jobs(jobs, workers=None, chunk_rows=None):
+    """Cost several batch jobs (e.g. one per customer) on a process pool.
+
+    Each job is a dict with ``sku_df`` and ``reference_tables`` and optionally
+    ``interleaving_required``, ``eco_friendly``, ``protective_tape`` and
+    ``crate_pallet_data``. Every job's reference tables are compiled once in
+    this process; its SKU table is split into tasks of ``chunk_rows`` rows,
+    by default sized by ``parallel_chunk_rows`` so every worker gets work.
+    Returns one ``run_batch`` style result dict per job, in job order, with
+    rows in input order.
+    """
+    workers = workers or os.cpu_count() or 1
+    fingerprints = []
+    pricings = {}
+    for job in jobs:
+        pricing = compile_batch_pricing(job["reference_tables"])
+        pricings[pricing.fingerprint] = pricing
+        fingerprints.append(pricing.fingerprint)
+
+    tasks = [
+        list(_split_job(job, fingerprint, chunk_rows or parallel_chunk_rows(len(job["sku_df"]), workers)))
+        for job, fingerprint in zip(jobs, fingerprints)
+    ]
+    costed = iter_costed_chunks((task for job_tasks in tasks for task in job_tasks), pricings, workers)
+
+    all_results = []
+    for job, job_tasks in zip(jobs, tasks):
+        parts = [next(costed) for _ in job_tasks]
+        results = {
+            "packing_costs": pd.concat([part["packing_costs"] for part in parts], ignore_index=True),
+            "invalid_skus": [sku for part in parts for sku in part["invalid_skus"]]
+        }
+        crate_pallet_data = job.get("crate_pallet_data")
+        if crate_pallet_data is not None:
+            # Back from task order to the order of the crate/pallet rows; tasks without crate/pallet
+            # rows are left out, their empty tables would turn text columns into object columns
+            crate_pallet_parts = [part["crate_pallet_costs"] for part in parts]
+            crate_pallet_costs = pd.concat(
+                [part for part in crate_pallet_parts if len(part)] or crate_pallet_parts[:1]
+            ).sort_index()
+            crate_pallet_costs.index = crate_pallet_data.index[crate_pallet_costs.index]
+            results["crate_pallet_costs"] = crate_pallet_costs
+            results["unmatched_skus"] = crate_pallet_data.loc[
+                ~crate_pallet_data["SKU"].isin(job["sku_df"]["SKU No"]), "SKU"
+            ].tolist()
+        all_results.append(results)
+    return all_results
+
+
+def run_batch_streaming(sku_path, output_path, reference_tables, chunksize, interleaving_required="No",
+                        eco_friendly="Mac foam", protective_tape="No", crate_pallet_data=None,
+                        crate_pallet_output=None, workers=1):
+    """Cost a SKU file chunk by chunk, appending each costed chunk to CSV output files.
+
+    Only the latest SKU row of every crate/pallet SKU is kept while the chunks
+    go by, and the crate/pallet rows are costed against those once the file is
+    read. Each crate/pallet row is costed once, with its SKU's last row as in
+    ``run_batch``, and ``crate_pallet_data`` (one row per SKU, usually far
+    smaller than the SKU file) bounds the memory kept. With ``workers`` > 1
+    chunks are costed on a process pool and still written in input order.
+    Both outputs get a header even when there are no SKUs. Returns a summary
+    dict with row counts and up to ``MAX_REPORTED_SKUS`` example
+    invalid/unmatched SKUs.
+    """
+    summary = {"rows": 0, "costed": 0, "invalid": 0, "invalid_skus": [], "unmatched": 0, "unmatched_skus": []}
+    first_chunk = True
+    pricing = compile_batch_pricing(reference_tables)
+    selections = (interleaving_required, eco_friendly, protective_tape)
+    crate_pallet_sku_rows = pd.DataFrame({"SKU No": []})
+
+    def tasks():
+        nonlocal crate_pallet_sku_rows
+        for chunk in iter_table_chunks(sku_path, chunksize):
+            if crate_pallet_data is not None:
+                # Latest row per crate/pallet SKU, later chunks replace earlier rows
+                rows = chunk[chunk["SKU No"].isin(crate_pallet_data["SKU"])]
+                if not rows.empty:
+                    crate_pallet_sku_rows = pd.concat([crate_pallet_sku_rows, rows], ignore_index=True)
+                    crate_pallet_sku_rows = crate_pallet_sku_rows.drop_duplicates(subset="SKU No", keep="last")
+            summary["rows"] += len(chunk)
+            yield pricing.fingerprint, chunk, selections, None
+
+    for results in iter_costed_chunks(tasks(), {pricing.fingerprint: pricing}, workers):
+
+        # Append to the outputs, header only with the first chunk
+        mode = "w" if first_chunk else "a"
+        results["packing_costs"].to_csv(output_path, mode=mode, header=first_chunk, index=False)
+        first_chunk = False
+
+        summary["costed"] += len(results["packing_costs"])
+        summary["invalid"] += len(results["invalid_skus"])
+        summary["invalid_skus"].extend(results["invalid_skus"][:MAX_REPORTED_SKUS - len(summary["invalid_skus"])])
+
+    if first_chunk:
+        pd.DataFrame(columns=PACKING_COST_COLUMNS).to_csv(output_path, index=False)
+
+    if crate_pallet_data is not None:
+        crate_pallet_costs, _, unmatched_skus = calculate_crate_pallet_costs(
+            crate_pallet_data, prepare_sku_table(crate_pallet_sku_rows), pricing
+        )
+        crate_pallet_costs.to_csv(crate_pallet_output, index=False)
+        summary["unmatched"] = len(unmatched_skus)
+        summary["unmatched_skus"] = unmatched_skus[:MAX_REPORTED_SKUS]
+    return summary
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Price a CSV/Excel file of SKUs without the Streamlit UI.")
+    parser.add_argument("sku_file", help="SKU table with the same columns as the app's SKU table")
+    parser.add_argument("-o", "--output", required=True,
+                        help="Output file for the packing cost table (.csv, .xlsx, .parquet or .arrow)")
+    parser.add_argument("--crate-pallet", help="Crate/pallet dimensions table (SKU, packing method, Width/mm, Height/mm, Length/mm)")
+    parser.add_argument("--crate-pallet-output", help="Output file for the crate/pallet cost table")
+    parser.add_argument("--interleaving", choices=["Yes", "No"], default="No", help="Interleaving required")
+    parser.add_argument("--eco-friendly", choices=["Mac foam", "Stretch wrap", "Craft Paper"], default="Mac foam",
+                        help="Eco-friendly packing material")
+    parser.add_argument("--protective-tape", choices=["Yes", "No"], default="No", help="Protective tape (customer specified)")
+    parser.add_argument("--chunksize", type=int,
+                        help="Stream the SKU file in chunks of this many rows (CSV outputs only)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes for costing (0 = one per CPU core)")
+    for name in DEFAULT_REFERENCE_TABLES:
+        parser.add_argument(f"--{name.replace('_', '-')}", dest=name,
+                            help=f"Reference table file for {name.replace('_', ' ')} (defaults to the app defaults)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.crate_pallet and not args.crate_pallet_output:
+        print("--crate-pallet-output is required with --crate-pallet", file=sys.stderr)
+        return 2
+
+    reference_tables = load_reference_tables({name: getattr(args, name) for name in DEFAULT_REFERENCE_TABLES})
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+
+    if args.chunksize:
+        outputs = [args.output] + ([args.crate_pallet_output] if args.crate_pallet else [])
+        if args.chunksize < 1 or any(Path(path).suffix.lower() != ".csv" for path in outputs):
+            print("--chunksize must be positive and needs .csv output files", file=sys.stderr)
+            return 2
+        summary = run_batch_streaming(
+            args.sku_file,
+            args.output,
+            reference_tables,
+            args.chunksize,
+            interleaving_required=args.interleaving,
+            eco_friendly=args.eco_friendly,
+            protective_tape=args.protective_tape,
+            crate_pallet_data=read_table(args.crate_pallet) if args.crate_pallet else None,
+            crate_pallet_output=args.crate_pallet_output,
+            workers=workers
+        )
+        if summary["invalid"]:
+            print(f"Skipped {summary['invalid']} SKU(s) with missing or invalid values, e.g. "
+                  f"{', '.join(map(str, summary['invalid_skus']))}", file=sys.stderr)
+        if summary["unmatched"]:
+            print(f"No SKU table entry for {summary['unmatched']} crate/pallet row(s), e.g. "
+                  f"{', '.join(map(str, summary['unmatched_skus']))}", file=sys.stderr)
+        return 0
+
+    job = {
+        "sku_df": read_table(args.sku_file),
+        "reference_tables": reference_tables,
+        "interleaving_required": args.interleaving,
+        "eco_friendly": args.eco_friendly,
+        "protective_tape": args.protective_tape,
+        "crate_pallet_data": read_table(args.crate_pallet) if args.crate_pallet else None
+    }
+    if workers > 1:
+        results = run_batch_jobs([job], workers=workers)[0]
+    else:
+        results = run_batch(job.pop("sku_df"), job.pop("reference_tables"), **job)
+
+    selections = {
+        "interleaving_required": args.interleaving,
+        "eco_friendly": args.eco_friendly,
+        "protective_tape": args.protective_tape
+    }
+    write_table(results["packing_costs"], args.output, "primary_calculations", selections)
+    if results["invalid_skus"]:
+        print(f"Skipped {len(results['invalid_skus'])} SKU(s) with missing or invalid values: "
+              f"{', '.join(map(str, results['invalid_skus']))}", file=sys.stderr)
+    if args.crate_pallet:
+        write_table(results["crate_pallet_costs"], args.crate_pallet_output, "crate_pallet_calculations", selections)
+        if results["unmatched_skus"]:
+            print(f"No SKU table entry for {len(results['unmatched_skus'])} crate/pallet row(s): "
+                  f"{', '.join(map(str, results['unmatched_skus']))}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
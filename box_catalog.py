@@ -0,0 +1,119 @@
+"""Carton catalog with an indexed cheapest-fit lookup.
+
+Each SKU needs a box of at least its computed Box Width/Height/Length. The
+catalog picks the cheapest carton of the box cost table that holds it in any
+axis-aligned orientation, so dimensions are compared sorted smallest to
+largest.
+
+Cartons that another carton beats on every dimension and on cost are dropped
+when the catalog is built. The rest are sorted by their largest dimension, and
+a binary search per SKU skips every carton that is too short. Only the
+remaining cartons are compared, in blocks of SKUs.
+"""
+import numpy as np
+import pandas as pd
+
+# SKUs compared against the catalog at once, bounds the comparison matrix
+LOOKUP_BLOCK_SIZE = 4096
+
+
+def _sorted_dims(width, height, length):
+    dims = np.column_stack([
+        np.asarray(width, dtype=float),
+        np.asarray(height, dtype=float),
+        np.asarray(length, dtype=float)
+    ])
+    return np.sort(dims, axis=1)
+
+
+def _dominated(dims, costs, block_size=1024):
+    """Mask of cartons for which another carton is as large in every dimension and no more expensive"""
+    count = len(costs)
+    dominated = np.zeros(count, dtype=bool)
+    positions = np.arange(count)
+    for start in range(0, count, block_size):
+        rows = slice(start, start + block_size)
+        # [i, j]: carton j can replace carton i
+        covers = (dims[None, :, :] >= dims[rows, None, :]).all(axis=2) & (costs[None, :] <= costs[rows, None])
+        # Identical cartons: keep the first one
+        strictly_better = (dims[None, :, :] > dims[rows, None, :]).any(axis=2) | (costs[None, :] < costs[rows, None])
+        earlier = positions[None, :] < positions[rows, None]
+        dominated[rows] = (covers & (strictly_better | earlier)).any(axis=1)
+    return dominated
+
+
+class BoxCatalog:
+    """Cartons of a box cost table, indexed for cheapest-fit lookups"""
+
+    def __init__(self, codes, width, height, length, costs):
+        dims = _sorted_dims(width, height, length)
+        costs = np.asarray(costs, dtype=float)
+        codes = np.asarray(codes, dtype=object)
+
+        # Only cartons with real dimensions and a cost can be picked
+        usable = np.isfinite(dims).all(axis=1) & (dims > 0).all(axis=1) & np.isfinite(costs) & (costs >= 0)
+        dims, costs, codes = dims[usable], costs[usable], codes[usable]
+
+        keep = ~_dominated(dims, costs)
+        dims, costs, codes = dims[keep], costs[keep], codes[keep]
+
+        order = np.argsort(dims[:, 2], kind="stable")
+        self.dims = dims[order]
+        self.costs = costs[order]
+        self.codes = codes[order]
+
+    @classmethod
+    def from_table(cls, box_costs, code_column="SAP Item Code", length_column="Length(mm)",
+                   width_column="Width (mm)", height_column="Height (mm)", cost_column="Cost (LKR)"):
+        """Build a catalog from a box cost table, one carton per row"""
+        if box_costs is None or box_costs.empty:
+            return cls([], [], [], [], [])
+
+        def column(name):
+            if name not in box_costs.columns:
+                return np.full(len(box_costs), np.nan)
+            return pd.to_numeric(box_costs[name], errors="coerce").to_numpy(dtype=float)
+
+        codes = box_costs[code_column].to_numpy() if code_column in box_costs.columns else np.full(len(box_costs), None)
+        return cls(codes, column(width_column), column(height_column), column(length_column), column(cost_column))
+
+    def __len__(self):
+        return len(self.costs)
+
+    def best_fit(self, width, height, length):
+        """Cheapest carton holding each required box.
+
+        Returns ``(positions, costs, codes)`` aligned with the inputs; SKUs
+        without a fitting carton (or with missing dimensions) get position -1,
+        cost NaN and code None.
+        """
+        needs = _sorted_dims(width, height, length)
+        count = len(needs)
+        positions = np.full(count, -1)
+        if count == 0 or len(self) == 0:
+            return positions, np.full(count, np.nan), np.full(count, None, dtype=object)
+
+        # First carton long enough in its largest dimension; NaN needs land past the end
+        first = np.searchsorted(self.dims[:, 2], needs[:, 2], side="left")
+        order = np.argsort(first, kind="stable")
+
+        for block_start in range(0, count, LOOKUP_BLOCK_SIZE):
+            rows = order[block_start:block_start + LOOKUP_BLOCK_SIZE]
+            low = first[rows].min()
+            if low >= len(self):
+                continue
+            candidates = np.arange(low, len(self))
+            fits = (
+                (candidates[None, :] >= first[rows, None])
+                & (self.dims[low:, 0] >= needs[rows, 0, None])
+                & (self.dims[low:, 1] >= needs[rows, 1, None])
+            )
+            candidate_costs = np.where(fits, self.costs[low:], np.inf)
+            best = candidate_costs.argmin(axis=1)
+            found = np.isfinite(candidate_costs[np.arange(len(rows)), best])
+            positions[rows[found]] = low + best[found]
+
+        found = positions >= 0
+        costs = np.where(found, self.costs[positions], np.nan)
+        codes = np.where(found, self.codes[positions], None)
+        return positions, costs, codes
@@ -0,0 +1,206 @@
+"""Profiles-per-box optimizer.
+
+For every SKU the profile (W × H × L) is packed into its box (Box Width ×
+Box Height × Box Length) with axis-aligned orientations only. Each profile
+dimension is tried along the box length. The remaining two dimensions are
+then packed into the box cross-section as a two-block layout: one block of
+profiles in one orientation and the rest of the width (or height) filled
+with profiles turned by 90°. The pure single-orientation layouts are the
+two extremes of that split.
+
+Each factor is floored separately, so the count is what physically fits.
+Everything is evaluated as array operations over all SKUs and split
+positions at once, processed in blocks of SKUs and of split positions to
+bound memory.
+"""
+import numpy as np
+import pandas as pd
+
+# SKUs evaluated at once
+LAYOUT_BLOCK_SIZE = 2048
+
+# SKU × split position cells evaluated at once in a cross-section search
+CROSS_SECTION_CELLS = 1 << 20
+
+# Which profile dimension runs along the box length; the other two (a, b) lie in the cross-section
+_LENGTH_CHOICES = [("L", "W", "H"), ("W", "H", "L"), ("H", "W", "L")]
+
+
+def _fit(space, size):
+    """Whole items of ``size`` fitting in ``space``, 0 for missing or non-positive sizes"""
+    out = np.zeros(np.broadcast(space, size).shape)
+    np.floor_divide(space, size, out=out, where=(size > 0) & (space > 0))
+    return np.nan_to_num(out)
+
+
+def _tie_score(first_block, second_block):
+    """Total counts doubled, plus one where one of the two blocks is empty"""
+    return (first_block + second_block) * 2 + ((first_block == 0) | (second_block == 0))
+
+
+def _best_split(space, first_fit, first_size, second_size, first_rows, second_rows):
+    """Best split of ``space`` into ``i`` slots of ``first_size`` and the rest of ``second_size``.
+
+    The first block holds ``i * first_rows`` items, the second as many
+    ``second_size`` slots as fit the rest times ``second_rows``. Returns
+    ``(best_i, score)`` with ``score`` as in ``_tie_score``. Rows are taken in
+    order of ``first_fit`` in pieces of at most ``CROSS_SECTION_CELLS`` cells,
+    so one item much smaller than its box does not size every row's search.
+    """
+    count = len(space)
+    best_i = np.zeros(count, dtype=int)
+    best_score = np.zeros(count)
+    fits = first_fit.astype(int)
+    order = np.argsort(fits, kind="stable")
+    sorted_fits = fits[order]
+
+    start = 0
+    while start < count:
+        # Rows while the piece stays within the cell budget, at least one
+        cells = np.arange(1, count - start + 1) * (sorted_fits[start:] + 1)
+        size = max(int(np.searchsorted(cells, CROSS_SECTION_CELLS, side="right")), 1)
+        rows = order[start:start + size]
+        max_i = int(sorted_fits[start + size - 1])
+
+        i = np.arange(max_i + 1)[None, :]
+        rest_fit = _fit(space[rows, None] - i * first_size[rows, None], second_size[rows, None])
+        score = np.where(
+            i <= fits[rows, None], _tie_score(i * first_rows[rows, None], rest_fit * second_rows[rows, None]), -2
+        )
+        # Ties go to a single-block layout, then to the most first-block slots
+        picked = max_i - score[:, ::-1].argmax(axis=1)
+        best_i[rows] = picked
+        best_score[rows] = score[np.arange(size), picked]
+        start += size
+    return best_i, best_score
+
+
+def best_cross_section(box_width, box_height, a, b):
+    """Best two-block layout of a×b rectangles in the box cross-section.
+
+    Returns ``(count, vertical, blocks)`` where ``vertical`` tells whether the
+    blocks sit side by side across the box width (else stacked over the box
+    height) and ``blocks`` is ``(n1_w, n1_h, n2_w, n2_h)``: columns and rows
+    of the a-along-width block and of the rotated block.
+    """
+    fit_wa, fit_hb = _fit(box_width, a), _fit(box_height, b)
+    fit_wb, fit_ha = _fit(box_width, b), _fit(box_height, a)
+
+    # Side by side: i columns of a-along-width profiles, the rest of the width rotated
+    best_i, vertical_score = _best_split(box_width, fit_wa, a, b, fit_hb, fit_ha)
+    # Stacked: j rows of a-along-width profiles, the rest of the height rotated
+    best_j, stacked_score = _best_split(box_height, fit_hb, b, a, fit_wa, fit_wb)
+
+    vertical = vertical_score >= stacked_score
+    best_count = np.maximum(np.where(vertical, vertical_score, stacked_score) // 2, 0)
+
+    blocks = np.where(
+        vertical[:, None],
+        np.column_stack([
+            best_i, fit_hb,
+            _fit(box_width - best_i * a, b), fit_ha
+        ]),
+        np.column_stack([
+            fit_wa, best_j,
+            fit_wb, _fit(box_height - best_j * b, a)
+        ])
+    )
+    return best_count, vertical, blocks
+
+
+def _describe(columns, rows, names):
+    """``columns × rows (names)`` per SKU, empty where the block holds no profiles"""
+    text = (pd.Series(columns.astype(int)).astype(str) + " × " + pd.Series(rows.astype(int)).astype(str)
+            + " (" + pd.Series(names) + ")")
+    return text.where(columns * rows > 0, "")
+
+
+def describe_layout(blocks, vertical, along, a_names, b_names):
+    """Readable two-block layouts, e.g. ``5 × 2 (W×H) | 1 × 4 (H×W), 2 along length``.
+
+    ``blocks`` and ``vertical`` are as returned by the cross-section search,
+    ``along`` is the count along the length and ``a_names``/``b_names`` name
+    the item dimensions lying across the width in the first block.
+    """
+    n1_w, n1_h, n2_w, n2_h = np.asarray(blocks).T
+    first_block = _describe(n1_w, n1_h, pd.Series(a_names) + "×" + pd.Series(b_names))
+    second_block = _describe(n2_w, n2_h, pd.Series(b_names) + "×" + pd.Series(a_names))
+    separator = pd.Series(np.where(vertical, " | ", " / "))
+    both = (first_block != "") & (second_block != "")
+    text = first_block + separator.where(both, "") + second_block
+    along_text = ", " + pd.Series(np.asarray(along).astype(int)).astype(str) + " along length"
+    return (text + along_text.where(np.asarray(along) > 1, "")).to_numpy(dtype=object)
+
+
+def optimize_box_layout(box_width, box_height, box_length, width, height, length, describe=True):
+    """Maximum profiles per box and the layout that achieves it, for every SKU.
+
+    Returns ``(profiles_per_box, layout, by_height)``: the integer counts, a
+    readable layout per SKU (blocks as ``columns × rows (profile dims along
+    box width×height)``, ``|`` side by side, ``/`` stacked) and whether most
+    profiles lie with their height across the box width. Searches that only
+    need the counts pass ``describe=False`` and get empty layouts.
+    """
+    box_dims = [np.asarray(value, dtype=float) for value in (box_width, box_height, box_length)]
+    profile = {
+        "W": np.asarray(width, dtype=float),
+        "H": np.asarray(height, dtype=float),
+        "L": np.asarray(length, dtype=float)
+    }
+    count = len(box_dims[0])
+    profiles_per_box = np.zeros(count, dtype=int)
+    layout = np.full(count, "", dtype=object)
+    by_height = np.zeros(count, dtype=bool)
+
+    for start in range(0, count, LAYOUT_BLOCK_SIZE):
+        rows = slice(start, start + LAYOUT_BLOCK_SIZE)
+        block_width, block_height, block_length = (dim[rows] for dim in box_dims)
+
+        results = []
+        for along_length, a_name, b_name in _LENGTH_CHOICES:
+            a, b = profile[a_name][rows], profile[b_name][rows]
+            along = _fit(block_length, profile[along_length][rows])
+            cross_count, vertical, blocks = best_cross_section(block_width, block_height, a, b)
+            results.append((along * cross_count, along, vertical, blocks))
+
+        # The first choice (profile length along the box) wins ties
+        totals = np.column_stack([result[0] for result in results])
+        choice = totals.argmax(axis=1)
+        picked = np.arange(len(choice))
+        total = totals[picked, choice]
+        along = np.column_stack([result[1] for result in results])[picked, choice]
+        vertical = np.column_stack([result[2] for result in results])[picked, choice]
+        blocks = np.stack([result[3] for result in results], axis=1)[picked, choice]
+        n1_w, n1_h, n2_w, n2_h = blocks.T
+        a_names = np.array([names[1] for names in _LENGTH_CHOICES], dtype=object)[choice]
+        b_names = np.array([names[2] for names in _LENGTH_CHOICES], dtype=object)[choice]
+
+        profiles_per_box[rows] = total.astype(int)
+        if describe:
+            layout[rows] = np.where(total > 0, describe_layout(blocks, vertical, along, a_names, b_names), "")
+        # Profile height across the box width in most of the box
+        by_height[rows] = np.where(a_names == "W", n2_w * n2_h > n1_w * n1_h, a_names == "H") & (total > 0)
+
+    return profiles_per_box, layout, by_height
+
+
+def best_box_orientation(box_dims, width, height, length):
+    """Most profiles per box over the three choices of box dimension used as its length.
+
+    ``box_dims`` is an ``(n, 3)`` array of box dimensions in any order, e.g.
+    catalog cartons. Returns ``(profiles_per_box, oriented)`` where
+    ``oriented`` holds the dimensions as (width, height, length) of the best
+    orientation, the first one on ties.
+    """
+    box_dims = np.asarray(box_dims, dtype=float).reshape(-1, 3)
+    best = np.zeros(len(box_dims), dtype=int)
+    oriented = box_dims.copy()
+    for length_axis in (2, 1, 0):
+        rotated = box_dims[:, [axis for axis in (0, 1, 2) if axis != length_axis] + [length_axis]]
+        profiles, _, _ = optimize_box_layout(
+            rotated[:, 0], rotated[:, 1], rotated[:, 2], width, height, length, describe=False
+        )
+        better = profiles > best
+        best = np.where(better, profiles, best)
+        oriented[better] = rotated[better]
+    return best, oriented
@@ -0,0 +1,261 @@
+"""Box-size search minimizing the packing cost per profile.
+
+Boxes are priced as ``calculate_packing_costs`` prices them: a box that fits
+a carton of the catalog costs the cheapest such carton, shared by the
+profiles the carton holds; any other box costs the reference box cost
+scaled by its volume.
+
+Every carton of the catalog is scored directly and proposed in its best
+orientation within the limits. The search then looks for a cheaper box among
+those that fit no carton. It tries box widths and heights on a grid up to configurable
+limits, and box lengths that are whole multiples of each SKU's profile
+length rounded up to the grid.
+
+Every candidate has a cheap bound: with profile dimension ``c`` along the
+box length and ``a × b`` in the cross-section, no box holds more than
+``floor(L / c) * floor(W * H / (a * b))`` profiles. Candidates are visited
+in order of the resulting lower bound on volume per profile. A SKU stops as
+soon as its next bound cannot beat the best box found so far. Each round
+evaluates the next few candidates of every SKU still searching with one
+vectorized ``optimize_box_layout`` call. SKUs are searched in blocks, so
+the candidate arrays stay within ``SEARCH_BLOCK_CANDIDATES``.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+from box_layout import optimize_box_layout
+
+# Upper limit of candidate boxes per SKU (width × height × length grid)
+MAX_CANDIDATES = 20000
+
+# Candidate boxes evaluated per round over all SKUs still searching
+ROUND_CANDIDATES = 8192
+
+# Candidate boxes (SKUs × candidates per SKU) of one block of SKUs
+SEARCH_BLOCK_CANDIDATES = 1000000
+
+# SKU × carton pairs scored at once
+CARTON_BLOCK_PAIRS = 65536
+
+
+@dataclass(frozen=True)
+class BoxSearchLimits:
+    """Largest box the search may propose and the grid step, all in mm"""
+    max_width: float = 600.0
+    max_height: float = 600.0
+    max_length: float = 6500.0
+    step: float = 50.0
+
+
+def _grid(limit, step):
+    return np.arange(step, limit + step / 2, step)
+
+
+def _best_cartons(width, height, length, catalog, limits):
+    """Cheapest catalog carton per profile for every SKU.
+
+    A carton holds as many profiles as its best orientation, like in
+    ``calculate_packing_costs``; it is only proposed when some orientation is
+    within ``limits``, as the best such orientation. Returns
+    ``(cost_per_profile, dims, profiles)``; SKUs no carton can hold a profile
+    of get an infinite cost, NaN dimensions and 0 profiles.
+    """
+    count = len(width)
+    best_cost = np.full(count, np.inf)
+    best_dims = np.full((count, 3), np.nan)
+    best_profiles = np.zeros(count, dtype=int)
+    if catalog is None or len(catalog) == 0 or count == 0:
+        return best_cost, best_dims, best_profiles
+
+    n_cartons = len(catalog)
+    sku_block = max(CARTON_BLOCK_PAIRS // n_cartons, 1)
+    for start in range(0, count, sku_block):
+        skus = np.arange(start, min(start + sku_block, count))
+        pair_sku = np.repeat(skus, n_cartons)
+        pair_carton = np.tile(np.arange(n_cartons), len(skus))
+        dims = catalog.dims[pair_carton]
+
+        pair_profiles = np.zeros(len(pair_sku), dtype=int)
+        pair_dims = np.full((len(pair_sku), 3), np.nan)
+        proposed_profiles = np.full(len(pair_sku), -1)
+        for length_axis in (2, 1, 0):
+            a, b = (dims[:, axis] for axis in (0, 1, 2) if axis != length_axis)
+            box_length = dims[:, length_axis]
+            # Either way round across the cross-section holds the same profiles
+            upright = (a <= limits.max_width) & (b <= limits.max_height)
+            turned = (b <= limits.max_width) & (a <= limits.max_height)
+            allowed = (upright | turned) & (box_length <= limits.max_length)
+            box_width, box_height = np.where(upright, a, b), np.where(upright, b, a)
+
+            profiles, _, _ = optimize_box_layout(
+                box_width, box_height, box_length, width[pair_sku], height[pair_sku], length[pair_sku], describe=False
+            )
+            pair_profiles = np.maximum(pair_profiles, profiles)
+            better = allowed & (profiles > proposed_profiles)
+            proposed_profiles[better] = profiles[better]
+            pair_dims[better] = np.column_stack([box_width, box_height, box_length])[better]
+
+        # Cheapest carton per SKU, the first one on ties
+        pair_cost = np.where(
+            (proposed_profiles >= 0) & (pair_profiles > 0),
+            catalog.costs[pair_carton] / np.maximum(pair_profiles, 1), np.inf
+        ).reshape(len(skus), n_cartons)
+        pick = pair_cost.argmin(axis=1)
+        picked = np.arange(len(skus)) * n_cartons + pick
+        best_cost[skus] = pair_cost[np.arange(len(skus)), pick]
+        best_profiles[skus] = pair_profiles[picked]
+        best_dims[skus] = pair_dims[picked]
+
+    found = np.isfinite(best_cost)
+    best_dims[~found] = np.nan
+    best_profiles[~found] = 0
+    return best_cost, best_dims, best_profiles
+
+
+def _carton_fit_lengths(box_widths, box_heights, catalog):
+    """Longest box of each cross-section that still fits a carton, 0 where none does"""
+    fit_lengths = np.zeros(len(box_widths))
+    if catalog is None or len(catalog) == 0:
+        return fit_lengths
+    cross = np.sort(np.column_stack([box_widths, box_heights]), axis=1)[:, None, :]
+    # Fitting is monotone in the length, so the longest fit is one of the carton's dimensions
+    for axis in (0, 1, 2):
+        box_length = catalog.dims[None, :, axis]
+        box = np.sort(np.concatenate([np.broadcast_to(cross, (len(box_widths), len(catalog), 2)),
+                                      np.broadcast_to(box_length[..., None], (len(box_widths), len(catalog), 1))],
+                                     axis=2), axis=2)
+        fits = (box <= catalog.dims[None, :, :]).all(axis=2)
+        fit_lengths = np.maximum(fit_lengths, np.where(fits, box_length, 0).max(axis=1))
+    return fit_lengths
+
+
+def _search_block(rows, multiples, width, height, length, box_widths, box_heights, fit_lengths, limits,
+                  best_dims, best_profiles, best_volume_per_profile):
+    """Grid search for the SKUs ``rows``, improving the best arrays in place"""
+    step = float(limits.step)
+    n_cross = len(box_widths)
+
+    # Candidate c of a SKU: cross-section c % n_cross, length multiple c // n_cross
+    candidate_lengths = np.ceil(length[rows, None] * multiples[None, :] / step) * step
+    candidate_lengths = np.where(candidate_lengths <= limits.max_length, candidate_lengths, np.nan)
+    areas = (box_widths * box_heights)[None, None, :]
+    volumes = (areas * candidate_lengths[:, :, None]).reshape(len(rows), -1)
+
+    # Most profiles any layout can hold, over the three choices of the dimension along the length
+    max_profiles = np.zeros_like(volumes)
+    for along, a, b in [(length, width, height), (width, height, length), (height, width, length)]:
+        along_fit = np.floor(candidate_lengths / along[rows, None])[:, :, None]
+        area_fit = np.floor(areas / (a * b)[rows, None, None])
+        max_profiles = np.maximum(max_profiles, np.nan_to_num(along_fit * area_fit).reshape(len(rows), -1))
+
+    # Lower bound of the box volume per profile, infinite for boxes that cannot hold one.
+    # A box that fits a carton is charged the carton, already scored with the cartons.
+    fits_carton = (candidate_lengths[:, :, None] <= fit_lengths[None, None, :]).reshape(len(rows), -1)
+    priced = (max_profiles >= 1) & ~fits_carton
+    bounds = np.where(priced, volumes / np.where(priced, max_profiles, 1), np.inf)
+    del volumes, max_profiles, fits_carton, priced
+    order = np.argsort(bounds, axis=1, kind="stable")
+    sorted_bounds = np.take_along_axis(bounds, order, axis=1)
+    del bounds
+
+    next_rank = 0
+    while next_rank < order.shape[1]:
+        # SKUs whose next candidate can still beat their best box
+        active = np.flatnonzero(sorted_bounds[:, next_rank] < best_volume_per_profile[rows])
+        if len(active) == 0:
+            break
+        # Fewer SKUs left searching: take more of their candidates per round
+        batch = min(max(ROUND_CANDIDATES // len(active), 1), order.shape[1] - next_rank)
+        ranks = slice(next_rank, next_rank + batch)
+        next_rank += batch
+
+        candidate = order[active, ranks]
+        cross, multiple = candidate % n_cross, candidate // n_cross
+        skus = np.repeat(rows[active], batch)
+        candidate_width = box_widths[cross].ravel()
+        candidate_height = box_heights[cross].ravel()
+        candidate_length = np.take_along_axis(candidate_lengths[active], multiple, axis=1).ravel()
+
+        profiles, _, _ = optimize_box_layout(
+            candidate_width, candidate_height, candidate_length, width[skus], height[skus], length[skus], describe=False
+        )
+        priced = (profiles > 0) & np.isfinite(sorted_bounds[active, ranks]).ravel()
+        volume_per_profile = np.where(
+            priced, candidate_width * candidate_height * candidate_length / np.maximum(profiles, 1), np.inf
+        ).reshape(len(active), batch)
+
+        # Best candidate of the round per SKU, the earliest one on ties
+        pick = volume_per_profile.argmin(axis=1)
+        picked = np.arange(len(active)) * batch + pick
+        better = volume_per_profile[np.arange(len(active)), pick] < best_volume_per_profile[rows[active]]
+        improved = rows[active][better]
+        best_volume_per_profile[improved] = volume_per_profile[np.arange(len(active)), pick][better]
+        best_profiles[improved] = profiles[picked][better]
+        best_dims[improved] = np.column_stack([candidate_width, candidate_height, candidate_length])[picked][better]
+
+
+def search_box_sizes(width, height, length, limits=BoxSearchLimits(), box_volume_cost=1.0, catalog=None):
+    """Cheapest box per profile for every SKU within ``limits``.
+
+    ``catalog`` is the ``BoxCatalog`` of the box cost table and
+    ``box_volume_cost`` the cost per mm³ of boxes that fit no carton.
+    Returns ``(box_width, box_height, box_length, profiles_per_box, cost_per_profile)``
+    arrays; SKUs for which no box within the limits holds a profile get NaN
+    dimensions and cost and 0 profiles.
+    """
+    width = np.asarray(width, dtype=float)
+    height = np.asarray(height, dtype=float)
+    length = np.asarray(length, dtype=float)
+    count = len(width)
+    step = float(limits.step)
+
+    best_dims = np.full((count, 3), np.nan)
+    best_profiles = np.zeros(count, dtype=int)
+    best_volume_per_profile = np.full(count, np.inf)
+
+    usable = np.isfinite(np.column_stack([width, height, length])).all(axis=1)
+    usable &= (width > 0) & (height > 0) & (length > 0)
+    if not usable.any():
+        return best_dims[:, 0], best_dims[:, 1], best_dims[:, 2], best_profiles, np.full(count, np.nan)
+
+    rows = np.flatnonzero(usable)
+    carton_cost, carton_dims, carton_profiles = _best_cartons(width[rows], height[rows], length[rows], catalog, limits)
+    # Volume per profile a box fitting no carton has to beat
+    if box_volume_cost > 0:
+        best_volume_per_profile[rows] = carton_cost / box_volume_cost
+
+    if step > 0:
+        # Cross-section grid shared by all SKUs, lengths are multiples of each SKU's profile length
+        box_widths, box_heights = np.meshgrid(_grid(limits.max_width, step), _grid(limits.max_height, step), indexing="ij")
+        box_widths, box_heights = box_widths.ravel(), box_heights.ravel()
+        n_cross = len(box_widths)
+        fit_lengths = _carton_fit_lengths(box_widths, box_heights, catalog)
+        max_multiples = np.minimum(
+            np.floor(limits.max_length / length[rows]), max(MAX_CANDIDATES // max(n_cross, 1), 1)
+        ).astype(int)
+
+        # Blocks of SKUs with similar candidate counts, most candidates first
+        searched = rows[max_multiples >= 1]
+        max_multiples = max_multiples[max_multiples >= 1]
+        by_count = np.argsort(-max_multiples, kind="stable")
+        searched, max_multiples = searched[by_count], max_multiples[by_count]
+        start = 0
+        while start < len(searched) and n_cross:
+            block_multiples = max_multiples[start]
+            block_size = max(SEARCH_BLOCK_CANDIDATES // (n_cross * block_multiples), 1)
+            _search_block(
+                searched[start:start + block_size], np.arange(1, block_multiples + 1), width, height, length,
+                box_widths, box_heights, fit_lengths, limits, best_dims, best_profiles, best_volume_per_profile
+            )
+            start += block_size
+
+    # The grid box where one beat the cartons, else the best carton
+    grid_cost = np.where(np.isfinite(best_dims[rows, 0]), box_volume_cost * best_volume_per_profile[rows], np.inf)
+    use_carton = carton_cost <= grid_cost
+    best_dims[rows] = np.where(use_carton[:, None], carton_dims, best_dims[rows])
+    best_profiles[rows] = np.where(use_carton, carton_profiles, best_profiles[rows])
+    cost_per_profile = np.full(count, np.nan)
+    cost_per_profile[rows] = np.minimum(carton_cost, grid_cost)
+    cost_per_profile[~np.isfinite(cost_per_profile)] = np.nan
+    return best_dims[:, 0], best_dims[:, 1], best_dims[:, 2], best_profiles, cost_per_profile
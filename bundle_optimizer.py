@@ -0,0 +1,91 @@
+"""Rows × layers optimizer for secondary packing bundles.
+
+For every SKU all bundles of ``rows`` profiles across and ``layers`` high,
+with the profile upright (W across) or turned (H across), are priced with
+``calculate_bundle_costs`` and the one with the lowest secondary cost per
+profile within the bundle limits is kept; fewer profiles per bundle win
+ties. SKUs are processed in blocks, each block as one column-wise costing
+call over all its candidates.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from costing_engine import calculate_bundle_costs, to_numeric_array
+
+# Candidate bundles priced at once (SKUs × rows × layers × orientations)
+OPTIMIZER_BLOCK_CANDIDATES = 200000
+
+
+@dataclass(frozen=True)
+class BundleLimits:
+    """Largest bundle the optimizer may propose (mm and profiles)"""
+    max_width: float = 300.0
+    max_height: float = 300.0
+    max_profiles: int = 50
+
+
+def optimize_bundles(sku_df, pricing, finish, interleaving_required, eco_friendly,
+                     protective_tape_customer_specified, limits=BundleLimits()):
+    """Cheapest rows × layers bundle per SKU of ``sku_df`` (packing_costing_app.py SKU table).
+
+    Returns a per-SKU bundling table (``SKU No.``, ``Rows``, ``Layers``,
+    ``Width Type``, ``Height Type``) for ``calculate_bundle_costs``. SKUs for
+    which not even one profile fits the limits get a single-profile bundle.
+    """
+    sku_df = sku_df.reset_index(drop=True)
+    count = len(sku_df)
+    W = np.nan_to_num(to_numeric_array(sku_df, "W (mm)"))
+    H = np.nan_to_num(to_numeric_array(sku_df, "H (mm)"))
+
+    max_count = max(int(limits.max_profiles), 1)
+    rows, layers, turned = np.meshgrid(np.arange(1, max_count + 1), np.arange(1, max_count + 1), [False, True], indexing="ij")
+    rows, layers, turned = rows.ravel(), layers.ravel(), turned.ravel()
+    keep = rows * layers <= max_count
+    # Fewer profiles per bundle first, so ties go to the smaller bundle
+    order = np.argsort(rows[keep] * layers[keep], kind="stable")
+    rows, layers, turned = rows[keep][order], layers[keep][order], turned[keep][order]
+    candidates = len(rows)
+
+    best_rows = np.ones(count, dtype=int)
+    best_layers = np.ones(count, dtype=int)
+    best_turned = np.zeros(count, dtype=bool)
+    block_size = max(OPTIMIZER_BLOCK_CANDIDATES // candidates, 1)
+
+    for start in range(0, count, block_size):
+        block = np.arange(start, min(start + block_size, count))
+        across = np.where(turned[None, :], H[block, None], W[block, None])
+        up = np.where(turned[None, :], W[block, None], H[block, None])
+        fits = (
+            (rows[None, :] * across <= limits.max_width) & (layers[None, :] * up <= limits.max_height)
+            & (across > 0) & (up > 0)
+        )
+
+        expanded = sku_df.iloc[np.repeat(block, candidates)].reset_index(drop=True)
+        bundling = pd.DataFrame({
+            "Rows": np.tile(rows, len(block)),
+            "Layers": np.tile(layers, len(block)),
+            "Width Type": np.tile(np.where(turned, "H/mm", "W/mm"), len(block)),
+            "Height Type": np.tile(np.where(turned, "W/mm", "H/mm"), len(block))
+        })
+        costs = calculate_bundle_costs(
+            expanded, pricing, "Number of layers", bundling, finish, interleaving_required,
+            eco_friendly, protective_tape_customer_specified
+        )
+        cost = costs["Total Cost (Rs/prof)"].to_numpy(dtype=float).reshape(len(block), candidates)
+        cost = np.where(fits & np.isfinite(cost), cost, np.inf)
+
+        pick = cost.argmin(axis=1)
+        found = np.isfinite(cost[np.arange(len(block)), pick])
+        best_rows[block[found]] = rows[pick[found]]
+        best_layers[block[found]] = layers[pick[found]]
+        best_turned[block[found]] = turned[pick[found]]
+
+    return pd.DataFrame({
+        "SKU No.": sku_df["SKU No."].to_numpy() if "SKU No." in sku_df.columns else np.full(count, None),
+        "Rows": best_rows,
+        "Layers": best_layers,
+        "Width Type": np.where(best_turned, "H/mm", "W/mm"),
+        "Height Type": np.where(best_turned, "W/mm", "H/mm")
+    })
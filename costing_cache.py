@@ -0,0 +1,40 @@
+"""Process-wide result cache for full costing runs.
+
+A costing run is identified by the content hash of its input table, the
+packing selections and the fingerprint of the compiled reference pricing.
+Repeat quotes and Streamlit reruns with unchanged inputs are served from a
+bounded LRU shared by every session of the server process.
+"""
+from costing_engine import calculate_packing_costs, calculate_crate_pallet_costs
+from reference_pricing import CompiledCache, frame_fingerprint
+
+RESULT_CACHE_SIZE = 64
+
+_result_cache = CompiledCache(maxsize=RESULT_CACHE_SIZE)
+
+
+def cached_packing_costs(sku_df, pricing, interleaving_required, eco_friendly, protective_tape):
+    """``calculate_packing_costs`` served from the result cache when the inputs are unchanged"""
+    key = ("packing", frame_fingerprint(sku_df), pricing.fingerprint,
+           interleaving_required, eco_friendly, protective_tape)
+    calculations, valid_mask = _result_cache.get_or_build(
+        key,
+        lambda: calculate_packing_costs(sku_df, pricing, interleaving_required, eco_friendly, protective_tape)
+    )
+    # Cached frames are shared between sessions, hand out copies
+    return calculations.copy(), valid_mask.copy()
+
+
+def cached_crate_pallet_costs(crate_pallet_data, sku_data, pricing):
+    """``calculate_crate_pallet_costs`` served from the result cache when the inputs are unchanged"""
+    key = ("crate_pallet", frame_fingerprint(crate_pallet_data), frame_fingerprint(sku_data), pricing.fingerprint)
+    calculations, valid_mask, unmatched_skus = _result_cache.get_or_build(
+        key,
+        lambda: calculate_crate_pallet_costs(crate_pallet_data, sku_data, pricing)
+    )
+    return calculations.copy(), valid_mask.copy(), list(unmatched_skus)
+
+
+def clear_result_cache():
+    """Drop every cached costing run"""
+    _result_cache.clear()
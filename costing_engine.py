@@ -0,0 +1,758 @@
+"""Column-wise costing kernels used by the packing costing apps.
+
+Everything in this module works on whole DataFrames at once with NumPy/pandas
+column arithmetic, so it does not depend on Streamlit and can be imported by
+any script that needs the costing formulas.
+"""
+import numpy as np
+import pandas as pd
+
+from box_layout import best_box_orientation, optimize_box_layout
+from box_search import BoxSearchLimits, search_box_sizes
+from load_planner import LoadSizingLimits, plan_loads, size_loads
+
+# Map the eco-friendly selectbox options to the material names in Table 1
+INTERLEAVING_MATERIAL_MAP = {
+    "Mac foam": "McFoam",
+    "Stretch wrap": "Stretchwrap",
+    "Craft Paper": "Craft Paper"
+}
+
+# Column order of Table 3 (Primary/Secondary Packing Total Cost)
+PACKING_COST_COLUMNS = [
+    "SKU",
+    "Interleaving cost",
+    "Protective tape cost",
+    "Packing type",
+    "Box SAP Item Code",
+    "Profiles per box",
+    "Packing Cost (LKR)",
+    "Total Cost per profile/LKR",
+    "Cost/kg (LKR)",
+    "Cost/m (LKR)"
+]
+
+
+def to_numeric_array(df, column):
+    """Return a column as a float64 array, blanks and text become NaN"""
+    if column not in df.columns:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=float)
+
+
+def safe_divide(numerator, denominator):
+    """Element-wise division that returns 0 wherever the denominator is not positive"""
+    numerator = np.asarray(numerator, dtype=float)
+    denominator = np.asarray(denominator, dtype=float)
+    numerator, denominator = np.broadcast_arrays(numerator, denominator)
+    out = np.zeros(numerator.shape, dtype=float)
+    np.divide(numerator, denominator, out=out, where=denominator > 0)
+    return out
+
+
+def calculate_packing_costs(sku_df, pricing, interleaving_required, eco_friendly, protective_tape):
+    """Calculate Table 3 (packing total cost) for every SKU in a single pass.
+
+    ``pricing`` is the ``ReferencePricing`` compiled from the material and
+    cardboard box cost tables of the tab being costed. A SKU box is charged
+    the cheapest catalog carton that holds it, shared by as many profiles as
+    the carton holds in its best layout (never fewer than the SKU table's
+    profiles per box); interleaving and tape use the SKU table's count.
+
+    Returns a tuple ``(calculations, valid_mask)``. ``calculations`` holds one
+    row per valid SKU in ``PACKING_COST_COLUMNS`` order and ``valid_mask`` is a
+    boolean Series aligned with ``sku_df`` marking which rows could be costed.
+    """
+    # Get SKU dimensions as float arrays
+    width = to_numeric_array(sku_df, "Width/mm")
+    height = to_numeric_array(sku_df, "Height/mm")
+    length = to_numeric_array(sku_df, "Length/mm")
+    unit_weight = to_numeric_array(sku_df, "Unit weight(kg/m)")
+    total_weight = to_numeric_array(sku_df, "total weight per profile (kg)")
+
+    # Get box dimensions from SKU table
+    box_width = to_numeric_array(sku_df, "Box Width/mm")
+    box_height = to_numeric_array(sku_df, "Box Height/mm")
+    box_length = to_numeric_array(sku_df, "Box Length/mm")
+    profiles_per_box = to_numeric_array(sku_df, "Number of profiles per box")
+
+    # A row can only be costed when every numeric input is present
+    inputs = np.column_stack([
+        width, height, length, unit_weight, total_weight,
+        box_width, box_height, box_length, profiles_per_box
+    ])
+    valid = np.isfinite(inputs).all(axis=1)
+
+    # Surface Area in m² (using profile dimensions)
+    sa_m2 = (2 * ((width * height) + (width * length) + (height * length))) / (1000 * 1000)
+
+    # Interleaving Cost
+    interleaving_cost = np.zeros(len(sku_df))
+    if interleaving_required == "Yes":
+        selected_material = INTERLEAVING_MATERIAL_MAP.get(eco_friendly, "McFoam")
+        cost_per_m2 = pricing.material_costs.get(selected_material, 0.0)
+        interleaving_cost = safe_divide(cost_per_m2 * sa_m2, profiles_per_box)
+
+    # Protective Tape Cost
+    protective_tape_cost = np.zeros(len(sku_df))
+    if protective_tape == "Yes":
+        cost_per_m2 = pricing.material_costs.get("Protective Tape", 0.0)
+        protective_tape_cost = safe_divide(cost_per_m2 * sa_m2, profiles_per_box)
+
+    # Packing Cost: cheapest catalog carton that holds the SKU box, per profile
+    box_codes = np.full(len(sku_df), None, dtype=object)
+    carton_cost = np.full(len(sku_df), np.nan)
+    carton_profiles = profiles_per_box
+    if pricing.box_catalog is not None:
+        positions, carton_cost, box_codes = pricing.box_catalog.best_fit(box_width, box_height, box_length)
+        # The carton is filled with profiles; it holds at least the SKU box's profiles
+        in_carton = positions >= 0
+        filled, _ = best_box_orientation(
+            pricing.box_catalog.dims[positions[in_carton]], width[in_carton], height[in_carton], length[in_carton]
+        )
+        carton_profiles = profiles_per_box.copy()
+        carton_profiles[in_carton] = np.maximum(profiles_per_box[in_carton], filled)
+    # Without a fitting carton, scale the reference box cost per volume to the SKU box
+    box_volume_cost = pricing.box_volume_cost
+    volume_scaled = box_volume_cost * (box_width * box_height * box_length)
+    per_box = safe_divide(np.where(np.isfinite(carton_cost), carton_cost, volume_scaled), carton_profiles)
+    # Fallback to the profile volume if profiles_per_box is 0
+    fallback = box_volume_cost * (width * height * length)
+    packing_cost = np.where(profiles_per_box > 0, per_box, fallback)
+
+    # Total Cost, Cost/kg and Cost/m
+    total_cost = interleaving_cost + protective_tape_cost + packing_cost
+    cost_per_kg = safe_divide(total_cost, total_weight)
+    cost_per_m = safe_divide(total_cost, length / 1000)
+
+    calculations = pd.DataFrame({
+        "SKU": sku_df["SKU No"].to_numpy() if "SKU No" in sku_df.columns else np.full(len(sku_df), None),
+        "Interleaving cost": np.round(interleaving_cost, 2),
+        "Protective tape cost": np.round(protective_tape_cost, 2),
+        "Packing type": "Cardboard box",
+        "Box SAP Item Code": np.where(profiles_per_box > 0, box_codes, None),
+        "Profiles per box": np.nan_to_num(carton_profiles).astype(int),
+        "Packing Cost (LKR)": np.round(packing_cost, 2),
+        "Total Cost per profile/LKR": np.round(total_cost, 2),
+        "Cost/kg (LKR)": np.round(cost_per_kg, 2),
+        "Cost/m (LKR)": np.round(cost_per_m, 2)
+    }, columns=PACKING_COST_COLUMNS)
+
+    valid_mask = pd.Series(valid, index=sku_df.index, name="valid")
+    calculations = calculations[valid].reset_index(drop=True)
+    return calculations, valid_mask
+
+
+# Column order of the Total Crate/Pallet Cost Calculation table
+CRATE_PALLET_COST_COLUMNS = [
+    "SKU",
+    "Packing method",
+    "Load unit",
+    "units per pallet/crate",
+    "profiles per pallet/crate",
+    "Load layout",
+    "Load utilisation (%)",
+    "crate/pallet cost(LKR)",
+    "packing cost per profile(LKR/prof)",
+    "Number of strapping clips",
+    "strapping clip cost per profile",
+    "PP strapping cost",
+    "PP strapping cost per profile",
+    "Cardboard covering cost(LKR/profile)",
+    "Total cost"
+]
+
+
+def sku_load_units(sku_data):
+    """Crate/pallet load unit of every SKU row: its box when set, otherwise the bare profile.
+
+    Returns a DataFrame with ``SKU``, ``unit_width``, ``unit_height``,
+    ``unit_length``, ``profiles_per_unit``, ``boxed`` and ``profile_weight``
+    (kg, NaN when unknown), aligned with ``sku_data``.
+    """
+    box_dims = np.column_stack([
+        to_numeric_array(sku_data, "Box Width/mm"),
+        to_numeric_array(sku_data, "Box Height/mm"),
+        to_numeric_array(sku_data, "Box Length/mm")
+    ])
+    profiles_per_box = np.floor(to_numeric_array(sku_data, "Number of profiles per box"))
+    boxed = (box_dims > 0).all(axis=1) & (profiles_per_box >= 1)
+    return pd.DataFrame({
+        "SKU": sku_data["SKU No"].to_numpy(),
+        "unit_width": np.where(boxed, box_dims[:, 0], to_numeric_array(sku_data, "Width/mm")),
+        "unit_height": np.where(boxed, box_dims[:, 1], to_numeric_array(sku_data, "Height/mm")),
+        "unit_length": np.where(boxed, box_dims[:, 2], to_numeric_array(sku_data, "Length/mm")),
+        "profiles_per_unit": np.where(boxed, profiles_per_box, 1.0),
+        "boxed": boxed,
+        "profile_weight": to_numeric_array(sku_data, "total weight per profile (kg)")
+    })
+
+
+def calculate_crate_pallet_costs(crate_pallet_data, sku_data, pricing):
+    """Calculate the crate/pallet cost table for every crate/pallet row at once.
+
+    The crate/pallet rows are joined to ``sku_data`` on SKU with a hash merge
+    and priced with the crate, pallet, strapping and covering rates of
+    ``pricing``. Each SKU is loaded as whole boxes when its box dimensions and
+    profiles per box are set, otherwise as bare profiles, with the layout from
+    ``plan_loads``.
+    Returns ``(calculations, valid_mask, unmatched_skus)`` where ``valid_mask``
+    is aligned with ``crate_pallet_data`` and ``unmatched_skus`` lists the SKUs
+    that have no matching row in the SKU table.
+    """
+    # Load unit per SKU, the last row wins for duplicated SKUs
+    sku_dimensions = sku_load_units(sku_data).drop_duplicates(subset="SKU", keep="last")
+
+    merged = crate_pallet_data[["SKU", "packing method"]].reset_index(drop=True).assign(
+        crate_pallet_width=to_numeric_array(crate_pallet_data, "Width/mm"),
+        crate_pallet_height=to_numeric_array(crate_pallet_data, "Height/mm"),
+        crate_pallet_length=to_numeric_array(crate_pallet_data, "Length/mm")
+    ).merge(sku_dimensions, on="SKU", how="left", indicator=True)
+
+    matched = (merged["_merge"] == "both").to_numpy()
+    unmatched_skus = merged.loc[~matched, "SKU"].tolist()
+
+    packing_method = merged["packing method"].to_numpy()
+    width = merged["crate_pallet_width"].to_numpy(dtype=float)
+    height = merged["crate_pallet_height"].to_numpy(dtype=float)
+    length = merged["crate_pallet_length"].to_numpy(dtype=float)
+    valid = matched & np.isfinite(np.column_stack([width, height, length])).all(axis=1)
+
+    boxed = merged["boxed"].to_numpy(dtype=bool)
+    units, profiles, utilisation, layout = plan_loads(
+        width, height, length,
+        merged["unit_width"].to_numpy(dtype=float),
+        merged["unit_height"].to_numpy(dtype=float),
+        merged["unit_length"].to_numpy(dtype=float),
+        merged["profiles_per_unit"].to_numpy(dtype=float)
+    )
+    profiles = profiles.astype(float)
+
+    # Crate/pallet cost scaled by volume against the reference tables
+    volume = width * height * length
+    pallet_cost = safe_divide(volume, pricing.pallet_area * length) * pricing.pallet_cost
+    crate_cost = safe_divide(volume, pricing.crate_volume) * pricing.crate_cost
+    crate_pallet_cost = np.select(
+        [packing_method == "pallet", packing_method == "crate"],
+        [pallet_cost, crate_cost],
+        default=0.0
+    )
+    packing_cost_per_profile = safe_divide(crate_pallet_cost, profiles)
+
+    # One strapping clip every 500 mm of length
+    number_of_clips = np.where(length > 0, np.ceil(length / 500), 0)
+    clip_cost_per_profile = safe_divide(number_of_clips * pricing.clip_cost, profiles)
+
+    # PP strapping cost per profile
+    pp_cost_per_profile = (
+        safe_divide(safe_divide((width + height) / 1000, pricing.strapping_length_m), profiles)
+        * (number_of_clips * 2) * pricing.strapping_cost_per_m
+    )
+    pp_cost = np.where(profiles > 0, pp_cost_per_profile * profiles, 0.0)
+
+    # Cardboard covering cost per profile from the crate/pallet surface area
+    surface_area_m2 = (width * height * 2 + width * length * 2 + height * length * 2) / 1000000
+    covering_cost = safe_divide(surface_area_m2, pricing.covering_area_m2) * pricing.covering_price
+    covering_cost_per_profile = safe_divide(covering_cost, profiles)
+
+    total_cost = (packing_cost_per_profile + clip_cost_per_profile + pp_cost_per_profile
+                  + covering_cost_per_profile + crate_pallet_cost)
+
+    calculations = pd.DataFrame({
+        "SKU": merged["SKU"].to_numpy(),
+        "Packing method": packing_method,
+        "Load unit": np.where(boxed, "Box", "Profile"),
+        "units per pallet/crate": units,
+        "profiles per pallet/crate": profiles.astype(int),
+        "Load layout": layout,
+        "Load utilisation (%)": np.round(utilisation * 100, 1),
+        "crate/pallet cost(LKR)": np.round(crate_pallet_cost, 2),
+        "packing cost per profile(LKR/prof)": np.round(packing_cost_per_profile, 4),
+        "Number of strapping clips": np.nan_to_num(number_of_clips).astype(int),
+        "strapping clip cost per profile": np.round(clip_cost_per_profile, 4),
+        "PP strapping cost": np.round(pp_cost, 4),
+        "PP strapping cost per profile": np.round(pp_cost_per_profile, 4),
+        "Cardboard covering cost(LKR/profile)": np.round(covering_cost_per_profile, 4),
+        "Total cost": np.round(total_cost, 4)
+    }, columns=CRATE_PALLET_COST_COLUMNS)
+
+    valid_mask = pd.Series(valid, index=crate_pallet_data.index, name="valid")
+    calculations = calculations[valid].reset_index(drop=True)
+    return calculations, valid_mask, unmatched_skus
+
+
+def size_crate_pallet(sku_data, pricing, limits=LoadSizingLimits()):
+    """Propose a crate or pallet for every SKU of ``sku_data``.
+
+    Each SKU's load units (see ``sku_load_units``) are gridded into the
+    smallest cross-section holding ``limits.target_profiles`` profiles, fewer
+    where they would weigh more than ``limits.max_weight``. Both methods are
+    costed with ``calculate_crate_pallet_costs`` and the one with the lower
+    cost per profile is kept. Returns a crate/pallet table (SKU, packing
+    method, Width/mm, Height/mm, Length/mm), one row per SKU; SKUs that cannot
+    be sized get a pallet with zero dimensions.
+    """
+    units = sku_load_units(sku_data).drop_duplicates(subset="SKU", keep="last").reset_index(drop=True)
+    per_unit = units["profiles_per_unit"].to_numpy(dtype=float)
+    unit_weight = per_unit * units["profile_weight"].to_numpy(dtype=float)
+
+    # Units for the target profile count, capped by the weight limit where the weight is known
+    units_needed = np.ceil(limits.target_profiles / per_unit)
+    weight_cap = np.floor(safe_divide(limits.max_weight, unit_weight))
+    units_needed = np.where(unit_weight > 0, np.minimum(units_needed, weight_cap), units_needed)
+    width, height, length, _ = size_loads(
+        units["unit_width"], units["unit_height"], units["unit_length"], np.maximum(units_needed, 1), limits
+    )
+
+    sized = np.isfinite(np.column_stack([width, height, length])).all(axis=1)
+    candidates = pd.DataFrame({
+        "SKU": np.tile(units["SKU"].to_numpy(), 2),
+        "packing method": np.repeat(["pallet", "crate"], len(units)),
+        "Width/mm": np.tile(width, 2),
+        "Height/mm": np.tile(height, 2),
+        "Length/mm": np.tile(length, 2)
+    })
+    calculations, valid_mask, _ = calculate_crate_pallet_costs(candidates, sku_data, pricing)
+    per_profile_columns = [
+        "packing cost per profile(LKR/prof)", "strapping clip cost per profile",
+        "PP strapping cost per profile", "Cardboard covering cost(LKR/profile)"
+    ]
+    cost = np.full(len(candidates), np.inf)
+    cost[valid_mask.to_numpy()] = np.where(
+        calculations["profiles per pallet/crate"] > 0, calculations[per_profile_columns].sum(axis=1), np.inf
+    )
+    pallet_cost, crate_cost = cost[:len(units)], cost[len(units):]
+
+    return pd.DataFrame({
+        "SKU": units["SKU"].to_numpy(),
+        "packing method": np.where(sized & (crate_cost < pallet_cost), "crate", "pallet"),
+        "Width/mm": np.where(sized, width, 0.0),
+        "Height/mm": np.where(sized, height, 0.0),
+        "Length/mm": np.where(sized, length, 0.0)
+    })
+
+
+def calculate_hidden_costs(sku_df, pricing, finish, interleaving_required, eco_friendly,
+                           protective_tape_customer_specified):
+    """Batched version of the hidden costing table of packing_costing_app.py.
+
+    Takes the SKU input table (``W (mm)``, ``H (mm)``, ``L (mm)``, ``Fabricated``)
+    and returns a frame of float64 cost columns, one row per SKU. Costs are left
+    unformatted; rounding to two decimals is done when the table is displayed.
+    """
+    W = np.nan_to_num(to_numeric_array(sku_df, "W (mm)"))
+    H = np.nan_to_num(to_numeric_array(sku_df, "H (mm)"))
+    L = np.nan_to_num(to_numeric_array(sku_df, "L (mm)"))
+    fabricated = (sku_df["Fabricated"] == "Fabricated").to_numpy() if "Fabricated" in sku_df.columns else np.zeros(len(sku_df), dtype=bool)
+
+    # Surface area in m²
+    surface_area = (2 * ((W * L) + (H * L) + (W * H))) / 1_000_000
+
+    # Interleaving cost calculation
+    if interleaving_required == "Yes":
+        interleaving_material = eco_friendly
+        interleaving_total_cost = surface_area * pricing.material_costs.get(interleaving_material, 0.0)
+        message = "Okay"
+    else:
+        interleaving_material = "None"
+        interleaving_total_cost = np.zeros(len(sku_df))
+        message = "No interleaving required"
+
+    # Protective tape is always needed for anodized or fabricated profiles, otherwise only if the customer asks
+    tape_required = fabricated | (finish == "Anodized") | (protective_tape_customer_specified == "Yes")
+    protective_tape_cost = np.where(tape_required, surface_area * pricing.material_costs.get("Protective Tape", 100.65), 0.0)
+    protective_tape_advice = np.where(tape_required, "Protective tape required to avoid rejects", "Not necessary.")
+
+    # Packaging cost: polybag for profiles longer than 550 mm, cardboard box otherwise
+    use_polybag = L > 550
+    polybag_cost = np.where(use_polybag, pricing.polybag_cost_per_m * (L / 1000), 0.0)
+    cardboard_cost = np.where(use_polybag, 0.0, (W * H * L / pricing.box_volume) * pricing.box_cost if pricing.box_volume else 0.0)
+    packaging_cost = np.maximum(cardboard_cost, polybag_cost)
+    packaging_type = np.where(use_polybag, "Polybag", "Cardboard Box")
+
+    total = interleaving_total_cost + protective_tape_cost + packaging_cost
+
+    return pd.DataFrame({
+        "SKU": sku_df["SKU No."].to_numpy() if "SKU No." in sku_df.columns else np.full(len(sku_df), None),
+        "Interleaving Cost (Rs)": interleaving_total_cost,
+        "Protective Tape Cost (Rs)": protective_tape_cost,
+        "Packaging Type": packaging_type,
+        "Packaging Cost (Rs)": packaging_cost,
+        "Total Cost (Rs)": total,
+        "Interleaving Material": interleaving_material,
+        "Check": message,
+        "Protective Tape Advice": protective_tape_advice
+    }, index=sku_df.index)
+
+
+# Interleaving materials of packing_costing_app.py and their bundling cost columns
+BUNDLE_INTERLEAVING_COLUMNS = {
+    "McFoam": "McFoam Cost (Rs/prof)",
+    "Stretchwrap": "Stretchwrap Cost (Rs/prof)",
+    "Craft Paper": "Craft Paper Cost (Rs/prof)"
+}
+
+
+# Bundling parameters used for SKUs missing from a per-SKU bundling table
+BUNDLING_DEFAULTS = {
+    "Rows": 1,
+    "Layers": 1,
+    "Width Type": "W/mm",
+    "Height Type": "H/mm",
+    "Bundle Width (mm)": 0.0,
+    "Bundle Height (mm)": 0.0
+}
+
+
+def _bundling_values(bundling, column, sku_df):
+    """A bundling parameter per SKU of ``sku_df``.
+
+    A bundling table with a ``SKU No.`` column is joined on it (the last row
+    wins for duplicated SKUs, missing SKUs get ``BUNDLING_DEFAULTS``). Without
+    it, a single row applies to every SKU and longer tables align by position.
+    """
+    if "SKU No." in bundling.columns:
+        per_sku = bundling.drop_duplicates(subset="SKU No.", keep="last").set_index("SKU No.")[column]
+        values = sku_df["SKU No."].map(per_sku)
+        return values.where(values.notna(), BUNDLING_DEFAULTS[column]).to_numpy()
+    values = bundling[column].to_numpy()
+    return np.repeat(values[:1], len(sku_df)) if len(values) == 1 else values
+
+
+def bundling_table(sku_df, bundling, columns):
+    """Per-SKU bundling table for the SKUs of ``sku_df`` with the given parameter columns.
+
+    Values come from ``bundling`` as in ``calculate_bundle_dimensions``, so a
+    stored per-SKU table keeps its rows and new SKUs get the defaults.
+    """
+    table = pd.DataFrame({"SKU No.": sku_df["SKU No."].to_numpy()})
+    for column in columns:
+        default = BUNDLING_DEFAULTS[column]
+        values = _bundling_values(bundling, column, sku_df) if column in bundling.columns else np.full(len(sku_df), default)
+        if isinstance(default, (int, float)):
+            values = pd.to_numeric(pd.Series(values), errors="coerce").fillna(default).astype(type(default)).to_numpy()
+        table[column] = values
+    return table
+
+
+def calculate_bundle_dimensions(sku_df, bundle_input_method, bundling):
+    """Bundle width, height, length and profiles per bundle for every SKU at once.
+
+    With "Number of layers" the bundle is ``Rows`` profiles across and
+    ``Layers`` high, each measured along the profile dimension picked by
+    ``Width Type``/``Height Type``. Otherwise the bundle has the given ``Bundle
+    Width (mm)``/``Bundle Height (mm)`` and holds as many whole profiles as fit
+    (1 when none does). Bundles are as long as the profile.
+    """
+    count = len(sku_df)
+    W = np.nan_to_num(to_numeric_array(sku_df, "W (mm)"))
+    H = np.nan_to_num(to_numeric_array(sku_df, "H (mm)"))
+    L = np.nan_to_num(to_numeric_array(sku_df, "L (mm)"))
+
+    if bundle_input_method == "Number of layers":
+        rows = np.trunc(np.nan_to_num(pd.to_numeric(_bundling_values(bundling, "Rows", sku_df), errors="coerce")))
+        layers = np.trunc(np.nan_to_num(pd.to_numeric(_bundling_values(bundling, "Layers", sku_df), errors="coerce")))
+        width_type = _bundling_values(bundling, "Width Type", sku_df)
+        height_type = _bundling_values(bundling, "Height Type", sku_df)
+        bundle_width = rows * np.where(width_type == "H/mm", H, W)
+        bundle_height = layers * np.where(height_type == "W/mm", W, H)
+        profiles_per_bundle = rows * layers
+    else:
+        bundle_width = np.nan_to_num(pd.to_numeric(_bundling_values(bundling, "Bundle Width (mm)", sku_df), errors="coerce"))
+        bundle_height = np.nan_to_num(pd.to_numeric(_bundling_values(bundling, "Bundle Height (mm)", sku_df), errors="coerce"))
+        rows_width = np.floor(safe_divide(bundle_width, W))
+        rows_height = np.floor(safe_divide(bundle_height, H))
+        profiles_per_bundle = np.where((rows_width > 0) & (rows_height > 0), rows_width * rows_height, 1)
+
+    return bundle_width.astype(float), bundle_height.astype(float), L, profiles_per_bundle.astype(int)
+
+
+def calculate_bundle_packaging_cost(bundle_width, bundle_height, bundle_length, profiles_per_bundle, packaging_type, pricing):
+    """Polybag or cardboard box cost per profile of every bundle, NaN for other packaging types"""
+    polybag_cost = pricing.polybag_cost_per_m * (bundle_length / 1000)
+    cardboard_cost = (
+        (bundle_width * bundle_height * bundle_length / pricing.box_volume) * pricing.box_cost if pricing.box_volume else 0.0
+    )
+    per_bundle = np.select(
+        [packaging_type == "Polybag", packaging_type == "Cardboard Box"],
+        [polybag_cost, cardboard_cost],
+        default=np.nan
+    )
+    return safe_divide(per_bundle, profiles_per_bundle)
+
+
+def calculate_bundle_costs(sku_df, pricing, bundle_input_method, bundling, finish, interleaving_required,
+                           eco_friendly, protective_tape_customer_specified):
+    """Secondary packing (bundling) cost per profile of packing_costing_app.py for every SKU at once.
+
+    Bundles come from ``calculate_bundle_dimensions``. Bundles of profiles
+    longer than 550 mm go in a polybag, shorter ones in a cardboard box. The
+    selected interleaving material covers the bundle surface; protective tape
+    covers each profile where it is required. Only the selected material's
+    column is included, and the tape column only when some SKU needs tape.
+    """
+    W = np.nan_to_num(to_numeric_array(sku_df, "W (mm)"))
+    H = np.nan_to_num(to_numeric_array(sku_df, "H (mm)"))
+    fabricated = (sku_df["Fabricated"] == "Fabricated").to_numpy() if "Fabricated" in sku_df.columns else np.zeros(len(sku_df), dtype=bool)
+    bundle_width, bundle_height, bundle_length, profiles_per_bundle = calculate_bundle_dimensions(
+        sku_df, bundle_input_method, bundling
+    )
+
+    packaging_type = np.where(bundle_length > 550, "Polybag", "Cardboard Box")
+    packaging_cost = calculate_bundle_packaging_cost(
+        bundle_width, bundle_height, bundle_length, profiles_per_bundle, packaging_type, pricing
+    )
+
+    costs = pd.DataFrame({
+        "SKU": sku_df["SKU No."].to_numpy() if "SKU No." in sku_df.columns else np.full(len(sku_df), None),
+        "Bundle Width (mm)": bundle_width,
+        "Bundle Height (mm)": bundle_height,
+        "Bundle Length (mm)": bundle_length,
+        "Profiles per Bundle": profiles_per_bundle,
+        "Packaging Type": packaging_type,
+        "Packaging Cost (Rs/prof)": packaging_cost
+    }, index=sku_df.index)
+    total = packaging_cost.copy()
+
+    # Interleaving material over the bundle surface, per profile
+    bundle_surface_area = 2 * ((bundle_width * bundle_length) + (bundle_height * bundle_length) + (bundle_width * bundle_height))
+    if interleaving_required == "Yes" and eco_friendly in BUNDLE_INTERLEAVING_COLUMNS:
+        if eco_friendly == "Stretchwrap":
+            per_bundle = (bundle_surface_area / pricing.stretch_area) * pricing.stretch_cost if pricing.stretch_area else np.zeros(len(sku_df))
+        else:
+            per_bundle = bundle_surface_area / 1_000_000 * pricing.material_costs.get(eco_friendly, 0.0)
+        interleaving_cost = safe_divide(per_bundle, profiles_per_bundle)
+        costs[BUNDLE_INTERLEAVING_COLUMNS[eco_friendly]] = interleaving_cost
+        total += interleaving_cost
+
+    # Protective tape over each profile's surface where required
+    tape_required = fabricated | (finish == "Anodized") | (protective_tape_customer_specified == "Yes")
+    if tape_required.any():
+        profile_surface_area = 2 * ((W * bundle_length) + (H * bundle_length) + (W * H)) / 1_000_000
+        protective_tape_cost = np.where(
+            tape_required, profile_surface_area * pricing.material_costs.get("Protective Tape", 100.65), np.nan
+        )
+        costs["Protective Tape Cost (Rs/prof)"] = protective_tape_cost
+        total += np.nan_to_num(protective_tape_cost)
+
+    costs["Total Cost (Rs/prof)"] = total
+    return costs
+
+
+def recalculate_bundle_costs(edited_costs, bundle_costs, pricing):
+    """Reprice bundles after profiles per bundle or packaging type were edited.
+
+    Bundle dimensions come from ``bundle_costs`` (the table as calculated);
+    interleaving and tape costs are kept from ``edited_costs``. Rows with an
+    unknown packaging type keep their packaging cost.
+    """
+    updated = edited_costs.copy()
+    packaging_cost = calculate_bundle_packaging_cost(
+        to_numeric_array(bundle_costs, "Bundle Width (mm)"),
+        to_numeric_array(bundle_costs, "Bundle Height (mm)"),
+        to_numeric_array(bundle_costs, "Bundle Length (mm)"),
+        np.trunc(np.nan_to_num(to_numeric_array(edited_costs, "Profiles per Bundle"))),
+        edited_costs["Packaging Type"].to_numpy(),
+        pricing
+    )
+    packaging_cost = np.where(np.isnan(packaging_cost), to_numeric_array(edited_costs, "Packaging Cost (Rs/prof)"), packaging_cost)
+    updated["Packaging Cost (Rs/prof)"] = packaging_cost
+
+    other_columns = [
+        column for column in list(BUNDLE_INTERLEAVING_COLUMNS.values()) + ["Protective Tape Cost (Rs/prof)"]
+        if column in edited_costs.columns
+    ]
+    other_costs = sum((np.nan_to_num(to_numeric_array(edited_costs, column)) for column in other_columns), np.zeros(len(edited_costs)))
+    updated["Total Cost (Rs/prof)"] = packaging_cost + other_costs
+    return updated
+
+
+def index_by_sku(df, key="SKU"):
+    """Result table indexed by SKU for O(1) joins, the first row wins for duplicated SKUs"""
+    return df.drop_duplicates(subset=key, keep="first").set_index(key)
+
+
+def calculate_final_packing_costs(final_selection, bundles_by_sku, secondary_by_sku, pricing):
+    """Final crate/pallet cost summary of packing_costing_app.py for every SKU at once.
+
+    ``bundles_by_sku`` and ``secondary_by_sku`` are the bundling and updated
+    secondary cost tables indexed with ``index_by_sku``; each SKU's bundle and
+    secondary cost are looked up in them with one join. Crates are priced by
+    volume and strapped with a clip every 500 mm, pallets are priced by
+    footprint. Bundles are loaded with ``plan_loads`` (at least one per
+    crate/pallet); SKUs without a bundle get no profiles and no packing cost
+    per profile.
+    """
+    skus = final_selection["SKU No."]
+    method = final_selection["Final Packing Method"].to_numpy()
+    is_crate, is_pallet = method == "Crate", method == "Pallet"
+    width = to_numeric_array(final_selection, "Width (mm)")
+    height = to_numeric_array(final_selection, "Height (mm)")
+    length = np.where(is_crate, to_numeric_array(final_selection, "Length (mm)"), 0.0)
+
+    # Crates scale the reference crate by volume, pallets the reference pallet by area
+    crate_cost = (width * height * length / pricing.crate_volume) * pricing.crate_cost if pricing.crate_volume else np.zeros(len(width))
+    pallet_cost = (width * height / pricing.pallet_area) * pricing.pallet_cost if pricing.pallet_area else np.zeros(len(width))
+    cost = np.select([is_crate, is_pallet], [crate_cost, pallet_cost], default=0.0)
+    length_m = length / 1000
+    number_of_clips = np.where(is_crate, length_m / 0.5, 0.0)
+    strapping_cost = np.where(
+        is_crate, 2 * (length_m + width / 1000) * pricing.strapping_cost_per_m * number_of_clips, 0.0
+    )
+
+    # Each SKU's bundle, loaded as whole bundles into the crate/pallet
+    bundles = bundles_by_sku.reindex(skus)
+    has_bundle = skus.isin(bundles_by_sku.index).to_numpy()
+    bundle_count, _, utilisation, layout = plan_loads(
+        width, height, length,
+        to_numeric_array(bundles, "Bundle Width (mm)"),
+        to_numeric_array(bundles, "Bundle Height (mm)"),
+        to_numeric_array(bundles, "Bundle Length (mm)")
+    )
+    boxes_per_pallet_crate = np.where(has_bundle, np.maximum(bundle_count, 1), 0)
+    profiles_per_bundle = np.trunc(np.nan_to_num(to_numeric_array(bundles, "Profiles per Bundle")))
+    profiles_per_pallet_crate = (boxes_per_pallet_crate * profiles_per_bundle).astype(int)
+    packing_cost_per_profile = np.where(has_bundle, safe_divide(cost, profiles_per_pallet_crate), 0.0)
+    strapping_cost_per_profile = np.where(has_bundle, safe_divide(strapping_cost, profiles_per_pallet_crate), 0.0)
+
+    secondary_cost = np.nan_to_num(to_numeric_array(secondary_by_sku.reindex(skus), "Total Cost (Rs/prof)"))
+
+    return pd.DataFrame({
+        "SKU No.": skus.to_numpy(),
+        "Method": method,
+        "Width (mm)": width,
+        "Height (mm)": height,
+        "Length (mm)": np.where(is_crate, length, np.nan),
+        "Boxes per Pallet/Crate": boxes_per_pallet_crate,
+        "Profiles per Pallet/Crate": profiles_per_pallet_crate,
+        "Load Layout": np.where(has_bundle, layout, ""),
+        "Load Utilisation (%)": np.where(has_bundle, utilisation * 100, 0.0),
+        "Packing Cost (LKR)": cost,
+        "Packing Cost per Profile (LKR)": packing_cost_per_profile,
+        "Strapping Clips": np.where(is_crate, number_of_clips, np.nan),
+        "Strapping Cost (LKR)": np.where(is_crate, strapping_cost, np.nan),
+        "Strapping Cost per Profile (LKR)": np.where(is_crate, strapping_cost_per_profile, np.nan),
+        "Total Cost per Profile (LKR)": packing_cost_per_profile + strapping_cost_per_profile + secondary_cost
+    })
+
+
+def recalculate_final_packing_costs(edited_costs, final_costs, secondary_by_sku):
+    """Reprice the final summary after profiles per pallet/crate were edited.
+
+    Packing and strapping costs come from ``final_costs`` (the summary as
+    calculated), secondary costs from ``secondary_by_sku``. Totals are cut to
+    two decimals.
+    """
+    updated = edited_costs.copy()
+    profiles_per_pallet_crate = np.trunc(np.nan_to_num(to_numeric_array(edited_costs, "Profiles per Pallet/Crate")))
+    packing_cost_per_profile = safe_divide(to_numeric_array(final_costs, "Packing Cost (LKR)"), profiles_per_pallet_crate)
+    strapping_cost_per_profile = safe_divide(
+        np.nan_to_num(to_numeric_array(final_costs, "Strapping Cost (LKR)")), profiles_per_pallet_crate
+    )
+    secondary_cost = np.nan_to_num(to_numeric_array(secondary_by_sku.reindex(edited_costs["SKU No."]), "Total Cost (Rs/prof)"))
+
+    updated["Packing Cost per Profile (LKR)"] = packing_cost_per_profile
+    updated["Strapping Cost per Profile (LKR)"] = np.where(
+        edited_costs["Method"].to_numpy() == "Crate", strapping_cost_per_profile, np.nan
+    )
+    updated["Total Cost per Profile (LKR)"] = np.trunc(
+        (packing_cost_per_profile + strapping_cost_per_profile + secondary_cost) * 100
+    ) / 100
+    return updated
+
+
+# Options of the "W/mm" selectbox in the SKU tables
+ARRANGED_IN_W = "Profiles are arranged in W direction"
+ARRANGED_IN_HEIGHT = "Profiles are arranged in height direction"
+
+# SKU table columns filled in by calculate_total_weight and calculate_box_and_profiles
+DERIVED_SKU_COLUMNS = [
+    "total weight per profile (kg)",
+    "Box Width/mm",
+    "Box Height/mm",
+    "Box Length/mm",
+    "W/mm",
+    "H/mm",
+    "Number of profiles per box",
+    "Box layout"
+]
+
+
+def round_up_to_nearest_100(values):
+    """Round UP to nearest 100 (element-wise)"""
+    return ((np.trunc(values) + 99) // 100) * 100
+
+
+def calculate_total_weight(df):
+    """Calculate total weight per profile (kg) from unit weight and length for every row"""
+    df_copy = df.copy()
+    unit_weight = to_numeric_array(df_copy, "Unit weight(kg/m)")
+    length_mm = to_numeric_array(df_copy, "Length/mm")
+    # Unit weight(kg/m) * (Length(mm) / 1000), 0 where an input is missing
+    total_weight = np.round(unit_weight * (length_mm / 1000), 4)
+    df_copy["total weight per profile (kg)"] = np.nan_to_num(total_weight)
+    return df_copy
+
+
+def calculate_box_and_profiles(df):
+    """Calculate box dimensions and number of profiles per box for every row.
+
+    Box dimensions that are already set (non-zero) are kept; unset ones are the
+    profile dimension rounded up to the nearest 100 mm. The profile count is
+    the best layout found by ``optimize_box_layout``; W/mm and H/mm are set to
+    the arrangement most of its profiles use. Rows whose profile dimensions
+    cannot be used get zero box dimensions and zero profiles.
+    """
+    df_copy = df.copy()
+    width = to_numeric_array(df_copy, "Width/mm")
+    height = to_numeric_array(df_copy, "Height/mm")
+    length = to_numeric_array(df_copy, "Length/mm")
+
+    # Rows with a missing profile dimension cannot be boxed
+    error = ~np.isfinite(np.column_stack([width, height, length])).all(axis=1)
+
+    # Only auto-calculate box dimensions that are 0 or not set
+    box_dims = []
+    for box_column, profile_dim in [("Box Width/mm", width), ("Box Height/mm", height), ("Box Length/mm", length)]:
+        current = to_numeric_array(df_copy, box_column)
+        unset = np.isnan(current) | (current == 0)
+        box_dim = np.where(unset, round_up_to_nearest_100(np.nan_to_num(profile_dim)), current)
+        box_dims.append(np.where(error, 0, box_dim))
+    box_width, box_height, box_length = box_dims
+
+    # Best layout over all orientations, each factor floored
+    profiles_per_box, layout, by_height = optimize_box_layout(box_width, box_height, box_length, width, height, length)
+    profiles_per_box = np.where(error, 0, profiles_per_box)
+
+    df_copy["Box Width/mm"] = box_width
+    df_copy["Box Height/mm"] = box_height
+    df_copy["Box Length/mm"] = box_length
+    df_copy["W/mm"] = np.where(by_height, ARRANGED_IN_HEIGHT, ARRANGED_IN_W)
+    df_copy["H/mm"] = np.where(by_height, ARRANGED_IN_W, ARRANGED_IN_HEIGHT)
+    df_copy["Number of profiles per box"] = profiles_per_box.astype(int)
+    df_copy["Box layout"] = np.where(error, "", layout)
+    return df_copy
+
+
+def search_box_dimensions(df, pricing, limits=BoxSearchLimits()):
+    """Replace the box dimensions of every row by the cheapest box per profile within ``limits``.
+
+    Boxes are priced as in ``calculate_packing_costs`` with ``pricing``: the
+    cheapest catalog carton holding the box, else the reference box cost
+    scaled by volume. Rows for which no box within the limits holds a profile
+    keep their box dimensions. Profiles per box and layout are then
+    recalculated as in ``calculate_box_and_profiles``.
+    """
+    df_copy = df.copy()
+    box_width, box_height, box_length, _, _ = search_box_sizes(
+        to_numeric_array(df_copy, "Width/mm"),
+        to_numeric_array(df_copy, "Height/mm"),
+        to_numeric_array(df_copy, "Length/mm"),
+        limits,
+        box_volume_cost=pricing.box_volume_cost,
+        catalog=pricing.box_catalog
+    )
+    found = np.isfinite(box_width)
+    for box_column, box_dim in [("Box Width/mm", box_width), ("Box Height/mm", box_height), ("Box Length/mm", box_length)]:
+        df_copy[box_column] = np.where(found, box_dim, to_numeric_array(df_copy, box_column))
+    return calculate_box_and_profiles(df_copy)
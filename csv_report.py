@@ -0,0 +1,29 @@
+"""Single-pass CSV export of multi-section reports.
+
+Each section is a title line followed by a table, written straight into one
+output buffer (optionally gzip-compressed) instead of building a CSV string
+per section and joining them.
+"""
+import gzip
+import io
+from contextlib import nullcontext
+
+
+def write_sectioned_csv(sections, compress=False):
+    """Write ``(title, df, to_csv options)`` sections as one CSV and return its bytes.
+
+    Sections are separated by two empty lines. With ``compress`` the bytes are
+    gzip-compressed (fixed mtime, so equal reports give equal bytes).
+    """
+    raw = io.BytesIO()
+    with (gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) if compress else nullcontext(raw)) as binary:
+        text = io.TextIOWrapper(binary, encoding="utf-8", newline="")
+        for number, (title, df, options) in enumerate(sections):
+            if number:
+                text.write("\n\n")
+            text.write(f"{title}\n")
+            df.to_csv(text, index=False, **options)
+        text.flush()
+        # Leave the underlying buffer open for getvalue()
+        text.detach()
+    return raw.getvalue()
@@ -0,0 +1,310 @@
+"""Streaming Excel report for the packing costing app.
+
+The report is written with an openpyxl write-only workbook: rows are emitted
+top to bottom and serialised as they are appended, so memory stays roughly
+flat in the number of table rows. Cell formatting uses named styles that are
+registered once per workbook instead of a Border object per cell.
+
+``submit_excel_report`` builds reports on a background thread and keeps the
+result keyed by a content hash of the tables and selections, so an unchanged
+report is never built twice.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from copy import copy
+from io import BytesIO
+
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+
+from reference_pricing import CompiledCache, frame_fingerprint
+
+TITLE_STYLE = "report_title"
+HEADING_STYLE = "report_heading"
+HEADER_STYLE = "table_header"
+CELL_STYLE = "table_cell"
+
+REPORT_CACHE_SIZE = 8
+
+_report_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="excel-report")
+_report_cache = CompiledCache(maxsize=REPORT_CACHE_SIZE)
+
+
+def _named_styles():
+    thin_side = Side(style='thin')
+    thin_border = Border(left=thin_side, right=thin_side, top=thin_side, bottom=thin_side)
+    heading_font = Font(name='Calibri', size=12, bold=True, color='FFFFFF')
+    heading_fill = PatternFill(start_color='4B0082', end_color='4B0082', fill_type='solid')  # Dark purple
+
+    return [
+        NamedStyle(name=TITLE_STYLE, font=heading_font, fill=heading_fill, alignment=Alignment(horizontal='center')),
+        NamedStyle(name=HEADING_STYLE, font=heading_font, fill=heading_fill),
+        # Same look as the header row pandas' to_excel writes
+        NamedStyle(name=HEADER_STYLE, font=Font(bold=True), border=thin_border,
+                   alignment=Alignment(horizontal='center', vertical='top')),
+        NamedStyle(name=CELL_STYLE, border=thin_border)
+    ]
+
+
+def _cell_value(value):
+    """Convert a DataFrame value to something openpyxl can write, NaN/None as an empty cell"""
+    if value is None or (pd.api.types.is_scalar(value) and pd.isna(value)):
+        return None
+    if hasattr(value, "item"):
+        return value.item()
+    return value
+
+
+class ReportSheetWriter:
+    """Appends headings, text lines and tables to a write-only worksheet at given rows"""
+
+    def __init__(self, workbook, title):
+        self.ws = workbook.create_sheet(title)
+        self.ws.column_dimensions['A'].width = 35
+        self.next_row = 1
+        self._style_arrays = {}
+
+    def _cell(self, value, style=None):
+        cell = WriteOnlyCell(self.ws, value=_cell_value(value))
+        if style:
+            # Resolve the named style once, then copy its style array onto each cell
+            if style not in self._style_arrays:
+                cell.style = style
+                self._style_arrays[style] = copy(cell._style)
+            cell._style = copy(self._style_arrays[style])
+        return cell
+
+    def _append(self, row, cells):
+        # Rows can only be written in order, gaps become empty rows
+        if row < self.next_row:
+            raise ValueError(f"Row {row} already written on sheet '{self.ws.title}'")
+        for _ in range(row - self.next_row):
+            self.ws.append([])
+        self.ws.append(cells)
+        self.next_row = row + 1
+
+    def title(self, heading, subtitle):
+        self._append(1, [self._cell(heading, TITLE_STYLE)])
+        self._append(2, [self._cell(subtitle)])
+
+    def heading(self, row, text):
+        self._append(row, [self._cell(text, HEADING_STYLE)])
+
+    def text(self, row, text, bordered=False):
+        self._append(row, [self._cell(text, CELL_STYLE if bordered else None)])
+
+    def table(self, row, df):
+        """Write ``df`` with its bold, centred header on ``row``, one bordered row per record"""
+        self._append(row, [self._cell(str(column), HEADER_STYLE) for column in df.columns])
+        for offset, record in enumerate(df.itertuples(index=False, name=None), start=1):
+            self._append(row + offset, [self._cell(value, CELL_STYLE) for value in record])
+
+
+def _non_empty(tables, name):
+    df = tables.get(name)
+    return df is not None and not df.empty
+
+
+def _write_primary_sheet(writer, tables, selections):
+    writer.title('Primary Calculations Summary', 'Primary Packing Costing Report')
+
+    # SKU Table
+    start_row = 4
+    sku_rows = len(tables["primary_sku_data"])
+    writer.heading(start_row, "SKU Table with dimensions")
+    writer.table(start_row + 2, tables["primary_sku_data"])
+
+    # Common Packing Selections
+    common_start_row = start_row + sku_rows + 5
+    writer.heading(common_start_row, "Common Packing Selections")
+    selection_lines = [
+        f'Finish: {selections.get("finish_primary", "Mill Finish")}',
+        f'Interleaving Required: {selections.get("interleaving_primary", "No")}',
+        f'Eco-Friendly Material: {selections.get("eco_friendly_primary", "Mac foam")}',
+        f'Protective Tape: {selections.get("protective_tape_primary", "No")}',
+        f'Box Ply: {selections.get("box_ply", "3 ply")}'
+    ]
+    for offset, line in enumerate(selection_lines, start=1):
+        writer.text(common_start_row + offset, line, bordered=True)
+
+    # Table 1, 2 and 3
+    current_row = common_start_row + 6
+    for name, heading in [
+        ("primary_material_costs", "Table 1: Primary Packing Material Costs"),
+        ("primary_box_costs", "Table 2: Cardboard Box Cost"),
+        ("primary_calculations", "Table 3: Primary Packing Total Cost")
+    ]:
+        writer.heading(current_row, heading)
+        writer.table(current_row + 2, tables[name])
+        current_row += len(tables[name]) + 4
+
+    # Special Comments Section (AFTER the table)
+    comments_start_row = current_row + 1
+    writer.heading(comments_start_row, "Special Comments Section")
+    eco_friendly_primary = selections.get("eco_friendly_primary", "Mac foam")
+    comment_lines = [
+        "Costing is done according to primary packing. Therefore, this cost does not include any crate or "
+        "palletizing charges. Please note that secondary packaging will incur an additional charge.",
+        "",
+        f'The interleaving material is "{eco_friendly_primary}".',
+        "",
+        "Protective tape required to avoid rejects",
+        "",
+        "Costing is only inclusive of interleaving required & Cardboard Box/Polybag."
+    ]
+    for offset, line in enumerate(comment_lines, start=2):
+        writer.text(comments_start_row + offset, line)
+
+
+def _write_secondary_sheet(writer, tables, selections):
+    writer.title('Secondary Calculations Summary', 'Secondary Packing Costing Report')
+
+    # SKU Table
+    start_row_sec = 4
+    sku_rows_sec = len(tables["secondary_sku_data"])
+    writer.heading(start_row_sec, "SKU Table with dimensions")
+    writer.table(start_row_sec + 2, tables["secondary_sku_data"])
+
+    # Common Packing Selections
+    common_start_row_sec = start_row_sec + sku_rows_sec + 5
+    writer.heading(common_start_row_sec, "Common Packing Selections")
+    selection_lines = [
+        f'Finish: {selections.get("finish_secondary", "Mill Finish")}',
+        f'Interleaving Required: {selections.get("interleaving_secondary", "No")}',
+        f'Eco-Friendly Material: {selections.get("eco_friendly_secondary", "Mac foam")}',
+        f'Protective Tape: {selections.get("protective_tape_secondary", "No")}'
+    ]
+    for offset, line in enumerate(selection_lines, start=1):
+        writer.text(common_start_row_sec + offset, line, bordered=True)
+
+    def optional_tables(current_row, sections):
+        for name, heading in sections:
+            if _non_empty(tables, name):
+                writer.heading(current_row, heading)
+                writer.table(current_row + 2, tables[name])
+                current_row += len(tables[name]) + 5
+        return current_row
+
+    # Bundling data
+    current_row = optional_tables(common_start_row_sec + 6, [
+        ("bundling_data", "Section 1 - Number of layers (Method 1)"),
+        ("bundle_size_data", "Section 2 - Size of bundle (Method 2)")
+    ])
+
+    # Secondary packing cost tables
+    current_row += 2
+    writer.heading(current_row, "Secondary Packing Cost Tables")
+    current_row = optional_tables(current_row + 2, [
+        ("secondary_material_costs", "Table 1: Primary Packing Material Costs"),
+        ("secondary_box_costs", "Table 2: Cardboard Box Cost"),
+        ("polybag_costs", "Table 3: Polybag Cost"),
+        ("stretchwrap_costs", "Table 4: Stretch wrap cost")
+    ])
+
+    # Crate/Pallet cost tables
+    current_row += 2
+    writer.heading(current_row, "Crate/Pallet Cost Tables")
+    current_row = optional_tables(current_row + 2, [
+        ("crate_costs", "Table 1: Crate Cost"),
+        ("pallet_costs", "Table 2: Pallet Cost"),
+        ("strapping_clip_costs", "Table 3: Strapping Clip Cost"),
+        ("pp_strapping_costs", "Table 4: PP Strapping Cost")
+    ])
+
+    # Secondary Packing Cost Per Profile
+    current_row += 2
+    sec_calc_rows = len(tables["secondary_calculations"])
+    writer.heading(current_row, "Secondary Packing Cost Per Profile")
+    writer.table(current_row + 3, tables["secondary_calculations"])
+
+    # Crate/Pallet Dimensions and Cost Calculations
+    current_row += sec_calc_rows + 6
+    if _non_empty(tables, "crate_pallet_data"):
+        writer.heading(current_row, "Crate/Pallet Dimensions")
+        writer.table(current_row + 3, tables["crate_pallet_data"])
+        current_row += len(tables["crate_pallet_data"]) + 6
+    if _non_empty(tables, "crate_pallet_calculations"):
+        writer.heading(current_row, "Crate/Pallet Cost Calculations")
+        writer.table(current_row + 3, tables["crate_pallet_calculations"])
+
+    # Special Comments under Secondary Packing, never on top of a longer crate/pallet table
+    comments_start_row_sec = max(current_row + sec_calc_rows + 5, writer.next_row + 1)
+    writer.heading(comments_start_row_sec, "Special Comments under Secondary Packing")
+    eco_friendly_secondary = selections.get("eco_friendly_secondary", "Mac foam")
+    if selections.get("finish_secondary", "Mill Finish") in ["PC", "WF", "Anodised"]:
+        protective_tape_comment = "Protective tape required to avoid rejects"
+    else:
+        protective_tape_comment = "Protective tape is not mandatory"
+    comment_lines = [
+        "**Packing Method Note:**",
+        "",
+        "1. Costing is done according to Secondary packing.",
+        "",
+        f'2. The interleaving material is **"{eco_friendly_secondary}"**.',
+        "",
+        f"3. {protective_tape_comment}",
+        "",
+        "4. Costing is inclusive of secondary packing - pallet or crate, however it is not inclusive of any "
+        "labels or artwork. These will incur an additional charge."
+    ]
+    for offset, line in enumerate(comment_lines, start=2):
+        writer.text(comments_start_row_sec + offset, line)
+
+
+def build_excel_report(tables, selections):
+    """Build the complete Excel report and return it as bytes.
+
+    ``tables`` maps session table names (``primary_calculations``,
+    ``secondary_sku_data``, ...) to DataFrames and ``selections`` holds the
+    packing selections (``finish_primary``, ``eco_friendly_secondary``, ...).
+    A sheet is only written when its calculations table is non-empty.
+    """
+    workbook = Workbook(write_only=True)
+    for style in _named_styles():
+        workbook.add_named_style(style)
+
+    if _non_empty(tables, "primary_calculations"):
+        _write_primary_sheet(ReportSheetWriter(workbook, 'Primary Calculations'), tables, selections)
+    if _non_empty(tables, "secondary_calculations"):
+        _write_secondary_sheet(ReportSheetWriter(workbook, 'Secondary Calculations'), tables, selections)
+    if not workbook.worksheets:
+        # A workbook needs at least one sheet
+        workbook.create_sheet('Report')
+
+    output = BytesIO()
+    workbook.save(output)
+    return output.getvalue()
+
+
+def report_fingerprint(tables, selections):
+    """Content hash of everything the report serializes"""
+    return (
+        tuple((name, frame_fingerprint(tables[name])) for name in sorted(tables)),
+        tuple(sorted((name, str(value)) for name, value in selections.items()))
+    )
+
+
+def submit_excel_report(tables, selections):
+    """Start building the report on a background thread and return a future of its bytes.
+
+    Futures are cached by ``report_fingerprint``, so submitting unchanged
+    tables returns the running or finished build instead of starting another.
+    A failed build is dropped from the cache, so the next submit retries it.
+    The tables are copied first, later edits to the session frames do not
+    leak into a build that is already running.
+    """
+    def submit():
+        snapshot = {name: df.copy() for name, df in tables.items() if df is not None}
+        return _report_executor.submit(build_excel_report, snapshot, dict(selections))
+
+    key = report_fingerprint(tables, selections)
+    future = _report_cache.get_or_build(key, submit)
+
+    def evict_failed(done):
+        if done.cancelled() or done.exception() is not None:
+            _report_cache.discard(key, done)
+
+    # Runs right away when the build already finished
+    future.add_done_callback(evict_failed)
+    return future
@@ -0,0 +1,143 @@
+"""Crate and pallet load planner.
+
+Load units (boxes or bundles, or bare profiles where a SKU has neither) lie
+with their length along the crate/pallet length. The crate/pallet
+cross-section is filled with the best two-block layout of the unit
+cross-section, so units may be turned by 90° in part of the load, and every
+count is a whole number of units. Loads without a length (pallets entered
+as a footprint only) are not limited along the length and hold one layer.
+
+``size_loads`` works the other way round and proposes the smallest
+crate/pallet cross-section holding a required number of units.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+from box_layout import best_cross_section, describe_layout, _fit
+
+# Units planned at once
+LOAD_BLOCK_SIZE = 4096
+
+
+@dataclass(frozen=True)
+class LoadSizingLimits:
+    """Target load of a proposed crate/pallet and its largest cross-section (mm, kg)"""
+    target_profiles: int = 100
+    max_weight: float = 1000.0
+    max_width: float = 1200.0
+    max_height: float = 1000.0
+
+
+def plan_loads(load_width, load_height, load_length, unit_width, unit_height, unit_length, profiles_per_unit=1):
+    """Units and profiles per crate/pallet with the layout that achieves them.
+
+    Returns ``(units_per_load, profiles_per_load, utilisation, layout)``:
+    integer counts, the share of the load volume (or of the cross-section,
+    for loads without a length) filled by the units, and a readable layout.
+    Loads or units with missing or non-positive dimensions get 0 units.
+    """
+    load_width, load_height, load_length = (np.asarray(value, dtype=float) for value in (load_width, load_height, load_length))
+    unit_width, unit_height, unit_length = (np.asarray(value, dtype=float) for value in (unit_width, unit_height, unit_length))
+    profiles_per_unit = np.broadcast_to(np.asarray(profiles_per_unit, dtype=float), load_width.shape)
+
+    count = len(load_width)
+    units_per_load = np.zeros(count, dtype=int)
+    utilisation = np.zeros(count)
+    layout = np.full(count, "", dtype=object)
+
+    for start in range(0, count, LOAD_BLOCK_SIZE):
+        rows = slice(start, start + LOAD_BLOCK_SIZE)
+        width, height, length = load_width[rows], load_height[rows], load_length[rows]
+        a, b, unit_l = unit_width[rows], unit_height[rows], unit_length[rows]
+
+        cross_count, vertical, blocks = best_cross_section(np.nan_to_num(width), np.nan_to_num(height), a, b)
+        # Lengthless loads hold a single layer, otherwise whole units along the length
+        has_length = length > 0
+        along = np.where(has_length, _fit(length, unit_l), 1.0)
+        units = cross_count * along
+
+        # Filled share of the load volume, or of the cross-section for lengthless loads
+        used = units * a * b * np.where(has_length, unit_l, 1.0)
+        capacity = width * height * np.where(has_length, length, 1.0)
+        block_utilisation = np.zeros(len(units))
+        np.divide(used, capacity, out=block_utilisation, where=capacity > 0)
+        utilisation[rows] = np.nan_to_num(block_utilisation)
+        units_per_load[rows] = units.astype(int)
+        names = np.full(len(units), "W", dtype=object), np.full(len(units), "H", dtype=object)
+        layout[rows] = np.where(units > 0, describe_layout(blocks, vertical, along, *names), "")
+
+    valid = (units_per_load > 0) & np.isfinite(utilisation)
+    units_per_load = np.where(valid, units_per_load, 0)
+    profiles_per_load = (units_per_load * np.floor(np.nan_to_num(profiles_per_unit))).astype(int)
+    return units_per_load, profiles_per_load, np.where(valid, utilisation, 0.0), np.where(valid, layout, "")
+
+
+def _lexically_less(left, right):
+    """Row-wise lexicographic ``left < right`` of two key matrices"""
+    less = np.zeros(len(left), dtype=bool)
+    equal = np.ones(len(left), dtype=bool)
+    for column in range(left.shape[1]):
+        less |= equal & (left[:, column] < right[:, column])
+        equal &= left[:, column] == right[:, column]
+    return less
+
+
+def size_loads(unit_width, unit_height, unit_length, units_needed, limits=LoadSizingLimits()):
+    """Smallest crate/pallet cross-section holding ``units_needed`` units in a grid.
+
+    Every columns × rows grid (units upright or all turned by 90°) with at
+    least the needed units is tried; the one with the least area within the
+    limits wins, the squarest on ties. Where no grid within the limits holds
+    enough units, the largest grid that fits is used. Returns
+    ``(width, height, length, units_per_load)``; units that do not fit the
+    limits at all get NaN dimensions and 0 units.
+    """
+    unit_width, unit_height, unit_length = (np.asarray(value, dtype=float) for value in (unit_width, unit_height, unit_length))
+    needed = np.broadcast_to(np.maximum(np.nan_to_num(np.asarray(units_needed, dtype=float)), 1), unit_width.shape)
+    sized = np.full((len(unit_width), 4), np.nan)
+    for start in range(0, len(unit_width), LOAD_BLOCK_SIZE):
+        rows = slice(start, start + LOAD_BLOCK_SIZE)
+        sized[rows] = _size_load_block(unit_width[rows], unit_height[rows], unit_length[rows], needed[rows], limits)
+
+    fits = sized[:, 3] > 0
+    sized[~fits] = np.nan
+    return sized[:, 0], sized[:, 1], sized[:, 2], np.where(fits, np.nan_to_num(sized[:, 3]), 0).astype(int)
+
+
+def _size_load_block(unit_width, unit_height, unit_length, needed, limits):
+    """``size_loads`` for one block of units, as ``(width, height, length, units)`` rows"""
+    count = len(unit_width)
+    picked = np.arange(count)
+
+    options = []
+    for across, up in [(unit_width, unit_height), (unit_height, unit_width)]:
+        max_columns = _fit(limits.max_width, across)
+        max_rows = _fit(limits.max_height, up)
+
+        # Fewest rows for every column count, kept where the grid is within the limits; more
+        # columns than units needed only add area
+        widest = np.minimum(max_columns, needed).max(initial=0)
+        columns = np.arange(1, max(int(widest), 1) + 1)[None, :]
+        rows = np.ceil(needed[:, None] / columns)
+        usable = (columns <= max_columns[:, None]) & (rows <= max_rows[:, None])
+        area = np.where(usable, columns * across[:, None] * rows * up[:, None], np.inf)
+        least_area = area.min(axis=1)
+        squareness = np.where(area == least_area[:, None], np.abs(columns * across[:, None] - rows * up[:, None]), np.inf)
+        pick = squareness.argmin(axis=1)
+
+        # Without a grid holding every unit, the full grid within the limits
+        enough = np.isfinite(least_area)
+        grid_columns = np.where(enough, columns[0, pick], max_columns)
+        grid_rows = np.where(enough, rows[picked, pick], max_rows)
+        width, height = grid_columns * across, grid_rows * up
+        units = grid_columns * grid_rows
+        options.append((
+            np.column_stack([width, height, unit_length, units]),
+            # Most units (up to the need), then least area, then squarest
+            np.column_stack([-np.minimum(units, needed), width * height, np.abs(width - height)])
+        ))
+
+    (upright, upright_key), (turned, turned_key) = options
+    use_turned = _lexically_less(np.nan_to_num(turned_key, nan=np.inf), np.nan_to_num(upright_key, nan=np.inf))
+    return np.where(use_turned[:, None], turned, upright)
@@ -1,6 +1,17 @@
 #for lasting 6-------------
 import streamlit as st
 import pandas as pd
+import numpy as np
+from datetime import date
+
+from costing_engine import (
+    calculate_hidden_costs, calculate_bundle_costs, recalculate_bundle_costs, bundling_table,
+    index_by_sku, calculate_final_packing_costs, recalculate_final_packing_costs
+)
+from bundle_optimizer import BundleLimits, optimize_bundles
+from reference_pricing import compile_packing_app_pricing
+from csv_report import write_sectioned_csv
+from price_store import get_price_store
 
 # Page setup
 st.set_page_config(layout="wide", page_title="🎯💰 Packing Costing App", page_icon="🎯💰")
@@ -26,6 +37,25 @@ if "save_clicked" not in st.session_state:
     st.session_state.save_clicked = False
 
 
+# Reference tables saved by an admin, latest version in effect today; the defaults below fill the rest
+PRICE_STORE_APP = "packing_app"
+REFERENCE_TABLES = [
+    "interleaving_df", "polybag_ref", "cardboard_ref", "stretchwrap_ref",
+    "crate_cost_df", "pallet_cost_df", "strapping_cost_df"
+]
+price_store = get_price_store()
+
+# Sessions share one copy of the tables and reload on their next run after any session saves or the date changes
+try:
+    prices_version = (price_store.version(), date.today())
+    if st.session_state.get("reference_prices_version") != prices_version:
+        for table_name, df in price_store.load_tables(PRICE_STORE_APP).items():
+            if table_name in REFERENCE_TABLES:
+                st.session_state[table_name] = df
+        st.session_state.reference_prices_version = prices_version
+except Exception as e:
+    st.warning(f"Saved reference prices could not be loaded: {str(e)}")
+
 # Initialize session state for tables if not exists
 if "interleaving_df" not in st.session_state:
     st.session_state.interleaving_df = pd.DataFrame({
@@ -74,32 +104,43 @@ if "strapping_cost_df" not in st.session_state:
         "Cost (LKR/m)": [15.0]
     })
 
+#----------------Compiled reference pricing-------------------------
+# Per-unit rates are cached by table content, so they are only rebuilt after an admin edits a table
+pricing = compile_packing_app_pricing(
+    st.session_state.interleaving_df,
+    st.session_state.polybag_ref,
+    st.session_state.cardboard_ref,
+    st.session_state.stretchwrap_ref,
+    st.session_state.crate_cost_df,
+    st.session_state.pallet_cost_df,
+    st.session_state.strapping_cost_df
+)
+
 #----------------Interleaving-------------------------
 # Get the current interleaving dataframe
 interleaving_df = st.session_state.interleaving_df
-material_cost_lookup = dict(zip(interleaving_df["Material"], interleaving_df["Cost per m² (LKR)"]))
+material_cost_lookup = dict(pricing.material_costs)
 
 #------------------Polybag-------------------------
 # Get the current polybag reference
 polybag_ref = st.session_state.polybag_ref
-ref_polybag_length = float(polybag_ref["Polybag Size"].iloc[0].split()[0]) * 25.4  # Convert inches to mm
-polybag_cost_per_m = float(polybag_ref["Cost per m (LKR/m)"].iloc[0])
-polybag_size_m = ref_polybag_length / 1000  # Convert mm to m
+polybag_cost_per_m = pricing.polybag_cost_per_m
+polybag_size_m = pricing.polybag_size_m
 
 #-------------------------------Carboard Box------------------------
 # Get the current cardboard reference
 cardboard_ref = st.session_state.cardboard_ref
-ref_width = float(cardboard_ref["Width(mm)"].iloc[0])
-ref_height = float(cardboard_ref["Height(mm)"].iloc[0])
-ref_length = float(cardboard_ref["Length(mm)"].iloc[0])
-ref_cost = float(cardboard_ref["Cost(LKR)"].iloc[0])
-ref_volume = ref_width * ref_height * ref_length
+ref_width = pricing.box_width
+ref_height = pricing.box_height
+ref_length = pricing.box_length
+ref_cost = pricing.box_cost
+ref_volume = pricing.box_volume
 
 #---------------------------Stretchwrap------------------------------
 # Get the current stretchwrap reference
 stretchwrap_ref = st.session_state.stretchwrap_ref
-ref_stretch_area = float(stretchwrap_ref["Area(mm²)"].iloc[0])
-ref_stretch_cost = float(stretchwrap_ref["Cost(Rs/mm²)"].iloc[0])
+ref_stretch_area = pricing.stretch_area
+ref_stretch_cost = pricing.stretch_cost
 
 #----------------------Crate or Pallet Cost reference table---------------------------
 # Get the current crate and pallet references
@@ -145,68 +186,45 @@ protective_tape_customer_specified = st.selectbox("Protective Tape - Customer Sp
 packing_method = st.selectbox("Packing Method", ["Primary", "Secondary"], key="packing_option")
 
 # --------- Calculation Logic Hidden Table ------------
-def calculate_hidden(row):
-    W = float(row["W (mm)"])
-    H = float(row["H (mm)"])
-    L = float(row["L (mm)"])
-    
-    # Calculate surface area in m²
-    surface_area = (2 * ((W * L) + (H * L) + (W * H))) / 1_000_000
-    
-    # Interleaving cost calculation
-    if interleaving_required == "Yes":
-        interleaving_material = eco_friendly
-        interleaving_cost = material_cost_lookup.get(interleaving_material, 0.0)
-        interleaving_total_cost = surface_area * interleaving_cost
-        message = "Okay"
-    else:
-        interleaving_material = "None"
-        interleaving_total_cost = 0.0
-        message = "No interleaving required"
-    
-    # Protective tape calculation
-    protective_tape_advice = "Not necessary."
-    protective_tape_cost = 0.0
-    
-    # Always calculate protective tape if finish is anodized or fabricated
-    if (finish == "Anodized") or (row["Fabricated"] == "Fabricated"):
-        protective_tape_advice = "Protective tape required to avoid rejects"
-        protective_tape_cost = surface_area * material_cost_lookup.get("Protective Tape", 100.65)
-    elif protective_tape_customer_specified == "Yes":
-        protective_tape_advice = "Protective tape required to avoid rejects"
-        protective_tape_cost = surface_area * material_cost_lookup.get("Protective Tape", 100.65)
-    
-    # Calculate packaging cost (polybag or cardboard box)
-    user_volume = W * H * L
-    if L > 550:  # Use polybag
-        # Calculate polybag cost proportionally
-        polybag_cost = (polybag_cost_per_m * (L / 1000)) / 1  # Divided by 1 profile (for primary packing)
-        cardboard_cost = 0.0
-        packaging_type = "Polybag"
-    else:  # Use cardboard box
-        cardboard_cost = (user_volume / ref_volume) * ref_cost if ref_volume else 0.0
-        polybag_cost = 0.0
-        packaging_type = "Cardboard Box"
-    
-    total = interleaving_total_cost + protective_tape_cost + max(cardboard_cost, polybag_cost)
-    
-    return pd.Series({
-        "SKU": row["SKU No."],
-        "Interleaving Cost (Rs)": f"{interleaving_total_cost:.2f}",
-        "Protective Tape Cost (Rs)": f"{protective_tape_cost:.2f}",
-        "Packaging Type": packaging_type,
-        "Packaging Cost (Rs)": f"{max(cardboard_cost, polybag_cost):.2f}",
-        "Total Cost (Rs)": f"{total:.2f}",
-        "Interleaving Material": interleaving_material,
-        "Check": message,
-        "Protective Tape Advice": protective_tape_advice
-    })
-
 if not edited_data.empty:
-    hidden_output = edited_data.apply(calculate_hidden, axis=1)
+    hidden_output = calculate_hidden_costs(
+        edited_data,
+        pricing,
+        finish,
+        interleaving_required,
+        eco_friendly,
+        protective_tape_customer_specified
+    )
 else:
     hidden_output = pd.DataFrame()
 
+# Display format for numeric cost columns
+cost_column_config = {
+    column: st.column_config.NumberColumn(column, format="%.2f")
+    for column in ["Interleaving Cost (Rs)", "Protective Tape Cost (Rs)", "Packaging Cost (Rs)", "Total Cost (Rs)"]
+}
+
+secondary_cost_column_config = {
+    column: st.column_config.NumberColumn(column, format="%.2f")
+    for column in [
+        "Bundle Width (mm)", "Bundle Height (mm)", "Bundle Length (mm)", "Packaging Cost (Rs/prof)",
+        "McFoam Cost (Rs/prof)", "Stretchwrap Cost (Rs/prof)", "Craft Paper Cost (Rs/prof)",
+        "Protective Tape Cost (Rs/prof)", "Total Cost (Rs/prof)"
+    ]
+}
+
+final_cost_column_config = {
+    "Boxes per Pallet/Crate": st.column_config.NumberColumn("Boxes per Pallet/Crate", format="%d"),
+    "Profiles per Pallet/Crate": st.column_config.NumberColumn("Profiles per Pallet/Crate", format="%d"),
+    **{
+        column: st.column_config.NumberColumn(column, format="%.2f")
+        for column in [
+            "Width (mm)", "Height (mm)", "Length (mm)", "Load Utilisation (%)", "Packing Cost (LKR)", "Packing Cost per Profile (LKR)",
+            "Strapping Clips", "Strapping Cost (LKR)", "Strapping Cost per Profile (LKR)", "Total Cost per Profile (LKR)"
+        ]
+    }
+}
+
 # ----------- Primary Costing Table -------------------
 if packing_method == "Primary":
     st.subheader("💼 Primary Packing Total Cost")
@@ -219,7 +237,7 @@ if packing_method == "Primary":
             "Packaging Cost (Rs)",
             "Total Cost (Rs)"
         ]]
-        st.dataframe(primary_output, use_container_width=True)
+        st.dataframe(primary_output, column_config=cost_column_config, use_container_width=True)
     else:
         st.warning("No data to display. Please add SKU information.")
 
@@ -250,17 +268,39 @@ if packing_method == "Secondary":
     # Bundle input method selection
     bundle_input_method = st.radio("Bundle Input Method:", ["Number of layers", "Size of the bundle"])
     
+    # Bundling is set per SKU; SKUs without a stored row start with the defaults
+    if "bundling_per_sku" not in st.session_state:
+        st.session_state.bundling_per_sku = pd.DataFrame(columns=["SKU No."])
+    
     if bundle_input_method == "Number of layers":
-        bundling_data = pd.DataFrame({
-            "Rows": [1],
-            "Layers": [1],
-            "Width Type": ["W/mm"],
-            "Height Type": ["H/mm"]
-        })
+        with st.expander("⚙️ Optimize rows × layers"):
+            st.caption("Picks the rows and layers of every SKU's bundle with the lowest secondary cost per profile within these limits.")
+            limit_cols = st.columns(3)
+            with limit_cols[0]:
+                max_bundle_width = st.number_input("Max bundle width (mm)", min_value=1.0, value=300.0, step=10.0)
+            with limit_cols[1]:
+                max_bundle_height = st.number_input("Max bundle height (mm)", min_value=1.0, value=300.0, step=10.0)
+            with limit_cols[2]:
+                max_bundle_profiles = st.number_input("Max profiles per bundle", min_value=1, value=50, step=1)
+            if st.button("⚙️ Optimize Bundles", use_container_width=True) and not edited_data.empty:
+                optimized = optimize_bundles(
+                    edited_data, pricing, finish, interleaving_required, eco_friendly,
+                    protective_tape_customer_specified,
+                    BundleLimits(max_bundle_width, max_bundle_height, int(max_bundle_profiles))
+                )
+                st.session_state.bundling_per_sku = bundling_table(
+                    edited_data, pd.concat([st.session_state.bundling_per_sku, optimized], ignore_index=True),
+                    ["Rows", "Layers", "Width Type", "Height Type", "Bundle Width (mm)", "Bundle Height (mm)"]
+                )
+        
+        bundling_data = bundling_table(
+            edited_data, st.session_state.bundling_per_sku, ["Rows", "Layers", "Width Type", "Height Type"]
+        )
 
         bundling_common = st.data_editor(
             bundling_data,
             column_config={
+                "SKU No.": st.column_config.TextColumn("SKU No.", disabled=True),
                 "Rows": st.column_config.NumberColumn("Number of Rows", min_value=1, step=1),
                 "Layers": st.column_config.NumberColumn("Number of Layers", min_value=1, step=1),
                 "Width Type": st.column_config.SelectboxColumn("Width Profile Type", options=["W/mm", "H/mm"]),
@@ -270,14 +310,14 @@ if packing_method == "Secondary":
             key="bundling_common_input"
         )
     else:  # Size of the bundle - Only ask for width and height
-        bundling_data = pd.DataFrame({
-            "Bundle Width (mm)": [0],
-            "Bundle Height (mm)": [0]
-        })
+        bundling_data = bundling_table(
+            edited_data, st.session_state.bundling_per_sku, ["Bundle Width (mm)", "Bundle Height (mm)"]
+        )
 
         bundling_common = st.data_editor(
             bundling_data,
             column_config={
+                "SKU No.": st.column_config.TextColumn("SKU No.", disabled=True),
                 "Bundle Width (mm)": st.column_config.NumberColumn("Bundle Width (mm)", min_value=0),
                 "Bundle Height (mm)": st.column_config.NumberColumn("Bundle Height (mm)", min_value=0)
             },
@@ -285,110 +325,34 @@ if packing_method == "Secondary":
             key="bundling_size_input"
         )
 
-    bundle_output_rows = []
-    for _, data_row in edited_data.iterrows():
-        W = float(data_row["W (mm)"])
-        H = float(data_row["H (mm)"])
-        L = float(data_row["L (mm)"])  # Profile length will be used as bundle length
-        
-        if bundle_input_method == "Number of layers":
-            rows = int(bundling_common.loc[0, "Rows"])
-            layers = int(bundling_common.loc[0, "Layers"])
-            width_type = bundling_common.loc[0, "Width Type"]
-            height_type = bundling_common.loc[0, "Height Type"]
-            
-            profile_dimensions = {
-                "W/mm": W,
-                "H/mm": H
-            }
-            
-            bundle_width = rows * profile_dimensions[width_type]
-            bundle_height = layers * profile_dimensions[height_type]
-            bundle_length = L  # Use profile length
-            profiles_per_bundle = rows * layers
-        else:  # Size of the bundle
-            bundle_width = float(bundling_common.loc[0, "Bundle Width (mm)"])
-            bundle_height = float(bundling_common.loc[0, "Bundle Height (mm)"])
-            bundle_length = L  # Use profile length as bundle length
-            
-            # Calculate maximum profiles that can fit in the bundle
-            rows_width = int(bundle_width / W) if W > 0 else 0
-            rows_height = int(bundle_height / H) if H > 0 else 0
-            profiles_per_bundle = rows_width * rows_height if rows_width > 0 and rows_height > 0 else 1
-        
-        # Calculate bundle surface area in m²
-        bundle_area_m2 = 2 * ((bundle_width * bundle_length) + (bundle_height * bundle_length) + (bundle_width * bundle_height)) / 1_000_000
-        
-        # Packaging cost calculation
-        # Packaging cost calculation - store original calculation for reference
-        if L > 550:  # Use polybag
-            # New polybag cost formula
-            polybag_cost = (polybag_cost_per_m * (L / 1000)) / (profiles_per_bundle)
-            original_packaging_cost = polybag_cost
-            original_packaging_type = "Polybag"
-        else:  # Use cardboard box
-            user_volume = bundle_width * bundle_height * bundle_length
-            original_packaging_cost = ((user_volume / ref_volume) * ref_cost) / profiles_per_bundle if ref_volume else 0.0
-            original_packaging_type = "Cardboard Box"
-        
-        # Store original values for reference
-        packaging_cost = original_packaging_cost
-        packaging_type = original_packaging_type
-
-        # Initialize cost data - all costs will be per profile
-        bundle_cost_data = {
-            "SKU": data_row["SKU No."],
-            "Bundle Width (mm)": f"{bundle_width:.2f}",
-            "Bundle Height (mm)": f"{bundle_height:.2f}",
-            "Bundle Length (mm)": f"{bundle_length:.2f}",
-            "Profiles per Bundle": profiles_per_bundle,
-            "Packaging Type": packaging_type,
-            "Packaging Cost (Rs/prof)": f"{packaging_cost:.2f}",
-        }
-        
-        # Add selected eco-friendly material cost only if interleaving is required - PER PROFILE
-        if interleaving_required == "Yes":
-            if eco_friendly == "McFoam":
-                mcfoam_cost_per_m2 = material_cost_lookup.get("McFoam", 0.0)
-                McFoam_Cost = (bundle_area_m2 * mcfoam_cost_per_m2) / profiles_per_bundle
-                bundle_cost_data["McFoam Cost (Rs/prof)"] = f"{McFoam_Cost:.2f}"
-            elif eco_friendly == "Stretchwrap":
-                bundle_surface_area = 2 * ((bundle_width * bundle_length) + (bundle_height * bundle_length) + (bundle_width * bundle_height))
-                stretchwrap_cost = ((bundle_surface_area / ref_stretch_area) * ref_stretch_cost) / profiles_per_bundle if ref_stretch_area else 0.0
-                bundle_cost_data["Stretchwrap Cost (Rs/prof)"] = f"{stretchwrap_cost:.2f}"
-            elif eco_friendly == "Craft Paper":
-                craft_paper_cost_per_m2 = material_cost_lookup.get("Craft Paper", 0.0)
-                craft_paper_cost = (bundle_area_m2 * craft_paper_cost_per_m2) / profiles_per_bundle
-                bundle_cost_data["Craft Paper Cost (Rs/prof)"] = f"{craft_paper_cost:.2f}"
-        
-        # Protective tape cost (if needed) - PER PROFILE
-        profile_surface_area = 2 * ((W * L) + (H * L) + (W * H)) / 1_000_000
-        if (finish == "Anodized") or (data_row["Fabricated"] == "Fabricated") or (protective_tape_customer_specified == "Yes"):
-            protective_tape_cost = (profile_surface_area * material_cost_lookup.get("Protective Tape", 100.65)) / 1  # Already per profile
-            bundle_cost_data["Protective Tape Cost (Rs/prof)"] = f"{protective_tape_cost:.2f}"
-        
-        # Calculate total cost per profile
-        total_cost_per_profile = packaging_cost
-        if interleaving_required == "Yes":
-            if eco_friendly == "McFoam":
-                total_cost_per_profile += McFoam_Cost
-            elif eco_friendly == "Stretchwrap":
-                total_cost_per_profile += stretchwrap_cost
-            elif eco_friendly == "Craft Paper":
-                total_cost_per_profile += craft_paper_cost
-        if (finish == "Anodized") or (data_row["Fabricated"] == "Fabricated") or (protective_tape_customer_specified == "Yes"):
-            total_cost_per_profile += protective_tape_cost
-        
-        bundle_cost_data["Total Cost (Rs/prof)"] = f"{total_cost_per_profile:.2f}"
-        
-        bundle_output_rows.append(bundle_cost_data)
+    # Store the edits per SKU; the editor is rebuilt from this table whenever its source data changes
+    edited_columns = [column for column in bundling_common.columns if column != "SKU No."]
+    stored_bundling = bundling_table(
+        edited_data, st.session_state.bundling_per_sku,
+        ["Rows", "Layers", "Width Type", "Height Type", "Bundle Width (mm)", "Bundle Height (mm)"]
+    )
+    stored_bundling[edited_columns] = bundling_table(edited_data, bundling_common, edited_columns)[edited_columns]
+    st.session_state.bundling_per_sku = stored_bundling
+
+    # Bundles and their secondary packing cost per profile for all SKUs at once
+    secondary_cost_df = calculate_bundle_costs(
+        edited_data,
+        pricing,
+        bundle_input_method,
+        bundling_common,
+        finish,
+        interleaving_required,
+        eco_friendly,
+        protective_tape_customer_specified
+    ).reset_index(drop=True)
+    # SKU-indexed results shared with the final packing section; edits below replace the secondary costs
+    bundles_by_sku = index_by_sku(secondary_cost_df)
+    secondary_by_sku = bundles_by_sku
     
     # ---------------- Final Visible Secondary Packing Cost ----------------
    
     st.subheader("📦 Secondary Packing Cost (Per Profile)")
-    if bundle_output_rows:
-        secondary_cost_df = pd.DataFrame(bundle_output_rows)
-        
+    if not secondary_cost_df.empty:
         # Make Profiles per Bundle and Packaging Type editable
         editable_secondary_cost_df = st.data_editor(
             secondary_cost_df,
@@ -401,60 +365,19 @@ if packing_method == "Secondary":
                 "Packaging Type": st.column_config.SelectboxColumn(
                     "Packaging Type",
                     options=["Polybag", "Cardboard Box"]
-                )
+                ),
+                **secondary_cost_column_config
             },
             use_container_width=True,
             key="secondary_packing_editor"
         )
         
         # Recalculate packaging cost based on user edits
-        updated_output_rows = []
-        for idx, row in editable_secondary_cost_df.iterrows():
-            # Get the original bundle dimensions from bundle_output_rows
-            original_bundle_data = bundle_output_rows[idx]
-            bundle_width = float(original_bundle_data["Bundle Width (mm)"].replace(',', ''))
-            bundle_height = float(original_bundle_data["Bundle Height (mm)"].replace(',', ''))
-            bundle_length = float(original_bundle_data["Bundle Length (mm)"].replace(',', ''))
-            
-            # Get user-edited values
-            profiles_per_bundle = int(row["Profiles per Bundle"])
-            packaging_type = row["Packaging Type"]
-            
-            # Recalculate packaging cost based on user selection
-            bundle_area_m2 = 2 * ((bundle_width * bundle_length) + (bundle_height * bundle_length) + (bundle_width * bundle_height)) / 1_000_000
-            
-            if packaging_type == "Polybag":
-                packaging_cost = (polybag_cost_per_m * (L / 1000)) / ( profiles_per_bundle)
-            elif packaging_type == "Cardboard Box":
-                user_volume = bundle_width * bundle_height * bundle_length
-                packaging_cost = ((user_volume / ref_volume) * ref_cost) / profiles_per_bundle if ref_volume else 0.0
-            
-            # Update the row with recalculated values
-            updated_row = row.copy()
-            updated_row["Packaging Cost (Rs/prof)"] = f"{packaging_cost:.2f}"
-            
-            # Recalculate total cost
-            total_cost = packaging_cost
-            
-            # Add other costs if they exist in the row
-            if "McFoam Cost (Rs/prof)" in row:
-                mcfoam_cost = float(row["McFoam Cost (Rs/prof)"])
-                total_cost += mcfoam_cost
-            if "Stretchwrap Cost (Rs/prof)" in row:
-                stretchwrap_cost = float(row["Stretchwrap Cost (Rs/prof)"])
-                total_cost += stretchwrap_cost
-            if "Craft Paper Cost (Rs/prof)" in row:
-                craft_paper_cost = float(row["Craft Paper Cost (Rs/prof)"])
-                total_cost += craft_paper_cost
-            if "Protective Tape Cost (Rs/prof)" in row:
-                protective_tape_cost = float(row["Protective Tape Cost (Rs/prof)"])
-                total_cost += protective_tape_cost
-            
-            updated_row["Total Cost (Rs/prof)"] = f"{total_cost:.2f}"
-            updated_output_rows.append(updated_row)
+        updated_secondary_df = recalculate_bundle_costs(editable_secondary_cost_df, secondary_cost_df, pricing)
+        secondary_by_sku = index_by_sku(updated_secondary_df)
         
         # Display the updated dataframe
-        st.dataframe(pd.DataFrame(updated_output_rows), use_container_width=True)
+        st.dataframe(updated_secondary_df, column_config=secondary_cost_column_config, use_container_width=True)
         
     else:
         st.warning("No bundle data available")
@@ -507,99 +430,16 @@ if packing_method == "Secondary":
     )
 
     st.subheader("💰 Final Crate/Pallet Cost Summary", divider="grey")
-    packing_output_rows = []
-
-    for _, row in final_packing_selection.iterrows():
-        sku_no = row["SKU No."]
-        method = row["Final Packing Method"]
-        width = float(row["Width (mm)"])
-        height = float(row["Height (mm)"])
-        length = float(row["Length (mm)"]) if method == "Crate" else 0
-
-        if method == "Crate":
-            ref_crate = crate_cost_df.iloc[0]
-            ref_vol = float(ref_crate["Width (mm)"]) * float(ref_crate["Height (mm)"]) * float(ref_crate["Length (mm)"])
-            user_vol = width * height * length
-            cost = (user_vol / ref_vol) * float(ref_crate["Cost (LKR)"]) if ref_vol else 0.0
-
-            strapping_ref = strapping_cost_df.iloc[0]
-            length_m = length / 1000
-            num_clips = length_m / 0.5
-            strapping_cost = 2*(length_m+(float(row["Width (mm)"]/1000))) * float(strapping_ref["Cost (LKR/m)"]) * num_clips
-
-        elif method == "Pallet":
-            ref_pallet = pallet_cost_df.iloc[0]
-            ref_area = float(ref_pallet["Width (mm)"]) * float(ref_pallet["Height (mm)"])
-            user_area = width * height
-            cost = (user_area / ref_area) * float(ref_pallet["Cost (LKR)"]) if ref_area else 0.0
-            strapping_cost = 0.0
-            num_clips = 0
-            
-        # Calculate number of boxes per pallet/crate and profiles per pallet/crate
-        # Get the corresponding bundle data for this SKU
-        bundle_data = None
-        for bundle_row in bundle_output_rows:
-            if bundle_row["SKU"] == sku_no:
-                bundle_data = bundle_row
-                break
-        
-        if bundle_data:
-            box_width = float(bundle_data["Bundle Width (mm)"].replace(',', ''))
-            box_height = float(bundle_data["Bundle Height (mm)"].replace(',', ''))
-            profiles_per_bundle = int(bundle_data["Profiles per Bundle"])
-            
-            # Calculate number of boxes that can fit - WITH VALIDATION
-            if box_width > 0 and box_height > 0 and width > 0 and height > 0:
-                boxes_width_fit = width / box_width
-                boxes_height_fit = height / box_height
-                boxes_per_pallet_crate = int(boxes_width_fit) * int(boxes_height_fit)
-                boxes_per_pallet_crate = max(1, boxes_per_pallet_crate)  # At least 1 box
-            else:
-                boxes_per_pallet_crate = 1  # Default to 1 if dimensions are invalid
-            
-            # Calculate total profiles per pallet/crate
-            profiles_per_pallet_crate = boxes_per_pallet_crate * profiles_per_bundle
-            
-            # Calculate costs per profile
-            packing_cost_per_profile = cost / profiles_per_pallet_crate if profiles_per_pallet_crate else 0.0
-            strapping_cost_per_profile = strapping_cost / profiles_per_pallet_crate if profiles_per_pallet_crate else 0.0
-        
-        else:
-            boxes_per_pallet_crate = 0
-            profiles_per_pallet_crate = 0
-            packing_cost_per_profile = 0.0
-            strapping_cost_per_profile = 0.0
-
-        # Get the secondary packing cost from the UPDATED table
-        secondary_cost = 0.0
-        for idx, updated_row in enumerate(updated_output_rows):
-            if updated_row["SKU"] == sku_no:
-                secondary_cost = float(updated_row["Total Cost (Rs/prof)"])
-                break
-
-        packing_output_rows.append({
-            "SKU No.": sku_no,
-            "Method": method,
-            "Width (mm)": f"{width:.2f}",
-            "Height (mm)": f"{height:.2f}",
-            "Length (mm)": f"{length:.2f}" if method == "Crate" else "-",
-            "Boxes per Pallet/Crate": f"{boxes_per_pallet_crate:.0f}",
-            "Profiles per Pallet/Crate": f"{profiles_per_pallet_crate:.0f}",
-            "Packing Cost (LKR)": f"{cost:.2f}",
-            "Packing Cost per Profile (LKR)": f"{packing_cost_per_profile:.2f}",
-            "Strapping Clips": f"{num_clips:.2f}" if method == "Crate" else "-",
-            "Strapping Cost (LKR)": f"{strapping_cost:.2f}" if method == "Crate" else "-",
-            "Strapping Cost per Profile (LKR)": f"{strapping_cost_per_profile:.2f}" if method == "Crate" else "-",
-            "Total Cost per Profile (LKR)": f"{packing_cost_per_profile + strapping_cost_per_profile + secondary_cost:.2f}"
-        })
+    # Bundles and secondary costs are joined by SKU from the indexed result tables
+    final_packing_df = calculate_final_packing_costs(final_packing_selection, bundles_by_sku, secondary_by_sku, pricing)
 
-    if packing_output_rows:
-        final_packing_df = pd.DataFrame(packing_output_rows)
+    if not final_packing_df.empty:
         
         # Make Profiles per Pallet/Crate editable
         editable_final_packing_df = st.data_editor(
             final_packing_df,
             column_config={
+                **final_cost_column_config,
                 "Profiles per Pallet/Crate": st.column_config.NumberColumn(
                     "Profiles per Pallet/Crate",
                     min_value=1,
@@ -611,39 +451,8 @@ if packing_method == "Secondary":
         )
         
         # Recalculate costs based on user edits
-        updated_final_rows = []
-        for idx, row in editable_final_packing_df.iterrows():
-            # Get original values from packing_output_rows
-            original_row = packing_output_rows[idx]
-            packing_cost = float(original_row["Packing Cost (LKR)"])
-            strapping_cost = float(original_row["Strapping Cost (LKR)"]) if original_row["Strapping Cost (LKR)"] != "-" else 0.0
-            secondary_cost = float(original_row["Total Cost per Profile (LKR)"]) - (float(original_row["Packing Cost per Profile (LKR)"]) + (float(original_row["Strapping Cost per Profile (LKR)"]) if original_row["Strapping Cost per Profile (LKR)"] != "-" else 0.0))
-            
-            # Get user-edited values
-            profiles_per_pallet_crate = int(row["Profiles per Pallet/Crate"])
-            
-            # Recalculate costs per profile
-            packing_cost_per_profile = packing_cost / profiles_per_pallet_crate if profiles_per_pallet_crate else 0.0
-            strapping_cost_per_profile = strapping_cost / profiles_per_pallet_crate if profiles_per_pallet_crate else 0.0
-            
-            # Update the row with recalculated values
-            updated_row = row.copy()
-            updated_row["Packing Cost per Profile (LKR)"] = f"{packing_cost_per_profile:.2f}"
-            updated_row["Strapping Cost per Profile (LKR)"] = f"{strapping_cost_per_profile:.2f}" if row["Method"] == "Crate" else "-"
-            
-            # Get the UPDATED secondary cost for this SKU
-            updated_secondary_cost = 0.0
-            for updated_secondary_row in updated_output_rows:
-                if updated_secondary_row["SKU"] == row["SKU No."]:
-                    updated_secondary_cost = float(updated_secondary_row["Total Cost (Rs/prof)"])
-                    break
-            
-            total_cost = packing_cost_per_profile + strapping_cost_per_profile + updated_secondary_cost
-            updated_row["Total Cost per Profile (LKR)"] = f"{int(total_cost * 100) / 100:.2f}"            
-            updated_final_rows.append(updated_row)
-        
-        # Display the updated dataframe
-        st.dataframe(pd.DataFrame(updated_final_rows), use_container_width=True)
+        updated_final_df = recalculate_final_packing_costs(editable_final_packing_df, final_packing_df, secondary_by_sku)
+        st.dataframe(updated_final_df, column_config=final_cost_column_config, use_container_width=True)
     else:
         st.warning("No packing method selected or data available")
 
@@ -652,40 +461,28 @@ if packing_method == "Secondary":
 # ----------------- Data Download --------------------
 st.subheader("📥 Download Results", divider="grey")
 
+compress_report = st.checkbox("Compress report (gzip)", help="Smaller download for large quotes")
+
 if st.button("📊 Download Complete Report", use_container_width=True):
     try:
-        # Create a comprehensive CSV with all sections
+        # Sections of the comprehensive CSV as (title, table, to_csv options)
         sections = []
         
         # 1. Secondary Packing Cost (Per Profile) Table - Use UPDATED table
-        if packing_method == "Secondary" and 'updated_output_rows' in locals() and updated_output_rows:
-            sections.append("SECONDARY PACKING COST (PER PROFILE)")
-            secondary_df = pd.DataFrame(updated_output_rows)
-            sections.append(secondary_df.to_csv(index=False))
-            sections.append("")  # Empty line for separation
-        elif packing_method == "Secondary" and bundle_output_rows:
-            sections.append("SECONDARY PACKING COST (PER PROFILE)")
-            secondary_df = pd.DataFrame(bundle_output_rows)
-            sections.append(secondary_df.to_csv(index=False))
-            sections.append("")  # Empty line for separation
+        if packing_method == "Secondary" and 'updated_secondary_df' in locals() and not updated_secondary_df.empty:
+            sections.append(("SECONDARY PACKING COST (PER PROFILE)", updated_secondary_df, {"float_format": "%.2f"}))
+        elif packing_method == "Secondary" and not secondary_cost_df.empty:
+            sections.append(("SECONDARY PACKING COST (PER PROFILE)", secondary_cost_df, {"float_format": "%.2f"}))
         
         # 2. Final Crate/Pallet Cost Summary Table - Use UPDATED table
-        if packing_method == "Secondary" and 'updated_final_rows' in locals() and updated_final_rows:
-            sections.append("FINAL CRATE/PALLET COST SUMMARY")
-            final_df = pd.DataFrame(updated_final_rows)
-            sections.append(final_df.to_csv(index=False))
-            sections.append("")  # Empty line for separation
-        elif packing_method == "Secondary" and packing_output_rows:
-            sections.append("FINAL CRATE/PALLET COST SUMMARY")
-            final_df = pd.DataFrame(packing_output_rows)
-            sections.append(final_df.to_csv(index=False))
-            sections.append("")  # Empty line for separation
+        if packing_method == "Secondary" and 'updated_final_df' in locals() and not updated_final_df.empty:
+            sections.append(("FINAL CRATE/PALLET COST SUMMARY", updated_final_df, {"float_format": "%.2f", "na_rep": "-"}))
+        elif packing_method == "Secondary" and not final_packing_df.empty:
+            sections.append(("FINAL CRATE/PALLET COST SUMMARY", final_packing_df, {"float_format": "%.2f", "na_rep": "-"}))
             
         
         # 3. Special Comments Section
         if packing_method == "Secondary":
-            sections.append("SPECIAL COMMENTS")
-            
             # Create comments data
             comments_data = []
             
@@ -708,19 +505,18 @@ if st.button("📊 Download Complete Report", use_container_width=True):
             comments_data.append(["Additional Note", 
                                 "Costing is inclusive of secondary packing - pallet or crate, however it is not inclusive of any labels artwork these will incur an additional charge."])
             
-            # Convert comments to DataFrame and then to CSV
             comments_df = pd.DataFrame(comments_data, columns=["Category", "Comment"])
-            sections.append(comments_df.to_csv(index=False))
+            sections.append(("SPECIAL COMMENTS", comments_df, {}))
         
-        # Combine all sections
+        # Write all sections in one pass
         if sections:
-            complete_csv = "\n".join(sections)
+            complete_csv = write_sectioned_csv(sections, compress=compress_report)
             
             st.download_button(
                 label="⬇️ Download Complete Report (CSV)",
                 data=complete_csv,
-                file_name="packing_costing_complete_report.csv",
-                mime="text/csv",
+                file_name="packing_costing_complete_report.csv" + (".gz" if compress_report else ""),
+                mime="application/gzip" if compress_report else "text/csv",
                 use_container_width=True
             )
             
@@ -728,9 +524,9 @@ if st.button("📊 Download Complete Report", use_container_width=True):
             
             # Show preview of what's included
             st.info("📋 Report includes:")
-            if packing_method == "Secondary" and bundle_output_rows:
+            if packing_method == "Secondary" and not secondary_cost_df.empty:
                 st.write("• Secondary Packing Cost (Per Profile) Table")
-            if packing_method == "Secondary" and packing_output_rows:
+            if packing_method == "Secondary" and not final_packing_df.empty:
                 st.write("• Final Crate/Pallet Cost Summary Table")
             if packing_method == "Secondary":
                 st.write("• Special Comments Section")
@@ -756,6 +552,7 @@ with col1:
             st.warning("Read-only mode. Enter correct password to unlock tables.")
 with col2:
     if st.session_state.edit_mode:
+        effective_from = st.date_input("Prices effective from:", key="prices_effective_from")
         if st.button("💾 Save All Tables", use_container_width=True):
             try:
                 # Update session state with edited tables
@@ -865,6 +662,12 @@ with col2:
                         error_messages.append(f"Strapping table error: {str(e)}")
                 
                 if success:
+                    # Persist the tables as a new price version
+                    price_store.save_tables(
+                        PRICE_STORE_APP,
+                        {table_name: st.session_state[table_name] for table_name in REFERENCE_TABLES},
+                        effective_from=effective_from
+                    )
                     st.session_state.edit_mode = False
                     st.session_state.save_clicked = True
                     st.success("✅ All reference tables saved successfully!")
@@ -875,6 +678,10 @@ with col2:
                 st.error(f"Error saving tables: {str(e)}")
                 st.info("Try resetting the tables or check the column names.")
 
+if st.session_state.edit_mode:
+    with st.expander("🕓 Saved price versions"):
+        st.dataframe(price_store.history(PRICE_STORE_APP), use_container_width=True)
+
 #----------------------------------------Final tabs-----------------------------------------------
 
 tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs([
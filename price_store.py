@@ -0,0 +1,158 @@
+"""Persistent reference price store.
+
+Reference tables (material, box, polybag, crate, pallet, strapping ... costs)
+are saved to a local SQLite database as versions with an effective date. A
+session starts from the latest version of every table that is already in
+effect, instead of the defaults hard-coded in the apps.
+
+Loaded tables are cached once per process, per app and date, and every
+session holds the same DataFrames instead of its own copies. The store
+version is the id of the newest saved row, so it changes on every save, also
+from another server process. Sessions compare it with the version they
+loaded and reload lazily on their next run; a changed version also clears
+the cache.
+"""
+import json
+import os
+import sqlite3
+import threading
+from contextlib import closing
+from datetime import date, datetime
+
+import pandas as pd
+
+# Database file, configurable per deployment
+DEFAULT_DB_PATH = os.environ.get("PACKING_PRICE_DB", "reference_prices.sqlite3")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS price_tables (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    app TEXT NOT NULL,
+    table_name TEXT NOT NULL,
+    effective_from TEXT NOT NULL,
+    saved_at TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS price_tables_lookup ON price_tables (app, table_name, effective_from, id);
+"""
+
+# Latest version in effect of every table of an app
+_LATEST_VERSIONS = """
+SELECT table_name, data FROM price_tables AS version
+WHERE app = ? AND id = (
+    SELECT id FROM price_tables AS newer
+    WHERE newer.app = version.app AND newer.table_name = version.table_name AND newer.effective_from <= ?
+    ORDER BY newer.effective_from DESC, newer.id DESC
+    LIMIT 1
+)
+"""
+
+
+def _serialize(df):
+    """A table as JSON: column names and rows, missing values as null"""
+    values = df.astype(object).where(df.notna(), None)
+    return json.dumps({"columns": [str(column) for column in df.columns], "data": values.values.tolist()}, default=str)
+
+
+def _deserialize(data):
+    table = json.loads(data)
+    return pd.DataFrame(table["data"], columns=table["columns"])
+
+
+class PriceStore:
+    """Effective-dated reference table versions in one SQLite file"""
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = str(path)
+        self._cache = {}
+        self._version = 0
+        self._lock = threading.Lock()
+        with closing(self._connect()) as connection:
+            connection.executescript(_SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def version(self):
+        """Id of the newest saved version, 0 for an empty store; clears the cache when it changed"""
+        with closing(self._connect()) as connection:
+            latest = connection.execute("SELECT COALESCE(MAX(id), 0) FROM price_tables").fetchone()[0]
+        with self._lock:
+            if latest != self._version:
+                self._cache.clear()
+                self._version = latest
+        return latest
+
+    def load_tables(self, app, as_of=None):
+        """Latest version in effect on ``as_of`` (default today) of every saved table of ``app``.
+
+        Returns a dict of table name to DataFrame; tables never saved are
+        missing. The frames are shared by every caller and must not be
+        modified in place; replace them instead.
+        """
+        as_of = (as_of or date.today()).isoformat()
+        key = (app, as_of)
+        self.version()
+        with self._lock:
+            tables = self._cache.get(key)
+        if tables is None:
+            with closing(self._connect()) as connection:
+                rows = connection.execute(_LATEST_VERSIONS, (app, as_of)).fetchall()
+            tables = {table_name: _deserialize(data) for table_name, data in rows}
+            with self._lock:
+                self._cache[key] = tables
+        return dict(tables)
+
+    def save_tables(self, app, tables, effective_from=None):
+        """Save ``tables`` (name to DataFrame) as new versions effective from ``effective_from``.
+
+        Tables equal to their latest saved version with the same effective
+        date are skipped. Returns the names of the tables that were saved.
+        """
+        effective_from = (effective_from or date.today()).isoformat()
+        saved_at = datetime.now().isoformat(timespec="seconds")
+        saved = []
+        with closing(self._connect()) as connection, connection:
+            for table_name, df in tables.items():
+                data = _serialize(df)
+                latest = connection.execute(
+                    "SELECT data FROM price_tables WHERE app = ? AND table_name = ? AND effective_from = ? "
+                    "ORDER BY id DESC LIMIT 1",
+                    (app, table_name, effective_from)
+                ).fetchone()
+                if latest is not None and latest[0] == data:
+                    continue
+                connection.execute(
+                    "INSERT INTO price_tables (app, table_name, effective_from, saved_at, data) VALUES (?, ?, ?, ?, ?)",
+                    (app, table_name, effective_from, saved_at, data)
+                )
+                saved.append(table_name)
+        if saved:
+            with self._lock:
+                self._cache.clear()
+        return saved
+
+    def history(self, app, table_name=None):
+        """Saved versions of ``app``'s tables (or one table), newest first, without their data"""
+        query = "SELECT id, table_name, effective_from, saved_at FROM price_tables WHERE app = ?"
+        parameters = [app]
+        if table_name is not None:
+            query += " AND table_name = ?"
+            parameters.append(table_name)
+        query += " ORDER BY effective_from DESC, id DESC"
+        with closing(self._connect()) as connection:
+            rows = connection.execute(query, parameters).fetchall()
+        return pd.DataFrame(rows, columns=["Version", "Table", "Effective from", "Saved at"])
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_price_store(path=DEFAULT_DB_PATH):
+    """The process-wide store of a database file, shared by every session"""
+    path = str(path)
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = PriceStore(path)
+        return _stores[path]
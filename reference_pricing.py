@@ -0,0 +1,204 @@
+"""Compiled reference pricing for the packing costing apps.
+
+The admin reference tables (material, box, polybag, stretchwrap, crate, pallet
+and strapping costs) are turned into a frozen ``ReferencePricing`` of per-unit
+rates. Compiled objects are kept in a small LRU keyed by a content hash of the
+tables, so they are only rebuilt when a table actually changes.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field, fields
+from types import MappingProxyType
+
+import pandas as pd
+
+from box_catalog import BoxCatalog
+
+
+def first_row_value(df, column):
+    """Return a reference table's first-row value as float, 0 when the table is missing or empty"""
+    if df is None or df.empty or column not in df.columns:
+        return 0.0
+    value = pd.to_numeric(pd.Series([df[column].iloc[0]]), errors="coerce").iloc[0]
+    return 0.0 if pd.isna(value) else float(value)
+
+
+def frame_fingerprint(df):
+    """Return a stable content hash of a DataFrame (column names, dtypes and values)"""
+    if df is None:
+        return "none"
+    digest = hashlib.sha1()
+    digest.update(repr([(str(column), str(dtype)) for column, dtype in df.dtypes.items()]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+@dataclass(frozen=True)
+class ReferencePricing:
+    """Per-unit rates derived from the reference cost tables"""
+    fingerprint: str = ""
+    material_costs: MappingProxyType = field(default_factory=lambda: MappingProxyType({}))
+    box_width: float = 0.0
+    box_height: float = 0.0
+    box_length: float = 0.0
+    box_cost: float = 0.0
+    # Every carton of the box cost table, None when only the first row is used
+    box_catalog: BoxCatalog = None
+    polybag_cost_per_m: float = 0.0
+    polybag_size_m: float = 0.0
+    stretch_area: float = 0.0
+    stretch_cost: float = 0.0
+    crate_width: float = 0.0
+    crate_height: float = 0.0
+    crate_length: float = 0.0
+    crate_cost: float = 0.0
+    pallet_width: float = 0.0
+    pallet_height: float = 0.0
+    pallet_cost: float = 0.0
+    clip_cost: float = 0.0
+    strapping_length_m: float = 0.0
+    strapping_cost_per_m: float = 0.0
+    covering_area_m2: float = 0.0
+    covering_price: float = 0.0
+
+    @property
+    def box_volume(self):
+        return self.box_width * self.box_height * self.box_length
+
+    @property
+    def box_volume_cost(self):
+        """Box cost per mm³, 0 when any reference box dimension is missing"""
+        if self.box_width > 0 and self.box_height > 0 and self.box_length > 0:
+            return self.box_cost / self.box_volume
+        return 0.0
+
+    @property
+    def crate_volume(self):
+        return self.crate_width * self.crate_height * self.crate_length
+
+    @property
+    def pallet_area(self):
+        return self.pallet_width * self.pallet_height
+
+    def __reduce__(self):
+        # mappingproxy cannot be pickled; ship a plain dict to worker processes
+        values = {f.name: getattr(self, f.name) for f in fields(self)}
+        values["material_costs"] = dict(self.material_costs)
+        return _unpickle_pricing, (values,)
+
+
+def _unpickle_pricing(values):
+    values["material_costs"] = MappingProxyType(values["material_costs"])
+    return ReferencePricing(**values)
+
+
+class CompiledCache:
+    """Thread-safe LRU of compiled objects keyed by table fingerprints"""
+
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, builder):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        value = builder()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def discard(self, key, value):
+        """Drop the entry of ``key`` if it still holds ``value``"""
+        with self._lock:
+            if key in self._entries and self._entries[key] is value:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_pricing_cache = CompiledCache()
+
+
+def _material_costs(df, cost_column):
+    """Material name -> cost per m² mapping of a material cost table"""
+    if df is None or df.empty:
+        return MappingProxyType({})
+    costs = pd.to_numeric(df[cost_column], errors="coerce").fillna(0.0)
+    return MappingProxyType(dict(zip(df["Material"], costs.astype(float))))
+
+
+def compile_reference_pricing(material_costs, box_costs, crate_costs=None, pallet_costs=None,
+                              strapping_clip_costs=None, pp_strapping_costs=None, cardboard_covering_costs=None):
+    """Compile app.py's cost tables into a cached ``ReferencePricing``"""
+    tables = [material_costs, box_costs, crate_costs, pallet_costs,
+              strapping_clip_costs, pp_strapping_costs, cardboard_covering_costs]
+    key = ("app",) + tuple(frame_fingerprint(df) for df in tables)
+
+    def build():
+        return ReferencePricing(
+            fingerprint="|".join(key),
+            material_costs=_material_costs(material_costs, "Cost/ m²"),
+            box_width=first_row_value(box_costs, "Width (mm)"),
+            box_height=first_row_value(box_costs, "Height (mm)"),
+            box_length=first_row_value(box_costs, "Length(mm)"),
+            box_cost=first_row_value(box_costs, "Cost (LKR)"),
+            box_catalog=BoxCatalog.from_table(box_costs),
+            crate_width=first_row_value(crate_costs, "Crate width/mm"),
+            crate_height=first_row_value(crate_costs, "Crate Height/mm"),
+            crate_length=first_row_value(crate_costs, "Crate Length/mm"),
+            crate_cost=first_row_value(crate_costs, "Cost (LKR)"),
+            pallet_width=first_row_value(pallet_costs, "Pallet width/mm"),
+            pallet_height=first_row_value(pallet_costs, "Pallet Height/mm"),
+            pallet_cost=first_row_value(pallet_costs, "Cost (LKR)"),
+            clip_cost=first_row_value(strapping_clip_costs, "Cost"),
+            strapping_length_m=first_row_value(pp_strapping_costs, "Strapping Length/m"),
+            strapping_cost_per_m=first_row_value(pp_strapping_costs, "Cost (LKR/m)"),
+            covering_area_m2=first_row_value(cardboard_covering_costs, "Area of the pallet (m²)"),
+            covering_price=first_row_value(cardboard_covering_costs, "Price (LKR)")
+        )
+
+    return _pricing_cache.get_or_build(key, build)
+
+
+def compile_packing_app_pricing(interleaving_df, polybag_ref, cardboard_ref, stretchwrap_ref,
+                                crate_cost_df, pallet_cost_df, strapping_cost_df):
+    """Compile packing_costing_app.py's admin reference tables into a cached ``ReferencePricing``"""
+    tables = [interleaving_df, polybag_ref, cardboard_ref, stretchwrap_ref,
+              crate_cost_df, pallet_cost_df, strapping_cost_df]
+    key = ("packing_app",) + tuple(frame_fingerprint(df) for df in tables)
+
+    def build():
+        # Polybag size is given in inches, e.g. "9 Inch"
+        ref_polybag_length = float(str(polybag_ref["Polybag Size"].iloc[0]).split()[0]) * 25.4
+        return ReferencePricing(
+            fingerprint="|".join(key),
+            material_costs=_material_costs(interleaving_df, "Cost per m² (LKR)"),
+            box_width=first_row_value(cardboard_ref, "Width(mm)"),
+            box_height=first_row_value(cardboard_ref, "Height(mm)"),
+            box_length=first_row_value(cardboard_ref, "Length(mm)"),
+            box_cost=first_row_value(cardboard_ref, "Cost(LKR)"),
+            polybag_cost_per_m=first_row_value(polybag_ref, "Cost per m (LKR/m)"),
+            polybag_size_m=ref_polybag_length / 1000,
+            stretch_area=first_row_value(stretchwrap_ref, "Area(mm²)"),
+            stretch_cost=first_row_value(stretchwrap_ref, "Cost(Rs/mm²)"),
+            crate_width=first_row_value(crate_cost_df, "Width (mm)"),
+            crate_height=first_row_value(crate_cost_df, "Height (mm)"),
+            crate_length=first_row_value(crate_cost_df, "Length (mm)"),
+            crate_cost=first_row_value(crate_cost_df, "Cost (LKR)"),
+            pallet_width=first_row_value(pallet_cost_df, "Width (mm)"),
+            pallet_height=first_row_value(pallet_cost_df, "Height (mm)"),
+            pallet_cost=first_row_value(pallet_cost_df, "Cost (LKR)"),
+            strapping_length_m=first_row_value(strapping_cost_df, "Strapping Length (m)"),
+            strapping_cost_per_m=first_row_value(strapping_cost_df, "Cost (LKR/m)")
+        )
+
+    return _pricing_cache.get_or_build(key, build)
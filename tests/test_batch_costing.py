@@ -0,0 +1,184 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+from batch_costing import (
+    _split_job, compile_batch_pricing, load_reference_tables, main, parallel_chunk_rows, run_batch, run_batch_jobs,
+    run_batch_streaming
+)
+
+
+def sku_table(skus):
+    return pd.DataFrame({
+        "SKU No": skus,
+        "Unit weight(kg/m)": [1.0] * len(skus),
+        "Width/mm": [30.0] * len(skus),
+        "Height/mm": [20.0] * len(skus),
+        "Length/mm": [1000.0] * len(skus)
+    })
+
+
+def crate_pallet_table(skus):
+    return pd.DataFrame({
+        "SKU": skus,
+        "packing method": ["crate"] * len(skus),
+        "Width/mm": [480.0] * len(skus),
+        "Height/mm": [590.0] * len(skus),
+        "Length/mm": [2000.0] * len(skus)
+    })
+
+
+def mixed_sku_table(count, seed=0):
+    """SKUs of varied sizes, some repeated and one without a width"""
+    rng = np.random.default_rng(seed)
+    sku_df = pd.DataFrame({
+        "SKU No": [f"S{number % 20}" for number in range(count)],
+        "Unit weight(kg/m)": rng.uniform(0.5, 2.0, count).round(3),
+        "Width/mm": rng.integers(20, 80, count).astype(float),
+        "Height/mm": rng.integers(20, 80, count).astype(float),
+        "Length/mm": rng.integers(300, 3000, count).astype(float)
+    })
+    sku_df.loc[3, "Width/mm"] = np.nan
+    return sku_df
+
+
+def as_csv(df):
+    """A table as it reads back from the CSV output"""
+    return pd.read_csv(io.StringIO(df.to_csv(index=False)))
+
+
+def test_cli_writes_the_run_batch_tables(tmp_path):
+    sku_df = mixed_sku_table(40)
+    crate_pallet_data = crate_pallet_table(["S1", "S5", "S99"])
+    sku_df.to_csv(tmp_path / "skus.csv", index=False)
+    crate_pallet_data.to_csv(tmp_path / "crate_pallet.csv", index=False)
+
+    status = main([
+        str(tmp_path / "skus.csv"), "-o", str(tmp_path / "costs.csv"), "--interleaving", "Yes",
+        "--crate-pallet", str(tmp_path / "crate_pallet.csv"),
+        "--crate-pallet-output", str(tmp_path / "crate_pallet_costs.csv")
+    ])
+
+    expected = run_batch(sku_df, load_reference_tables(), "Yes", crate_pallet_data=crate_pallet_data)
+    assert status == 0
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / "costs.csv"), as_csv(expected["packing_costs"]))
+    pd.testing.assert_frame_equal(
+        pd.read_csv(tmp_path / "crate_pallet_costs.csv"), as_csv(expected["crate_pallet_costs"])
+    )
+    assert expected["invalid_skus"] == ["S3"]
+    assert expected["unmatched_skus"] == ["S99"]
+
+
+def test_cli_needs_an_output_for_crate_pallet_costs(tmp_path):
+    sku_table(["A"]).to_csv(tmp_path / "skus.csv", index=False)
+    crate_pallet_table(["A"]).to_csv(tmp_path / "crate_pallet.csv", index=False)
+    status = main([
+        str(tmp_path / "skus.csv"), "-o", str(tmp_path / "costs.csv"),
+        "--crate-pallet", str(tmp_path / "crate_pallet.csv")
+    ])
+    assert status == 2
+    assert not (tmp_path / "costs.csv").exists()
+
+
+def test_streaming_output_equals_run_batch(tmp_path):
+    # Chunks of 7 rows: SKUs repeat across chunks and the crate/pallet rows use each SKU's last row
+    sku_df = mixed_sku_table(50)
+    crate_pallet_data = crate_pallet_table(["S1", "S5", "S19", "S99"])
+    sku_df.to_csv(tmp_path / "skus.csv", index=False)
+
+    summary = run_batch_streaming(
+        tmp_path / "skus.csv", tmp_path / "costs.csv", load_reference_tables(), 7,
+        crate_pallet_data=crate_pallet_data, crate_pallet_output=tmp_path / "crate_pallet_costs.csv"
+    )
+
+    expected = run_batch(sku_df, load_reference_tables(), crate_pallet_data=crate_pallet_data)
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / "costs.csv"), as_csv(expected["packing_costs"]))
+    pd.testing.assert_frame_equal(
+        pd.read_csv(tmp_path / "crate_pallet_costs.csv"), as_csv(expected["crate_pallet_costs"])
+    )
+    assert summary["rows"] == 50 and summary["costed"] == 49
+    assert summary["invalid_skus"] == ["S3"] and summary["unmatched_skus"] == ["S99"]
+
+
+def test_streaming_an_empty_file_writes_headers(tmp_path):
+    sku_table([]).to_csv(tmp_path / "skus.csv", index=False)
+
+    summary = run_batch_streaming(
+        tmp_path / "skus.csv", tmp_path / "costs.csv", load_reference_tables(), 7,
+        crate_pallet_data=crate_pallet_table(["A"]), crate_pallet_output=tmp_path / "crate_pallet_costs.csv"
+    )
+
+    expected = run_batch(sku_table(["A"]), load_reference_tables(), crate_pallet_data=crate_pallet_table(["A"]))
+    assert summary["rows"] == 0 and summary["unmatched_skus"] == ["A"]
+    assert pd.read_csv(tmp_path / "costs.csv").columns.tolist() == expected["packing_costs"].columns.tolist()
+    crate_pallet_costs = pd.read_csv(tmp_path / "crate_pallet_costs.csv")
+    assert crate_pallet_costs.empty
+    assert crate_pallet_costs.columns.tolist() == expected["crate_pallet_costs"].columns.tolist()
+
+
+def test_cli_streams_only_to_csv(tmp_path):
+    sku_table(["A"]).to_csv(tmp_path / "skus.csv", index=False)
+    assert main([str(tmp_path / "skus.csv"), "-o", str(tmp_path / "costs.xlsx"), "--chunksize", "10"]) == 2
+    assert main([str(tmp_path / "skus.csv"), "-o", str(tmp_path / "costs.csv"), "--chunksize", "10"]) == 0
+    assert len(pd.read_csv(tmp_path / "costs.csv")) == 1
+
+
+def test_mid_size_table_is_split_across_every_worker():
+    workers = 8
+    sku_df = sku_table([f"S{number}" for number in range(50000)])
+    pricing = compile_batch_pricing(load_reference_tables())
+    job = {"sku_df": sku_df, "reference_tables": load_reference_tables()}
+
+    tasks = list(_split_job(job, pricing.fingerprint, parallel_chunk_rows(len(sku_df), workers)))
+
+    assert len(tasks) >= workers
+    assert sum(len(task[1]) for task in tasks) == len(sku_df)
+
+
+def test_parallel_crate_pallet_rows_keep_the_input_order():
+    reference_tables = load_reference_tables()
+    sku_df = sku_table(["A", "B"])
+    crate_pallet_data = crate_pallet_table(["B", "A", "B"])
+
+    serial = run_batch(sku_df, reference_tables, crate_pallet_data=crate_pallet_data)
+    parallel = run_batch_jobs(
+        [{"sku_df": sku_df, "reference_tables": reference_tables, "crate_pallet_data": crate_pallet_data}],
+        workers=2, chunk_rows=1
+    )[0]
+
+    assert parallel["crate_pallet_costs"]["SKU"].tolist() == ["B", "A", "B"]
+    pd.testing.assert_frame_equal(parallel["crate_pallet_costs"], serial["crate_pallet_costs"])
+    pd.testing.assert_frame_equal(parallel["packing_costs"], serial["packing_costs"])
+
+
+def test_pool_output_equals_serial_for_every_job():
+    cheaper_boxes = load_reference_tables()
+    cheaper_boxes["box_costs"] = cheaper_boxes["box_costs"].assign(**{"Cost (LKR)": [150.0]})
+    crate_pallet_data = crate_pallet_table(["S2", "S1", "S7", "S2"])
+    jobs = [
+        {"sku_df": mixed_sku_table(60, seed=1), "reference_tables": load_reference_tables(),
+         "crate_pallet_data": crate_pallet_data},
+        {"sku_df": mixed_sku_table(30, seed=2), "reference_tables": cheaper_boxes,
+         "interleaving_required": "Yes", "eco_friendly": "Craft Paper", "protective_tape": "Yes"}
+    ]
+
+    pooled = run_batch_jobs(jobs, workers=2, chunk_rows=7)
+
+    for job, results in zip(jobs, pooled):
+        job = dict(job)
+        serial = run_batch(job.pop("sku_df"), job.pop("reference_tables"), **job)
+        assert results.keys() == serial.keys()
+        for key, expected in serial.items():
+            if isinstance(expected, pd.DataFrame):
+                pd.testing.assert_frame_equal(results[key], expected)
+            else:
+                assert results[key] == expected
+
+
+def test_streaming_on_a_pool_equals_serial_streaming(tmp_path):
+    mixed_sku_table(50).to_csv(tmp_path / "skus.csv", index=False)
+    for workers in (1, 2):
+        run_batch_streaming(tmp_path / "skus.csv", tmp_path / f"costs_{workers}.csv", load_reference_tables(), 7,
+                            workers=workers)
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / "costs_2.csv"), pd.read_csv(tmp_path / "costs_1.csv"))
@@ -0,0 +1,32 @@
+import numpy as np
+
+from box_catalog import BoxCatalog
+
+
+def brute_force_cost(cartons, costs, need):
+    fitting = [cost for dims, cost in zip(cartons, costs) if (np.sort(dims) >= np.sort(need)).all()]
+    return min(fitting) if fitting else np.nan
+
+
+def test_best_fit_matches_brute_force():
+    rng = np.random.default_rng(7)
+    cartons = rng.integers(100, 600, size=(40, 3)).astype(float)
+    costs = rng.uniform(50, 500, size=40).round(2)
+    needs = rng.integers(50, 650, size=(300, 3)).astype(float)
+    catalog = BoxCatalog(np.arange(40), cartons[:, 0], cartons[:, 1], cartons[:, 2], costs)
+
+    positions, best_costs, codes = catalog.best_fit(needs[:, 0], needs[:, 1], needs[:, 2])
+    expected = np.array([brute_force_cost(cartons, costs, need) for need in needs])
+    np.testing.assert_array_equal(np.isnan(best_costs), np.isnan(expected))
+    np.testing.assert_allclose(best_costs[~np.isnan(expected)], expected[~np.isnan(expected)])
+    assert (positions[np.isnan(expected)] == -1).all()
+    assert all(codes[k] is None for k in np.flatnonzero(np.isnan(expected)))
+
+
+def test_rotated_box_fits_and_dominated_cartons_are_dropped():
+    # The second carton is larger and cheaper than the first
+    catalog = BoxCatalog(["small", "large", "long"], [200, 300, 100], [100, 150, 100], [300, 400, 1000], [50, 40, 90])
+    assert len(catalog) == 2
+    _, costs, codes = catalog.best_fit([300, 900, np.nan], [200, 100, 100], [100, 100, 100])
+    assert codes.tolist() == ["large", "long", None]
+    assert costs[:2].tolist() == [40, 90]
@@ -0,0 +1,73 @@
+import itertools
+
+import numpy as np
+
+import box_layout
+from box_layout import best_box_orientation, best_cross_section, optimize_box_layout
+
+
+def two_block_count(width, height, a, b):
+    """Brute force over every split of the two-block layouts"""
+    best = 0
+    for i in range(int(width // a) + 1):
+        best = max(best, i * int(height // b) + int((width - i * a) // b) * int(height // a))
+    for j in range(int(height // b) + 1):
+        best = max(best, j * int(width // a) + int((height - j * b) // a) * int(width // b))
+    return best
+
+
+def test_cross_section_matches_brute_force_and_fits_the_box():
+    cases = list(itertools.product([90, 100, 135, 210], [60, 100, 150], [20, 30, 45], [25, 40, 70]))
+    box_width, box_height, a, b = (np.array(column, dtype=float) for column in zip(*cases))
+    count, vertical, blocks = best_cross_section(box_width, box_height, a, b)
+    for k, (width, height, first, second) in enumerate(cases):
+        assert count[k] == two_block_count(width, height, first, second)
+        n1_w, n1_h, n2_w, n2_h = blocks[k]
+        assert n1_w * n1_h + n2_w * n2_h == count[k]
+        if vertical[k]:
+            assert n1_w * first + n2_w * second <= width and n1_h * second <= height and n2_h * first <= height
+        else:
+            assert n1_h * second + n2_h * first <= height and n1_w * first <= width and n2_w * second <= width
+
+
+def test_cross_section_search_in_pieces_matches_brute_force(monkeypatch):
+    # A budget this small splits the rows into many pieces; the 1 mm item gets a piece of its own
+    monkeypatch.setattr(box_layout, "CROSS_SECTION_CELLS", 40)
+    cases = list(itertools.product([100, 210, 1200], [60, 150], [1, 20, 45], [25, 70]))
+    box_width, box_height, a, b = (np.array(column, dtype=float) for column in zip(*cases))
+    count, _, _ = best_cross_section(box_width, box_height, a, b)
+    assert count.tolist() == [two_block_count(*case) for case in cases]
+
+
+def test_profiles_are_floored_per_dimension():
+    # (100 / 30) * (100 / 40) = 8.3 used to be floored to 8; two blocks fit 7
+    profiles, layout, _ = optimize_box_layout([100], [100], [300], [30], [40], [300])
+    assert profiles[0] == 7
+    assert layout[0] != ""
+
+
+def test_profile_length_may_run_across_the_box():
+    # Only fits with the profile length across the box width
+    profiles, _, _ = optimize_box_layout([300], [100], [100], [30], [30], [300])
+    assert profiles[0] == 9
+
+
+def test_missing_dimensions_hold_no_profiles():
+    profiles, layout, _ = optimize_box_layout([100, 0], [100, 100], [300, 300], [np.nan, 30], [30, 30], [300, 300])
+    assert profiles.tolist() == [0, 0]
+    assert layout.tolist() == ["", ""]
+
+
+def test_best_box_orientation_tries_every_length():
+    rng = np.random.default_rng(3)
+    box_dims = rng.integers(60, 400, size=(200, 3)).astype(float)
+    width, height, length = (rng.integers(15, 150, size=200).astype(float) for _ in range(3))
+    profiles, oriented = best_box_orientation(box_dims, width, height, length)
+
+    per_length = [
+        optimize_box_layout(*box_dims[:, [axis for axis in (0, 1, 2) if axis != length_axis] + [length_axis]].T,
+                            width, height, length)[0]
+        for length_axis in (0, 1, 2)
+    ]
+    np.testing.assert_array_equal(profiles, np.max(per_length, axis=0))
+    np.testing.assert_array_equal(optimize_box_layout(*oriented.T, width, height, length)[0], profiles)
@@ -0,0 +1,62 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from box_catalog import BoxCatalog
+from box_layout import optimize_box_layout
+from box_search import BoxSearchLimits, search_box_sizes
+from costing_engine import calculate_packing_costs
+from reference_pricing import ReferencePricing
+
+LIMITS = BoxSearchLimits(max_width=300, max_height=300, max_length=1200, step=50)
+
+
+def engine_cost(pricing, profile, boxes):
+    """Packing cost per profile of each box as calculate_packing_costs charges it"""
+    boxes = np.asarray(boxes, dtype=float)
+    width, height, length = (np.full(len(boxes), value) for value in profile)
+    profiles, _, _ = optimize_box_layout(boxes[:, 0], boxes[:, 1], boxes[:, 2], width, height, length)
+    sku_df = pd.DataFrame({
+        "SKU No": np.arange(len(boxes)), "Unit weight(kg/m)": 1.0, "total weight per profile (kg)": 1.0,
+        "Width/mm": width, "Height/mm": height, "Length/mm": length,
+        "Box Width/mm": boxes[:, 0], "Box Height/mm": boxes[:, 1], "Box Length/mm": boxes[:, 2],
+        "Number of profiles per box": profiles
+    })
+    calculations, _ = calculate_packing_costs(sku_df, pricing, "No", "Mac foam", "No")
+    return np.where(profiles > 0, calculations["Packing Cost (LKR)"].to_numpy(), np.inf)
+
+
+def test_search_finds_the_cheapest_box_under_engine_pricing():
+    catalog = BoxCatalog([1, 2, 3], [210, 300, 150], [135, 200, 100], [330, 600, 1100], [205, 600, 300])
+    box_volume_cost = 205 / (330 * 210 * 135)
+    pricing = ReferencePricing(box_catalog=catalog, box_width=210, box_height=135, box_length=330, box_cost=205)
+    assert np.isclose(pricing.box_volume_cost, box_volume_cost)
+
+    rng = np.random.default_rng(5)
+    profiles = np.column_stack([rng.integers(15, 120, 12), rng.integers(15, 120, 12), rng.integers(100, 1100, 12)])
+    box_width, box_height, box_length, _, cost = search_box_sizes(
+        *profiles.T.astype(float), LIMITS, box_volume_cost, catalog
+    )
+
+    grid = np.arange(50, 301, 50)
+    for k, profile in enumerate(profiles):
+        lengths = [np.ceil(profile[2] * multiple / 50) * 50 for multiple in range(1, 1200 // profile[2] + 1)]
+        candidates = [box for box in itertools.product(grid, grid, lengths) if box[2] <= 1200]
+        candidates += [
+            carton[list(order)] for carton in catalog.dims for order in itertools.permutations(range(3))
+            if (carton[list(order)] <= [300, 300, 1200]).all()
+        ]
+        cheapest = engine_cost(pricing, profile, candidates).min()
+        found = engine_cost(pricing, profile, [[box_width[k], box_height[k], box_length[k]]])[0]
+        assert np.isclose(found, cheapest, atol=0.01)
+        assert np.isclose(cost[k], cheapest, atol=0.01)
+
+
+def test_one_short_sku_does_not_widen_every_sku_search():
+    width = np.full(2000, 60.0)
+    height = np.full(2000, 40.0)
+    length = np.full(2000, 3000.0)
+    length[0] = 50
+    box_width, _, _, profiles, _ = search_box_sizes(width, height, length, box_volume_cost=1.0)
+    assert np.isfinite(box_width).all() and (profiles > 0).all()
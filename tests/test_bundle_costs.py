@@ -0,0 +1,175 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bundle_optimizer import BundleLimits, optimize_bundles
+from costing_engine import bundling_table, calculate_bundle_costs, recalculate_bundle_costs
+from reference_pricing import compile_packing_app_pricing
+
+# Default admin tables of packing_costing_app.py
+INTERLEAVING = {"McFoam": 51.00, "Craft Paper": 34.65, "Protective Tape": 100.65, "Stretchwrap": 14.38}
+POLYBAG_COST_PER_M = 12.8
+BOX_VOLUME, BOX_COST = 210 * 135 * 330, 205.0
+STRETCH_AREA, STRETCH_COST = 210000, 135
+
+
+def packing_app_pricing():
+    return compile_packing_app_pricing(
+        pd.DataFrame({"Material": list(INTERLEAVING), "Cost per m² (LKR)": list(INTERLEAVING.values())}),
+        pd.DataFrame({"Polybag Size": ["9 Inch"], "Cost per m (LKR/m)": [POLYBAG_COST_PER_M]}),
+        pd.DataFrame({"Width(mm)": ["210"], "Height(mm)": ["135"], "Length(mm)": ["330"], "Cost(LKR)": [BOX_COST]}),
+        pd.DataFrame({"Area(mm²)": [STRETCH_AREA], "Cost(Rs/mm²)": [STRETCH_COST]}),
+        pd.DataFrame({"Width (mm)": [480], "Height (mm)": [590], "Length (mm)": [2000], "Cost (LKR)": [5000.0]}),
+        pd.DataFrame({"Width (mm)": [2000], "Height (mm)": [600], "Cost (LKR)": [3000.0]}),
+        pd.DataFrame({"Strapping Length (m)": [1.0], "Cost (LKR/m)": [15.0]})
+    )
+
+
+SKUS = pd.DataFrame({
+    "SKU No.": ["A", "B", "C", "D"],
+    "W (mm)": [40.0, 25.0, 60.0, 15.0],
+    "H (mm)": [20.0, 50.0, 30.0, 15.0],
+    "L (mm)": [6000.0, 400.0, 550.0, 3000.0],
+    "Fabricated": ["Select", "Fabricated", "Select", "Select"]
+})
+LAYERS = pd.DataFrame({"Rows": [3], "Layers": [2], "Width Type": ["H/mm"], "Height Type": ["W/mm"]})
+SIZE = pd.DataFrame({"Bundle Width (mm)": [120.0], "Bundle Height (mm)": [100.0]})
+
+
+def baseline_bundle_costs(row, method, bundling, finish, interleaving_required, eco_friendly, protective_tape):
+    """The per-row bundling loop the app used before the costs were computed column-wise"""
+    W, H, L = row["W (mm)"], row["H (mm)"], row["L (mm)"]
+    if method == "Number of layers":
+        rows, layers = int(bundling.loc[0, "Rows"]), int(bundling.loc[0, "Layers"])
+        dimensions = {"W/mm": W, "H/mm": H}
+        bundle_width = rows * dimensions[bundling.loc[0, "Width Type"]]
+        bundle_height = layers * dimensions[bundling.loc[0, "Height Type"]]
+        profiles = rows * layers
+    else:
+        bundle_width, bundle_height = bundling.loc[0, "Bundle Width (mm)"], bundling.loc[0, "Bundle Height (mm)"]
+        rows_width, rows_height = int(bundle_width / W), int(bundle_height / H)
+        profiles = rows_width * rows_height if rows_width > 0 and rows_height > 0 else 1
+    area_m2 = 2 * (bundle_width * L + bundle_height * L + bundle_width * bundle_height) / 1_000_000
+
+    if L > 550:
+        costs = {"Packaging Type": "Polybag", "Packaging Cost (Rs/prof)": POLYBAG_COST_PER_M * (L / 1000) / profiles}
+    else:
+        costs = {"Packaging Type": "Cardboard Box",
+                 "Packaging Cost (Rs/prof)": bundle_width * bundle_height * L / BOX_VOLUME * BOX_COST / profiles}
+    costs.update({"Bundle Width (mm)": bundle_width, "Bundle Height (mm)": bundle_height, "Profiles per Bundle": profiles})
+    total = costs["Packaging Cost (Rs/prof)"]
+
+    if interleaving_required == "Yes":
+        if eco_friendly == "Stretchwrap":
+            interleaving = area_m2 * 1_000_000 / STRETCH_AREA * STRETCH_COST / profiles
+        else:
+            interleaving = area_m2 * INTERLEAVING[eco_friendly] / profiles
+        costs[f"{eco_friendly} Cost (Rs/prof)"] = interleaving
+        total += interleaving
+    if finish == "Anodized" or row["Fabricated"] == "Fabricated" or protective_tape == "Yes":
+        tape = 2 * (W * L + H * L + W * H) / 1_000_000 * INTERLEAVING["Protective Tape"]
+        costs["Protective Tape Cost (Rs/prof)"] = tape
+        total += tape
+    costs["Total Cost (Rs/prof)"] = total
+    return costs
+
+
+@pytest.mark.parametrize("method, bundling", [("Number of layers", LAYERS), ("Size of the bundle", SIZE)])
+def test_bundle_costs_match_the_row_wise_baseline(method, bundling):
+    pricing = packing_app_pricing()
+    for finish, interleaving_required, eco_friendly, protective_tape in itertools.product(
+        ["Mill Finish", "Anodized"], ["Yes", "No"], ["McFoam", "Stretchwrap", "Craft Paper"], ["Yes", "No"]
+    ):
+        costs = calculate_bundle_costs(
+            SKUS, pricing, method, bundling, finish, interleaving_required, eco_friendly, protective_tape
+        )
+        for k, row in SKUS.iterrows():
+            expected = baseline_bundle_costs(
+                row, method, bundling, finish, interleaving_required, eco_friendly, protective_tape
+            )
+            for column, value in expected.items():
+                if isinstance(value, str):
+                    assert costs.loc[k, column] == value
+                else:
+                    assert costs.loc[k, column] == pytest.approx(value), column
+            # Only SKUs needing tape carry a tape cost
+            if "Protective Tape Cost (Rs/prof)" in costs and "Protective Tape Cost (Rs/prof)" not in expected:
+                assert np.isnan(costs.loc[k, "Protective Tape Cost (Rs/prof)"])
+
+
+def test_edited_bundles_are_repriced_like_the_baseline():
+    pricing = packing_app_pricing()
+    costs = calculate_bundle_costs(SKUS, pricing, "Number of layers", LAYERS, "Anodized", "Yes", "McFoam", "No")
+    edited = costs.copy()
+    edited["Profiles per Bundle"] = [4, 6, 1, 9]
+    edited["Packaging Type"] = ["Cardboard Box", "Polybag", "Cardboard Box", "Polybag"]
+
+    updated = recalculate_bundle_costs(edited, costs, pricing)
+
+    volume = costs["Bundle Width (mm)"] * costs["Bundle Height (mm)"] * costs["Bundle Length (mm)"]
+    polybag = POLYBAG_COST_PER_M * costs["Bundle Length (mm)"] / 1000
+    box = volume / BOX_VOLUME * BOX_COST
+    expected = np.where(edited["Packaging Type"] == "Polybag", polybag, box) / edited["Profiles per Bundle"]
+    np.testing.assert_allclose(updated["Packaging Cost (Rs/prof)"], expected)
+    np.testing.assert_allclose(
+        updated["Total Cost (Rs/prof)"],
+        expected + edited["McFoam Cost (Rs/prof)"] + edited["Protective Tape Cost (Rs/prof)"]
+    )
+
+
+def test_per_sku_bundling_prices_each_sku_with_its_own_row():
+    pricing = packing_app_pricing()
+    per_sku = pd.DataFrame({
+        "SKU No.": ["C", "A", "X"], "Rows": [4, 2, 9], "Layers": [1, 5, 9],
+        "Width Type": ["W/mm", "H/mm", "W/mm"], "Height Type": ["H/mm", "W/mm", "H/mm"]
+    })
+    # Stored rows join on SKU, SKUs without one get the defaults and unknown SKUs are dropped
+    table = bundling_table(SKUS, per_sku, ["Rows", "Layers", "Width Type", "Height Type"])
+    assert table["SKU No."].tolist() == ["A", "B", "C", "D"]
+    assert table["Rows"].tolist() == [2, 1, 4, 1]
+    assert table["Width Type"].tolist() == ["H/mm", "W/mm", "W/mm", "W/mm"]
+
+    costs = calculate_bundle_costs(SKUS, pricing, "Number of layers", per_sku, "Mill Finish", "Yes", "McFoam", "No")
+    for k, row in table.iterrows():
+        single = calculate_bundle_costs(
+            SKUS.iloc[[k]], pricing, "Number of layers", row.drop("SKU No.").to_frame().T.reset_index(drop=True),
+            "Mill Finish", "Yes", "McFoam", "No"
+        )
+        # The tape column is left out of tables where no SKU needs tape
+        pd.testing.assert_series_equal(costs.loc[k, single.columns], single.iloc[0], check_names=False)
+
+
+def test_optimizer_picks_the_cheapest_bundle_within_the_limits():
+    pricing = packing_app_pricing()
+    limits = BundleLimits(max_width=130, max_height=100, max_profiles=8)
+    selections = ("Mill Finish", "Yes", "Stretchwrap", "No")
+
+    optimized = optimize_bundles(SKUS, pricing, *selections, limits)
+
+    chosen = calculate_bundle_costs(SKUS, pricing, "Number of layers", optimized, *selections)
+    assert optimized["SKU No."].tolist() == SKUS["SKU No."].tolist()
+    for k, row in SKUS.iterrows():
+        candidates = [
+            (rows, layers, width_type, height_type)
+            for rows, layers in itertools.product(range(1, 9), repeat=2) if rows * layers <= limits.max_profiles
+            for width_type, height_type in [("W/mm", "H/mm"), ("H/mm", "W/mm")]
+            if rows * row[width_type.replace("/mm", " (mm)")] <= limits.max_width
+            and layers * row[height_type.replace("/mm", " (mm)")] <= limits.max_height
+        ]
+        bundling = pd.DataFrame(candidates, columns=["Rows", "Layers", "Width Type", "Height Type"])
+        brute_force = calculate_bundle_costs(
+            SKUS.iloc[[k] * len(candidates)].reset_index(drop=True), pricing, "Number of layers", bundling, *selections
+        )
+        assert chosen.loc[k, "Total Cost (Rs/prof)"] == pytest.approx(brute_force["Total Cost (Rs/prof)"].min())
+        assert chosen.loc[k, "Bundle Width (mm)"] <= limits.max_width
+        assert chosen.loc[k, "Bundle Height (mm)"] <= limits.max_height
+        assert chosen.loc[k, "Profiles per Bundle"] <= limits.max_profiles
+
+
+def test_optimizer_falls_back_to_single_profiles():
+    # Wider than the limit either way round
+    sku_df = SKUS.iloc[[0]].assign(**{"W (mm)": [400.0], "H (mm)": [350.0]})
+    optimized = optimize_bundles(sku_df, packing_app_pricing(), "Mill Finish", "No", "McFoam", "No", BundleLimits())
+    assert optimized.loc[0, ["Rows", "Layers", "Width Type", "Height Type"]].tolist() == [1, 1, "W/mm", "H/mm"]
@@ -0,0 +1,48 @@
+import pandas as pd
+import pytest
+
+from batch_costing import compile_batch_pricing, load_reference_tables, prepare_sku_table
+from costing_engine import calculate_packing_costs
+
+
+def packing_costs(sku_df, box_costs=None):
+    reference_tables = load_reference_tables()
+    if box_costs is not None:
+        reference_tables["box_costs"] = box_costs
+    calculations, _ = calculate_packing_costs(
+        prepare_sku_table(sku_df), compile_batch_pricing(reference_tables), "No", "Mac foam", "No"
+    )
+    return calculations
+
+
+def sku_table(width, height, length):
+    return pd.DataFrame({
+        "SKU No": ["A"], "Unit weight(kg/m)": [1.0],
+        "Width/mm": [width], "Height/mm": [height], "Length/mm": [length]
+    })
+
+
+def test_carton_cost_is_shared_by_the_profiles_the_carton_holds():
+    # 100 x 100 x 300 SKU box (9 profiles) goes into the 210 x 135 x 330 carton, which holds 7 x 4 x 1
+    calculations = packing_costs(sku_table(30, 30, 300))
+    assert calculations.loc[0, "Box SAP Item Code"] == 345
+    assert calculations.loc[0, "Profiles per box"] == 28
+    assert calculations.loc[0, "Packing Cost (LKR)"] == pytest.approx(205 / 28, abs=0.01)
+
+
+def test_carton_never_holds_fewer_profiles_than_the_sku_box():
+    sku_df = sku_table(30, 30, 300).assign(**{
+        "Box Width/mm": [130], "Box Height/mm": [200], "Box Length/mm": [320], "Number of profiles per box": [40]
+    })
+    calculations, _ = calculate_packing_costs(
+        sku_df.assign(**{"total weight per profile (kg)": [0.3]}),
+        compile_batch_pricing(load_reference_tables()), "No", "Mac foam", "No"
+    )
+    assert calculations.loc[0, "Profiles per box"] == 40
+
+
+def test_box_without_a_fitting_carton_is_priced_by_volume():
+    calculations = packing_costs(sku_table(200, 150, 1000))
+    box_volume_cost = 205 / (330 * 210 * 135)
+    assert calculations.loc[0, "Box SAP Item Code"] is None
+    assert calculations.loc[0, "Packing Cost (LKR)"] == pytest.approx(box_volume_cost * 200 * 200 * 1000, abs=0.01)
@@ -0,0 +1,55 @@
+import numpy as np
+
+import load_planner
+from load_planner import LoadSizingLimits, plan_loads, size_loads
+
+
+def test_plan_loads_counts_whole_units():
+    units, profiles, utilisation, layout = plan_loads(
+        [1000, 1000, 1000, 0], [500, 500, 500, 500], [2000, 0, 2000, 2000],
+        [200, 200, 200, 200], [100, 100, np.nan, 100], [1000, 1000, 1000, 1000],
+        profiles_per_unit=[4, 4, 4, 4]
+    )
+    # 5 x 5 in the cross-section, 2 along the length; a load without length holds one layer
+    assert units.tolist() == [50, 25, 0, 0]
+    assert profiles.tolist() == [200, 100, 0, 0]
+    assert utilisation[0] == 1.0
+    assert layout[0].endswith("2 along length")
+    assert layout[2] == layout[3] == ""
+
+
+def test_size_loads_picks_the_least_area_grid():
+    limits = LoadSizingLimits(max_width=1200, max_height=1000)
+    unit_width = np.array([110.0, 70.0, 300.0, 2000.0])
+    unit_height = np.array([60.0, 130.0, 200.0, 100.0])
+    needed = np.array([17, 40, 30, 5])
+    width, height, length, units = size_loads(unit_width, unit_height, [1000] * 4, needed, limits)
+
+    for k in range(3):
+        areas = [
+            columns * across * rows * up
+            for across, up in [(unit_width[k], unit_height[k]), (unit_height[k], unit_width[k])]
+            for columns in range(1, int(limits.max_width // across) + 1)
+            for rows in range(1, int(limits.max_height // up) + 1)
+            if columns * rows >= needed[k]
+        ]
+        if areas:
+            assert units[k] >= needed[k]
+            assert width[k] * height[k] == min(areas)
+        else:
+            # Not enough room: the largest grid within the limits
+            assert width[k] <= limits.max_width and height[k] <= limits.max_height
+    # A unit wider than the limits in both orientations cannot be sized
+    assert np.isnan(width[3]) and units[3] == 0
+
+
+def test_size_loads_in_blocks_matches_one_block(monkeypatch):
+    rng = np.random.default_rng(5)
+    unit_width, unit_height = (rng.integers(1, 400, size=300).astype(float) for _ in range(2))
+    needed = rng.integers(1, 200, size=300)
+    whole = size_loads(unit_width, unit_height, [1000.0] * 300, needed)
+
+    monkeypatch.setattr(load_planner, "LOAD_BLOCK_SIZE", 7)
+    blocked = size_loads(unit_width, unit_height, [1000.0] * 300, needed)
+    for expected, actual in zip(whole, blocked):
+        np.testing.assert_array_equal(actual, expected)
@@ -0,0 +1,90 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from price_store import PriceStore, get_price_store
+
+CRATE_COSTS = pd.DataFrame({
+    "Crate width/mm": [480], "Crate Height/mm": [590], "Crate Length/mm": [2000], "Cost (LKR)": [5000.0]
+})
+MATERIAL_COSTS = pd.DataFrame({"Material": ["McFoam", "Craft Paper"], "Cost/ m²": [35.0, np.nan]})
+
+
+def test_saved_tables_load_back_unchanged(tmp_path):
+    store = PriceStore(tmp_path / "prices.sqlite3")
+    store.save_tables("app", {"crate_costs": CRATE_COSTS, "material_costs": MATERIAL_COSTS}, date(2026, 1, 1))
+
+    tables = store.load_tables("app", date(2026, 1, 1))
+
+    assert set(tables) == {"crate_costs", "material_costs"}
+    pd.testing.assert_frame_equal(tables["crate_costs"], CRATE_COSTS, check_dtype=False)
+    pd.testing.assert_frame_equal(tables["material_costs"], MATERIAL_COSTS, check_dtype=False)
+    assert store.load_tables("other app", date(2026, 1, 1)) == {}
+
+
+def test_save_skips_tables_equal_to_their_latest_version(tmp_path):
+    store = PriceStore(tmp_path / "prices.sqlite3")
+    effective_from = date(2026, 1, 1)
+    assert store.save_tables("app", {"crate_costs": CRATE_COSTS}, effective_from) == ["crate_costs"]
+
+    raised = CRATE_COSTS.assign(**{"Cost (LKR)": [5500.0]})
+    saved = store.save_tables("app", {"crate_costs": CRATE_COSTS.copy(), "raised": raised}, effective_from)
+
+    assert saved == ["raised"]
+    assert len(store.history("app", "crate_costs")) == 1
+    # The same table with a new effective date is a new version
+    assert store.save_tables("app", {"crate_costs": CRATE_COSTS}, date(2026, 2, 1)) == ["crate_costs"]
+
+
+def test_load_honours_the_effective_date(tmp_path):
+    store = PriceStore(tmp_path / "prices.sqlite3")
+    raised = CRATE_COSTS.assign(**{"Cost (LKR)": [5500.0]})
+    store.save_tables("app", {"crate_costs": CRATE_COSTS}, date(2026, 1, 1))
+    store.save_tables("app", {"crate_costs": raised}, date(2026, 3, 1))
+
+    assert store.load_tables("app", date(2025, 12, 31)) == {}
+    assert store.load_tables("app", date(2026, 2, 28))["crate_costs"].loc[0, "Cost (LKR)"] == 5000.0
+    assert store.load_tables("app", date(2026, 3, 1))["crate_costs"].loc[0, "Cost (LKR)"] == 5500.0
+
+    # A later save effective from an earlier date does not replace the version in effect
+    store.save_tables("app", {"crate_costs": CRATE_COSTS.assign(**{"Cost (LKR)": [4800.0]})}, date(2026, 2, 1))
+    assert store.load_tables("app", date(2026, 3, 1))["crate_costs"].loc[0, "Cost (LKR)"] == 5500.0
+    assert store.load_tables("app", date(2026, 2, 1))["crate_costs"].loc[0, "Cost (LKR)"] == 4800.0
+
+    history = store.history("app")
+    assert history["Effective from"].tolist() == ["2026-03-01", "2026-02-01", "2026-01-01"]
+
+
+def test_sessions_share_one_copy_of_the_tables(tmp_path):
+    store = PriceStore(tmp_path / "prices.sqlite3")
+    store.save_tables("app", {"crate_costs": CRATE_COSTS}, date(2026, 1, 1))
+
+    first = store.load_tables("app", date(2026, 1, 1))
+    second = store.load_tables("app", date(2026, 1, 1))
+
+    assert first["crate_costs"] is second["crate_costs"]
+    # Each caller gets its own dict, so replacing a table does not touch the cache
+    first["crate_costs"] = CRATE_COSTS.assign(**{"Cost (LKR)": [1.0]})
+    assert store.load_tables("app", date(2026, 1, 1))["crate_costs"] is second["crate_costs"]
+
+
+def test_a_save_from_another_process_bumps_the_version_and_reloads(tmp_path):
+    path = tmp_path / "prices.sqlite3"
+    store, other_process = PriceStore(path), PriceStore(path)
+    assert store.version() == 0
+    store.save_tables("app", {"crate_costs": CRATE_COSTS}, date(2026, 1, 1))
+    version = store.version()
+    cached = store.load_tables("app", date(2026, 1, 1))["crate_costs"]
+
+    other_process.save_tables("app", {"crate_costs": CRATE_COSTS.assign(**{"Cost (LKR)": [5500.0]})}, date(2026, 1, 1))
+
+    assert store.version() > version
+    reloaded = store.load_tables("app", date(2026, 1, 1))["crate_costs"]
+    assert reloaded is not cached
+    assert reloaded.loc[0, "Cost (LKR)"] == 5500.0
+
+
+def test_one_store_per_database_file(tmp_path):
+    assert get_price_store(tmp_path / "a.sqlite3") is get_price_store(str(tmp_path / "a.sqlite3"))
+    assert get_price_store(tmp_path / "a.sqlite3") is not get_price_store(tmp_path / "b.sqlite3")